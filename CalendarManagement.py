@@ -1,109 +1,184 @@
+import importlib
+import threading
 import tkinter as tk
 from tkinter import scrolledtext
-import sqlite3
-from langchain_core.tools import tool
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
 #import datetime
-from langchain.callbacks.tracers import ConsoleCallbackHandler
-from wxauto import *
-from datetime import datetime
-
-# 建表
-# 连接到 SQLite 数据库
-# 如果文件不存在，会自动在当前目录创建一个名为 'langchain.db' 的数据库文件
-conn = sqlite3.connect('langchain.db')
-
-# 创建一个 Cursor 对象并通过它执行 SQL 语句
-c = conn.cursor()
-# 创建表
-c.execute('''
-create table if not exists schedules 
-(
-    id          INTEGER
-        primary key autoincrement,
-    start_time  TEXT default (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')) not null,
-    description TEXT default ''                                                  not null
-);
-''')
-
-
-# 提交事务
-conn.commit()
-# 关闭连接
-conn.close()
-
-print("数据库和表已成功创建！")
-
-def connect_db():
-    """ 连接到数据库 """
-    conn = sqlite3.connect('langchain.db')
-    return conn
-    
-@tool
-def add_schedule(start_time : str, description : str) -> str: 
-    """ 新增日程，比如2024-05-03 20:00:00, 周会 """
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO schedules (start_time, description) VALUES (?, ?);
-    """, (start_time, description,))
-    conn.commit()
-    conn.close()
+from wx_harvester import IncrementalHarvester
+from datetime import datetime, timedelta
+from interval_index import IntervalIndex
+from recurrence import Rule, format_rrule, parse_rrule
+from schedule_store import normalize_time
+from storage import describe_conflicts, month_range, normalize_end, open_storage, split_start_time
+from agent_worker import AgentWorker
+from lazy_loader import LazyLoader
+from response_cache import ResponseCache
+
+# 数据库、langchain 和 wxauto 都在窗口显示后于后台预热，或在第一次使用时加载（见 build_agent）
+storage = None
+agent_executor = None
+
+# 只读问题的回答缓存；工具通过 storage 增删时递增 storage.version，旧回答随之失效
+response_cache = ResponseCache()
+# 冲突检查和写入之间不能插入其他修改；区间索引 / 月计数 / 重复规则都不是线程安全的，
+# 两个 agent 工作线程上的增删（以及遍历事件的查询）都要持有
+write_lock = threading.Lock()
+
+def _schedule_rows(days):
+    """把 {date: [event, ...]} 转成 [(start_time, description[, end_time]), ...]"""
+    return [(f"{date} {e['time']}", e['description'], *([e['end']] if e.get('end') else []))
+            for date, events in days.items() for e in events]
+
+def _schedule_item(item):
+    """[开始时间, 描述] 或 [开始时间, 描述, 结束时间] -> (date, time, description, end)"""
+    start_time, description, *end_time = item
+    date, time = split_start_time(start_time)
+    return date, time, description, normalize_end(date, time, end_time[0] if end_time else None)
+
+def add_schedule(start_time : str, description : str, end_time : str = "") -> str: 
+    """ 新增日程，比如2024-05-03 20:00:00, 周会；end_time 为可选的结束时间，比如2024-05-03 21:00:00。与已有日程时间冲突时不新增 """
+    try:
+        date, time, description, end = _schedule_item([start_time, description, end_time])
+    except ValueError as e:
+        return str(e)
+    with write_lock:
+        conflicts = storage.conflicts(date, time, end)
+        if conflicts:
+            return f"时间冲突，未新增：与 {describe_conflicts(conflicts)} 重叠"
+        storage.add(date, time, description, end)
     return "true"
 
-@tool
+def add_schedules(schedules : list[list[str]]) -> str:
+    """ 批量新增日程，每一项为 [开始时间, 描述] 或 [开始时间, 描述, 结束时间]，比如 [["2024-05-03 20:00:00", "周会"], ["2024-05-04 09:00:00", "体检", "2024-05-04 11:00:00"]]。与已有日程时间冲突的项不新增 """
+    try:
+        items = [_schedule_item(item) for item in schedules]
+    except ValueError as e:
+        return str(e)
+    accepted, skipped = [], []
+    # 同一批中先接受的项也参与检查，全部检查完再一次写入
+    batch = IntervalIndex()
+    with write_lock:
+        for date, time, description, end in items:
+            conflicts = storage.conflicts(date, time, end)
+            if not conflicts:
+                conflicts = [{"date": value[0], "time": value[1], "description": value[2], "end": other_end}
+                             for _, other_end, value in batch.overlaps(f"{date} {time}", end)]
+            if conflicts:
+                skipped.append(f"{date} {time} {description}（与 {describe_conflicts(conflicts)} 重叠）")
+            else:
+                batch.add(f"{date} {time}", end, (date, time, description))
+                accepted.append((date, time, description, end))
+        storage.add_many(accepted)
+    result = f"已新增{len(accepted)}条日程"
+    if skipped:
+        result += "，时间冲突未新增：" + "；".join(skipped)
+    return result
+
+def add_recurring_schedule(start_time : str, description : str, rrule : str, end_time : str = "") -> str:
+    """ 新增重复日程，只保存一条规则。rrule 为 iCalendar 风格的重复规则，比如 每周一三五的站会：2025-03-03 09:30:00, 站会, FREQ=WEEKLY;BYDAY=MO,WE,FR；
+    支持 FREQ=DAILY/WEEKLY/MONTHLY、INTERVAL、BYDAY、COUNT、UNTIL=20250630。end_time 为可选的每次结束时间，比如10:00:00 """
+    try:
+        date, time, description, end = _schedule_item([start_time, description, end_time])
+        rule = Rule(None, date, time, description, **parse_rrule(rrule), end=end[11:] if end else None)
+    except ValueError as e:
+        return f"无法识别的重复日程：{e}"
+    with write_lock:
+        rule = storage.add_rule(rule)
+    return f"已新增重复日程 {rule.id}：{rule.start} {rule.time} {rule.description}（{format_rrule(rule)}）"
+
 def delete_schedule_by_time(start_time : str) -> str:
-    """ 根据时间删除日程 """
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        DELETE FROM schedules WHERE start_time = ?;
-    """, (start_time,))
-    conn.commit()
-    conn.close()
+    """ 根据时间删除日程；重复日程只删除这一次 """
+    try:
+        date, time = split_start_time(start_time)
+    except ValueError as e:
+        return str(e)
+    with write_lock:
+        storage.delete(date, time)
     return "true"
 
-@tool
 def get_schedules_by_date(query_date : str) -> str:
-    """ 根据日期查询日程，比如 获取2024-05-03的所有日程 """
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT start_time, description FROM schedules WHERE start_time LIKE ?;
-    """, (f"{query_date}%",))
-    schedules = cursor.fetchall()
-    conn.close()
-    return str(schedules)
-
-llm = ChatOpenAI(
-    model="deepseek-chat",  # 根据DeepSeek实际模型名称调整
-    openai_api_base="https://api.deepseek.com/v1",  # DeepSeek的API地址
-    openai_api_key="xxxxxxxxxxxxxxxx",
-    temperature=0.3,  # 降低随机性
-    max_tokens=500,   # 限制输出长度
-    top_p=0.9
-) 
-tools = [add_schedule, delete_schedule_by_time, get_schedules_by_date]
-llm_with_tools = llm.bind_tools(tools)
-
-prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "你是一个日程管理助手",
-        ),
-        ("placeholder", "{chat_history}"),
-        ("user", "{input} \n\n 当前时间为：{current_time}"),
-        ("placeholder", "{agent_scratchpad}"),
-    ]
+    """ 根据日期查询日程，比如 获取2024-05-03的所有日程，也可以传入 2024-05 查询整月 """
+    try:
+        date, _ = split_start_time(query_date)
+    except ValueError:
+        try:
+            month = datetime.strptime(query_date.strip(), "%Y-%m")
+        except ValueError:
+            return f"无法识别的日期：{query_date}"
+        with write_lock:
+            return str(_schedule_rows(storage.get_range(*month_range(month.year, month.month))))
+    with write_lock:
+        return str(_schedule_rows({date: storage.get_by_date(date)}))
+
+def get_schedules_by_range(start_time : str, end_time : str) -> str:
+    """ 查询时间区间 [start_time, end_time) 内的日程，比如 2024-05-01 00:00:00 到 2024-05-08 00:00:00 """
+    try:
+        start, end = normalize_time(start_time), normalize_time(end_time)
+    except ValueError as e:
+        return str(e)
+    last_day = datetime.strptime(end[:10], "%Y-%m-%d") + timedelta(days=1)
+    with write_lock:
+        rows = _schedule_rows(storage.get_range(start[:10], last_day))
+    return str([row for row in rows if start <= row[0] < end])
+
+SYSTEM_PROMPT = (
+    "你是一个日程管理助手。"
+    "需要新增多条日程时，请把它们放在一次 add_schedules 调用中批量新增，不要逐条调用 add_schedule。"
 )
-agent = create_tool_calling_agent(llm_with_tools, tools, prompt)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=False)
+
+TOOLS = [add_schedule, add_schedules, add_recurring_schedule, delete_schedule_by_time,
+         get_schedules_by_date, get_schedules_by_range]
+
+
+def open_db():
+    """打开数据库；旧版数据库会在这里自动迁移：规范化 start_time 并建立索引"""
+    global storage
+    if storage is None:
+        # 如果文件不存在，会自动在当前目录创建一个名为 'langchain.db' 的数据库文件
+        storage = open_storage('sqlite', 'langchain.db')
+        print("数据库和表已成功创建！")
+    return storage
+
+
+def build_agent():
+    """导入 langchain、打开数据库并构建 agent_executor，由 agent_loader 调用"""
+    global agent_executor
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.tools import tool
+    from langchain_openai import ChatOpenAI
+
+    open_db()
+    llm = ChatOpenAI(
+        model="deepseek-chat",  # 根据DeepSeek实际模型名称调整
+        openai_api_base="https://api.deepseek.com/v1",  # DeepSeek的API地址
+        openai_api_key="xxxxxxxxxxxxxxxx",
+        temperature=0.3,  # 降低随机性
+        max_tokens=500,   # 限制输出长度
+        top_p=0.9
+    ) 
+    tools = [tool(fn) for fn in TOOLS]
+    llm_with_tools = llm.bind_tools(tools)
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                SYSTEM_PROMPT,
+            ),
+            ("placeholder", "{chat_history}"),
+            ("user", "{input} \n\n 当前时间为：{current_time}"),
+            ("placeholder", "{agent_scratchpad}"),
+        ]
+    )
+    agent = create_tool_calling_agent(llm_with_tools, tools, prompt)
+    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=False)
+    return agent_executor
+
+
+agent_loader = LazyLoader(build_agent, "agent")
+wechat_loader = LazyLoader(lambda: importlib.import_module("wxauto"), "wxauto")
+# 窗口显示后多久开始在后台预热
+WARMUP_DELAY_MS = 200
 
 class QAApp:
     def __init__(self, master):
@@ -120,6 +195,17 @@ class QAApp:
  
         # 模拟问答函数（实际可替换为真实AI接口）
         self.qa_engine = self.mock_qa_engine
+        # 问答在后台线程执行，避免网络请求卡住界面
+        self.agent_worker = AgentWorker(master, self.qa_engine, on_change=self.update_pending)
+
+        # 关闭窗口时释放数据库连接
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+        # 窗口显示后在后台构建 agent、导入 wxauto
+        master.after(WARMUP_DELAY_MS, self.warm_up)
+
+    def warm_up(self):
+        agent_loader.warm_up()
+        wechat_loader.warm_up()
 
 
     def create_widgets(self):
@@ -169,6 +255,21 @@ class QAApp:
                 font=("微软雅黑", 12),
                 width=15).pack(side=tk.LEFT)
 
+        tk.Button(btn_frame,
+                text="取消请求",
+                command=self.cancel_queries,
+                bg="#607D8B",
+                fg="white",
+                font=("微软雅黑", 12),
+                width=15).pack(side=tk.LEFT, padx=10)
+
+        # 进行中的请求
+        self.pending_var = tk.StringVar()
+        tk.Label(self.master,
+                textvariable=self.pending_var,
+                font=("微软雅黑", 10),
+                bg=self.bg_color).pack()
+
         # 输出区域
         output_frame = tk.Frame(self.master, bg=self.bg_color)
         output_frame.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
@@ -197,26 +298,14 @@ class QAApp:
             except ValueError:
                 return False
         
-        def get_more_messages(wx,name):
-            wx.ChatWith(name)
-            wx.rollToTop()
-            msgs = wx.GetAllMessage()
-            msg_list = []
-            switch =False
+        wx = wechat_loader.get().WeChat()
+        harvester = IncrementalHarvester(wx, is_time_marker=is_valid_time)
+        for name, msgs in harvester.harvest():
             for msg in msgs:
-                if switch:
-                    print('%s : %s' % (msg[0], msg[1]))
-                    msg_list.append(msg[0]+ msg[1])
-                    if(msg[0]!='SYS'):
-                        self.input_txt.insert(tk.END,msg[1]) 
-                else:
-                    switch = is_valid_time(msg[1])
-            return msg_list
-        msgs_list=[]
-        wx = WeChat()
-        name_list = wx.GetAllSessionList()
-        for name in name_list:
-            msgs_list.append(get_more_messages(wx, name))
+                print('%s : %s' % (msg[0], msg[1]))
+                if(msg[0]!='SYS'):
+                    self.input_txt.insert(tk.END,msg[1])
+        print(f"微信会话 {harvester.sessions_seen} 个，打开 {harvester.sessions_visited} 个，新消息 {harvester.messages_new} 条")
         
 
 
@@ -228,13 +317,28 @@ class QAApp:
             self.show_output("提示：请输入有效问题！")
             return
         
-        # 调用问答引擎
-        answer = self.qa_engine(question)
-        
-        # 显示结果
-        self.show_output(f"问题：{question}\n答案：{answer}\n{'-'*40}\n")
+        # 调用问答引擎（后台执行，结果回到主线程显示）
+        request = self.agent_worker.submit(
+            question,
+            on_done=lambda answer: self.show_output(f"问题：{question}\n答案：{answer}\n{'-'*40}\n"),
+            on_error=lambda e: self.show_output(f"问题：{question}\n请求失败：{e}\n{'-'*40}\n"),
+        )
+        if request is None:
+            self.show_output("提示：请求过多，请稍后再试")
+            return
         self.input_txt.delete("1.0", tk.END)  # 清空输入框
 
+    def cancel_queries(self):
+        """取消所有进行中的请求"""
+        if self.agent_worker.cancel():
+            self.show_output("提示：已取消进行中的请求")
+
+    def update_pending(self, pending):
+        """更新进行中请求的提示"""
+        stats = response_cache.stats()
+        cache = f"缓存 命中 {stats['hits']} / 未命中 {stats['misses']}" if stats['hits'] or stats['misses'] else ""
+        self.pending_var.set(f"处理中… {pending} 个请求    {cache}" if pending else cache)
+
     def show_output(self, text):
         self.output_txt.config(state=tk.NORMAL)
         self.output_txt.insert(tk.END, text + "\n")
@@ -247,7 +351,21 @@ class QAApp:
         self.output_txt.delete("1.0", tk.END)
         self.output_txt.config(state=tk.DISABLED)
 
+    def on_close(self):
+        """退出程序"""
+        self.agent_worker.shutdown()
+        if storage is not None:
+            storage.close()
+        self.master.destroy()
+
     def mock_qa_engine(self, question):
+        agent_loader.get()
+        # SmartCalendar 可能同时在写 langchain.db，sync() 发现其他进程的修改时递增版本号
+        storage.sync()
+        key = response_cache.key(question, storage.version)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
         print(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         res = agent_executor.invoke(
                 {
@@ -258,6 +376,8 @@ class QAApp:
             )
         
         print(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        storage.sync()
+        response_cache.put(key, res["output"], storage.version)
         return res["output"]
 
 if __name__ == "__main__":
@@ -1,46 +1,153 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, scrolledtext
-from datetime import datetime
+from datetime import datetime, timedelta
 import calendar
-import json
+import concurrent.futures
+import importlib
 import os
-from wxauto import * 
+from wx_harvester import IncrementalHarvester
+from wx_listener import MessageListener, thread_initializer
+from msg_pipeline import EXTRACT_PROMPT, MessagePipeline, format_line, harvest_messages, parse_events
+from schedule_filter import ScheduleFilter
+from time_parser import match_request, parse
+from response_cache import ResponseCache
+from storage import describe_conflicts, normalize_end, open_storage, split_start_time
+from calendar_grid import BLANK_CELL, CalendarGrid
+from refresh_scheduler import RefreshScheduler
+from agent_worker import AgentWorker
+from command_bus import AddEvent, AddRule, CommandBus, DeleteEvent, DeleteRule, ModifyEvent
+from recurrence import Rule, format_rrule, parse_rrule
+from lazy_loader import LazyLoader
 
-from langchain_core.tools import tool
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.tools import Tool
+# langchain 和 wxauto 导入较慢，在窗口显示后由预热线程或第一次使用时导入（见 init_agent / wechat）
 import functools
+import threading
 
-DATA_FILE = "calendar_events.json"
+# 存储后端：json（calendar_events.json）/ sqlite（langchain.db）/ memory
+STORAGE_BACKEND = os.environ.get("CALENDAR_STORAGE", "json")
+# 只处理这些微信会话 / 发送者的消息（逗号分隔），为空时不限制
+WX_SESSIONS = [s for s in os.environ.get("CALENDAR_WX_SESSIONS", "").split(",") if s]
+WX_SENDERS = [s for s in os.environ.get("CALENDAR_WX_SENDERS", "").split(",") if s]
+# 回答缓存：有效秒数；磁盘层的 shelve 文件名，为空时只缓存在内存中
+RESPONSE_CACHE_TTL = float(os.environ.get("CALENDAR_RESPONSE_CACHE_TTL", "600"))
+RESPONSE_CACHE_FILE = os.environ.get("CALENDAR_RESPONSE_CACHE", "") or None
 COLORS = {
     "event_day": "#FF9999",
     "current_day": "#99CCFF",
     "normal_day": "#FFFFFF"
 }
+# 繁忙程度热力色：1 条、2 条、3~4 条、5 条及以上
+HEATMAP_COLORS = [COLORS["event_day"], "#FF7777", "#FF5555", "#FF3333"]
+# 窗口显示后多久开始在后台预热 agent 和 wxauto
+WARMUP_DELAY_MS = 200
+# agent 工具等待主线程应用新增（并检查冲突）的最长秒数，超时后命令仍在队列中，稍后生效
+TOOL_WAIT_SECONDS = 10
+TOOL_PENDING = "已提交，稍后生效"
+# 添加对话框中的重复选项
+REPEAT_RULES = {
+    "不重复": None,
+    "每天": "FREQ=DAILY",
+    "每个工作日": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "每周": "FREQ=WEEKLY",
+    "每两周": "FREQ=WEEKLY;INTERVAL=2",
+    "每月": "FREQ=MONTHLY",
+}
 
 
-@tool
-def add_schedule(start_time : str, description : str) -> str: 
-    """ 新增日程，比如2024-05-03 20:00:00, 周会 """
+def is_valid_time(time_str: str) -> bool:
+    """
+    尝试通过 datetime 解析时间（允许灵活格式需调整）
+    """
+    try:
+        datetime.strptime(time_str, "%H:%M:%S")
+        return True
+    except ValueError:
+        return False
 
-    print(start_time,description)
-    date = start_time.split()[0]
-    time = start_time.split()[1]
 
-    app.add_one_event(date,time,description)
+def add_schedule(start_time : str, description : str, end_time : str = "") -> str: 
+    """ 新增日程，比如2024-05-03 20:00:00, 周会；end_time 为可选的结束时间，比如2024-05-03 21:00:00。与已有日程时间冲突时不新增 """
 
-        
+    print(start_time,description,end_time)
+    try:
+        date, time = split_start_time(start_time)
+        end = normalize_end(date, time, end_time)
+    except ValueError as e:
+        return str(e)
+
+    # 工具在 agent 工作线程中执行，只提交命令，由主线程应用并检查冲突
+    future = app.command_bus.submit(AddEvent(date, time, description, end, check=True))
+    try:
+        conflicts = future.result(TOOL_WAIT_SECONDS)
+    except concurrent.futures.TimeoutError:
+        return TOOL_PENDING
+    if conflicts:
+        return f"时间冲突，未新增：与 {describe_conflicts(conflicts)} 重叠"
     return "true"
 
+def add_schedules(schedules : list[list[str]]) -> str:
+    """ 批量新增日程，每一项为 [开始时间, 描述] 或 [开始时间, 描述, 结束时间]，比如 [["2024-05-03 20:00:00", "周会"], ["2024-05-04 09:00:00", "体检", "2024-05-04 11:00:00"]]。与已有日程时间冲突的项不新增 """
+
+    print(schedules)
+    items = []
+    for item in schedules:
+        try:
+            start_time, description, *end_time = item
+            date, time = split_start_time(start_time)
+            end = normalize_end(date, time, end_time[0] if end_time else None)
+        except ValueError:
+            return f"无法识别的日程：{item}"
+        items.append(AddEvent(date, time, description, end, check=True))
+
+    futures = app.command_bus.submit_many(items)
+    skipped = []
+    for item, future in zip(items, futures):
+        try:
+            conflicts = future.result(TOOL_WAIT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            return f"{len(items)}条日程{TOOL_PENDING}"
+        if conflicts:
+            skipped.append(f"{item.date} {item.time} {item.description}（与 {describe_conflicts(conflicts)} 重叠）")
+    result = f"已新增{len(items) - len(skipped)}条日程"
+    if skipped:
+        result += "，时间冲突未新增：" + "；".join(skipped)
+    return result
+
+def add_recurring_schedule(start_time : str, description : str, rrule : str, end_time : str = "") -> str:
+    """ 新增重复日程，只保存一条规则。rrule 为 iCalendar 风格的重复规则，比如 每周一三五的站会：2025-03-03 09:30:00, 站会, FREQ=WEEKLY;BYDAY=MO,WE,FR；
+    支持 FREQ=DAILY/WEEKLY/MONTHLY、INTERVAL、BYDAY、COUNT、UNTIL=20250630。end_time 为可选的每次结束时间，比如10:00:00 """
+
+    print(start_time,description,rrule,end_time)
+    try:
+        date, time = split_start_time(start_time)
+        end = normalize_end(date, time, end_time)
+        rule = Rule(None, date, time, description, **parse_rrule(rrule), end=end[11:] if end else None)
+    except ValueError as e:
+        return f"无法识别的重复日程：{e}"
+    try:
+        rule = app.command_bus.submit(AddRule(rule)).result(TOOL_WAIT_SECONDS)
+    except concurrent.futures.TimeoutError:
+        return f"重复日程{TOOL_PENDING}"
+    return f"已新增重复日程 {rule.id}：{rule.start} {rule.time} {rule.description}（{format_rrule(rule)}）"
+
 class CalendarApp:
     def __init__(self, root):
         self.root = root
         self.root.title("智能日历管理系统V1")
         self.root.geometry("800x680")
         
-        self.events = self.load_events()
+        self.storage = open_storage(STORAGE_BACKEND)
+        # 只读问题的回答缓存，任何增删都会递增 storage.version 使之失效
+        self.response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL, path=RESPONSE_CACHE_FILE)
+        self.storage.version = self.response_cache.restore(self.storage.fingerprint())
+        # 连续修改合并为一次界面刷新和一次写盘
+        self.scheduler = RefreshScheduler(self.root,
+                                          render=self.update_calendar,
+                                          persist=self.storage.flush,
+                                          max_latency_ms=100)
+        # 所有修改都以命令提交，在主线程按批应用，每批刷新 / 写盘一次
+        self.command_bus = CommandBus(self.root, self.storage,
+                                      on_batch=lambda commands: self.scheduler.mark_dirty())
         self.current_date = datetime.now()
         self.selected_date = None
         
@@ -53,21 +160,47 @@ class CalendarApp:
 
         self.create_widgets()
         self.update_calendar()
-        self.init_agent()
+        # agent 和 wxauto 在窗口显示后于后台构建，提问 / 获取微信消息时还没就绪就等待其完成
+        self.agent_loader = LazyLoader(self.init_agent, "agent")
+        self.wechat_loader = LazyLoader(lambda: importlib.import_module("wxauto"), "wxauto")
+        self.root.after(WARMUP_DELAY_MS, self.warm_up)
+        # agent 在后台线程执行，主线程只负责界面
+        # 本地处理 / 交给模型的请求数
+        self.local_requests = 0
+        self.llm_requests = 0
+        self.agent_worker = AgentWorker(self.root, self.mock_qa_engine,
+                                        on_change=self.update_pending)
+
+        # 关闭窗口时把数据刷到磁盘
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def warm_up(self):
+        self.agent_loader.warm_up()
+        self.wechat_loader.warm_up()
+
+    def wechat(self):
+        """新建 wxauto.WeChat 实例"""
+        return self.wechat_loader.get().WeChat()
+
+    def wx_harvester(self):
+        """手动获取和后台监听共用的 IncrementalHarvester，两边的高水位写同一个文件，只能有一个实例"""
+        if self.harvester is None:
+            self.harvester = IncrementalHarvester(self.wechat(), is_time_marker=is_valid_time)
+        return self.harvester
 
     def add_one_event(self,date,time,desc):
 
-        event_list = self.events.get(date, [])
-        
         # # 添加事件
-        event_list.append({
-            "time": time,
-            "description": desc
-        })
-        event_list.sort(key=lambda x: x["time"])
-        self.events[date] = event_list
-        self.save_events()
-        self.update_calendar()
+        return self.command_bus.submit(AddEvent(date, time, desc))
+
+    def add_events(self, items, check=False):
+        """批量添加事件，只保存和刷新一次
+
+        Args:
+            items (list): [(date, time, desc), ...] 或 [(date, time, desc, end), ...]
+            check (bool): 是否跳过与已有事件时间冲突的项
+        """
+        return self.command_bus.submit_many([AddEvent(*item, check=check) for item in items])
 
     def create_widgets(self):
         # 主界面布局
@@ -126,9 +259,13 @@ class CalendarApp:
         ttk.Button(control_frame, text="添加事件", 
                  command=self.add_event).pack(side=tk.RIGHT, padx=5)
         
-        # 日历显示区域
+        # 日历显示区域：网格只创建一次，之后按差异刷新
         self.cal_frame = ttk.Frame(parent)
         self.cal_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.cell_days = [0] * 42
+        self.calendar_grid = CalendarGrid(self.cal_frame,
+                                          on_click=self.on_cell_click,
+                                          on_render=self.report_render)
     
     def create_event_interface(self, parent):
         """创建事件列表界面"""
@@ -204,6 +341,12 @@ class CalendarApp:
         # 获取微信消息
         ttk.Button(button_frame, text="获取微信消息",
                 command=self.get_wx_msg).pack(side=tk.LEFT)
+        # 后台监听微信新消息
+        self.listener = None
+        self.harvester = None
+        self.listen_btn = ttk.Button(button_frame, text="监听微信",
+                command=self.toggle_wx_listener)
+        self.listen_btn.pack(side=tk.LEFT)
         # 清空历史按钮
         ttk.Button(button_frame, text="清空历史",
                 command=self.clear_chat_history).pack(side=tk.LEFT)
@@ -212,39 +355,128 @@ class CalendarApp:
         ttk.Button(button_frame, text="帮助",
                 command=self.show_help).pack(side=tk.RIGHT)
 
+        # 进行中的请求
+        status_frame = ttk.Frame(qa_frame)
+        status_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        self.pending_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.pending_var).pack(side=tk.LEFT)
+        # 微信消息处理进度
+        self.wx_progress_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.wx_progress_var).pack(side=tk.LEFT, padx=10)
+        # 回答缓存命中情况
+        self.cache_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.cache_var).pack(side=tk.LEFT, padx=10)
+        self.pipeline = None
+        # 发给模型之前先筛掉不含时间表达的消息
+        self.schedule_filter = ScheduleFilter(WX_SESSIONS, WX_SENDERS)
+        self.listen_filter = ScheduleFilter(WX_SESSIONS, WX_SENDERS)
+        self.stream_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(status_frame, text="流式",
+                variable=self.stream_var).pack(side=tk.RIGHT)
+        ttk.Button(status_frame, text="取消",
+                command=self.cancel_queries).pack(side=tk.RIGHT)
+
     def get_wx_msg(self):
-        def is_valid_time(time_str: str) -> bool:
-            """
-            尝试通过 datetime 解析时间（允许灵活格式需调整）
-            """
-            try:
-                datetime.strptime(time_str, "%H:%M:%S")
-                return True
-            except ValueError:
-                return False
-        
-        def get_more_messages(wx,name):
-            wx.ChatWith(name)
-            wx.rollToTop()
-            msgs = wx.GetAllMessage()
-            msg_list = []
-            switch =False
-            for msg in msgs:
-                if switch:
-                    print('%s : %s' % (msg[0], msg[1]))
-                    msg_list.append(msg[0]+ msg[1])
-                    if(msg[0]!='SYS'):
-                        self.user_input.insert(tk.END,msg[0]+msg[1]+'\n') 
+        """获取微信新消息并提取日程：消息不再进入输入框，界面只显示进度和新增的日程"""
+        if self.pipeline is not None:
+            self._add_message("微信：上一次获取还没有完成", "system")
+            return
+        harvester = self.wx_harvester()
+        wx = harvester.wx
+        self.schedule_filter.reset()
+        # 高水位在消息提取成功后才写回（_on_pipeline_result / _on_pipeline_done）
+        self.pipeline = MessagePipeline(harvest_messages(harvester, defer_save=True), self.extract_events,
+                                        keep=self.schedule_filter, init=lambda: thread_initializer(wx))
+        threading.Thread(target=self._run_pipeline, args=(self.pipeline, harvester),
+                         name='wx-extract', daemon=True).start()
+
+    def extract_events(self, batch):
+        """一包微信消息交给模型提取日程（在提取线程中执行）"""
+        prompt = EXTRACT_PROMPT.format(current_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                       messages="\n".join(format_line(m) for m in batch))
+        self.agent_loader.get()
+        return parse_events(self.llm.invoke(prompt).content)
+
+    def _run_pipeline(self, pipeline, harvester):
+        """逐包提取，每包的结果交给主线程"""
+        error = None
+        try:
+            for batch, events in pipeline:
+                done = harvester.done_before(batch[-1].session)
+                self.agent_worker.call_in_ui(self._on_pipeline_result, pipeline, events, harvester, done)
+        except Exception as e:
+            error = e
+        self.agent_worker.call_in_ui(self._on_pipeline_done, pipeline, harvester, error)
+
+    def _on_pipeline_result(self, pipeline, events, harvester, done):
+        if events:
+            # 主线程中提交，返回时已应用
+            futures = self.add_events(events, check=True)
+            for (date, time, desc), future in zip(events, futures):
+                conflicts = future.result()
+                if conflicts:
+                    self._add_message(f"微信：{date} {time} {desc} 与 {describe_conflicts(conflicts)} 时间冲突，未新增", "system")
                 else:
-                    switch = is_valid_time(msg[1])
-            return msg_list
-        msgs_list=[]
-        wx = WeChat()
-        name_list = wx.GetAllSessionList()
-        for name in name_list:
-            msgs_list.append(get_more_messages(wx, name))
-        
+                    self._add_message(f"微信：新增日程 {date} {time} {desc}", "system")
+        # 之前的会话的消息都已提取并新增，可以标记为已读
+        if done:
+            harvester.commit(done)
+        p = pipeline.progress()
+        self.wx_progress_var.set(f"微信：已读 {p['read']} 条，有效 {p['kept']} 条，"
+                                 f"已提取 {p['extracted']}/{p['chunks']} 包")
+
+    def _on_pipeline_done(self, pipeline, harvester, error):
+        self.pipeline = None
+        p = pipeline.progress()
+        self.wx_progress_var.set("")
+        if error is None and pipeline.complete:
+            harvester.commit()
+        else:
+            # 没有提取完的会话保留获取之前的高水位，下次重新读取
+            harvester.rollback()
+            harvester.save()
+        if error is not None:
+            self._add_message(f"微信：获取失败：{error}", "system")
+        r = self.schedule_filter.report(pipeline.budget)
+        self._add_message(f"微信：会话 {harvester.sessions_seen} 个，打开 {harvester.sessions_visited} 个，"
+                          f"新消息 {p['read']} 条，候选 {r['passed']}/{r['seen']} 条（命中率 {r['hit_rate']:.0%}），"
+                          f"分 {p['chunks']} 包提取，省下约 {r['calls_avoided']} 次模型调用", "system")
 
+    def toggle_wx_listener(self):
+        """开始/停止后台监听微信新消息，新消息按批次交给助手提取日程"""
+        if self.listener is not None:
+            self.listener.stop()
+            stats = self.listener.stats()
+            r = self.listen_filter.report()
+            print(f"监听结束：轮询 {stats['polls']} 次，平均 {stats['poll_ms']:.1f}ms，"
+                  f"CPU {stats['cpu_percent']:.1f}%，新消息 {stats['messages']} 条，"
+                  f"候选 {r['passed']} 条，省下 {r['calls_avoided']} 次助手调用")
+            self.listener = None
+            self.listen_btn.configure(text="监听微信")
+            return
+        self.listen_filter.reset()
+        harvester = self.wx_harvester()
+        self.listener = MessageListener(harvester.wx, harvester=harvester)
+        # 回调在监听线程中执行，交给主线程处理
+        self.listener.subscribe(lambda batch: self.agent_worker.call_in_ui(self.on_wx_batch, batch))
+        self.listener.start()
+        self.listen_btn.configure(text="停止监听")
+
+    def on_wx_batch(self, batch):
+        """一批微信新消息合并成一个请求提交给助手；没有候选消息的批次不发给助手"""
+        batch = self.listen_filter.filter_batch(batch)
+        if not batch:
+            return
+        lines = [f"{msg[0]}：{msg[1]}" for msgs in batch.values() for msg in msgs]
+        question = "以下是微信新消息，请提取其中的日程并添加：\n" + "\n".join(lines)
+        self._add_message(f"微信：收到 {len(batch)} 个会话的 {len(lines)} 条新消息", "system")
+        request = self.agent_worker.submit(
+            question,
+            on_done=lambda answer: self._add_message(f"助手：{answer}", "bot"),
+            on_error=lambda e: self._add_message(f"助手：请求失败：{e}", "system"),
+        )
+        if request is None:
+            self._add_message("助手：请求过多，本批微信消息未处理", "system")
 
     def clear_chat_history(self):
         """清空对话历史"""
@@ -291,7 +523,7 @@ class CalendarApp:
         
         try:
             # 获取原始事件信息
-            original_event = self.events[self.selected_date][selection[0]]
+            original_event = self.storage.get_by_date(self.selected_date)[selection[0]]
             
             # 创建修改对话框
             dialog = tk.Toplevel(self.root)
@@ -317,11 +549,19 @@ class CalendarApp:
             desc_entry.grid(row=2, column=1, padx=5, pady=5)
             desc_entry.insert(0, original_event["description"])
             
+            # 结束时间输入（可选）
+            ttk.Label(dialog, text="结束时间 (可选):").grid(row=3, column=0, padx=5, pady=5)
+            end_entry = ttk.Entry(dialog)
+            end_entry.grid(row=3, column=1, padx=5, pady=5)
+            original_end = original_event.get("end", "")
+            end_entry.insert(0, original_end[11:] if original_end[:10] == self.selected_date else original_end)
+            
             def on_confirm():
                 # 获取输入值
                 new_date = date_entry.get().strip()
                 new_time = time_entry.get().strip()
                 new_desc = desc_entry.get().strip()
+                new_end = end_entry.get().strip() or None
                 
                 # 验证输入
                 if not all([new_date, new_time, new_desc]):
@@ -335,34 +575,27 @@ class CalendarApp:
                 if not self.validate_time(new_time):
                     messagebox.showerror("错误", "无效时间格式")
                     return
+                # '2024-5-3'、'9:0:0' 之类的输入规范化后再检查冲突和保存
+                new_date, new_time = split_start_time(f"{new_date} {new_time}")
+                
+                if new_end and not self.validate_end(new_date, new_time, new_end):
+                    messagebox.showerror("错误", "无效结束时间格式")
+                    return
                 
                 # 检查时间冲突（排除自身）
-                if new_date == self.selected_date:
-                    events = [e for idx, e in enumerate(self.events[self.selected_date]) 
-                            if idx != selection[0]]
-                else:
-                    events = self.events.get(new_date, [])
-                    
-                if any(e["time"] == new_time for e in events):
-                    messagebox.showerror("错误", "目标时间已有安排")
+                conflicts = self.storage.conflicts(
+                    new_date, new_time, new_end,
+                    ignore=(self.selected_date, original_event["time"], original_event["description"]))
+                if conflicts:
+                    messagebox.showerror("错误", f"目标时间已有安排：{describe_conflicts(conflicts)}")
                     return
                     
                 # 执行修改
                 try:
-                    # 删除原事件
-                    del self.events[self.selected_date][selection[0]]
-                    if not self.events[self.selected_date]:
-                        del self.events[self.selected_date]
-                    
-                    # 添加新事件
-                    self.events.setdefault(new_date, []).append({
-                        "time": new_time,
-                        "description": new_desc
-                    })
-                    self.events[new_date].sort(key=lambda x: x["time"])
-                    
-                    self.save_events()
-                    self.update_calendar()
+                    # 删除原事件、添加新事件（主线程中提交，返回时已经生效）
+                    self.command_bus.submit(ModifyEvent(
+                        self.selected_date, original_event["time"], original_event["description"],
+                        new_date, new_time, new_desc, new_end)).result()
                     dialog.destroy()
                     
                     # 如果修改了日期，需要更新选中日期
@@ -370,13 +603,12 @@ class CalendarApp:
                         year, month, day = map(int, new_date.split('-'))
                         self.current_date = datetime(year, month, 1)
                         self.selected_date = new_date
-                        self.update_calendar()
                     
                     self.show_events(int(new_date.split('-')[2]))
                 except Exception as e:
                     messagebox.showerror("错误", f"修改失败: {str(e)}")
             
-            ttk.Button(dialog, text="确认修改", command=on_confirm).grid(row=3, columnspan=2, pady=10)
+            ttk.Button(dialog, text="确认修改", command=on_confirm).grid(row=4, columnspan=2, pady=10)
             
             # 居中对话框
             dialog.update_idletasks()
@@ -423,28 +655,133 @@ class CalendarApp:
         # 允许Shift+Enter换行
         return None
     def process_query(self):
-        """处理用户查询"""
+        """处理用户查询：提交到后台线程后立即返回，可以继续输入"""
         question = self.user_input.get("1.0", "end-1c").strip()  # 获取多行文本
         if not question:
             return
         
         self._add_message(f"您：{question}", "user")
-        answer = self.mock_qa_engine(question)
-        self._add_message(f"助手：{answer}", "bot") 
+        if self.stream_var.get():
+            request = self._submit_streaming(question)
+        else:
+            request = self.agent_worker.submit(
+                question,
+                on_done=lambda answer: self._add_message(f"助手：{answer}", "bot"),
+                on_error=lambda e: self._add_message(f"助手：请求失败：{e}", "system"),
+            )
+        if request is None:
+            self._add_message("助手：请求过多，请稍后再试", "system")
+            return
         self.user_input.delete("1.0", tk.END)  # 清空输入框
+
+    def _submit_streaming(self, question):
+        """以流式方式提交请求，回答边生成边追加到对话历史"""
+        mark = None
+        request = None
+
+        def on_token(text):
+            nonlocal mark
+            if mark is None:
+                mark = self._begin_stream_message(request.id)
+            self._append_stream(mark, text)
+
+        def on_done(answer):
+            nonlocal mark
+            ttft = request.time_to_first_token
+            if mark is None:
+                # 没有收到流式输出（例如只调用了工具），直接显示最终回答
+                mark = self._begin_stream_message(request.id)
+                self._append_stream(mark, answer or "")
+            timing = f"首字 {ttft:.2f}s，" if ttft is not None else ""
+            self._append_stream(mark, f"\n（{timing}总耗时 {request.latency:.2f}s）")
+            self.chat_history.mark_unset(mark)
+
+        def on_error(e):
+            if mark is not None:
+                self.chat_history.mark_unset(mark)
+            self._add_message(f"助手：请求失败：{e}", "system")
+
+        request = self.agent_worker.submit(question, on_done=on_done, on_error=on_error, on_token=on_token)
+        return request
+
+    def _begin_stream_message(self, request_id):
+        """在对话历史末尾开始一条助手消息，返回后续追加内容的位置标记"""
+        mark = f"stream{request_id}"
+        self.chat_history.configure(state='normal')
+        self.chat_history.insert(tk.END, "助手：\n\n")
+        # 标记放在末尾两个换行之前，默认右 gravity，插入内容后标记随之后移
+        self.chat_history.mark_set(mark, "end-3c")
+        self.chat_history.configure(state='disabled')
+        return mark
+
+    def _append_stream(self, mark, text):
+        """在标记处追加一段流式输出"""
+        self.chat_history.configure(state='normal')
+        self.chat_history.insert(mark, text)
+        self.chat_history.configure(state='disabled')
+        self.chat_history.see(tk.END)
+
+    def cancel_queries(self):
+        """取消所有进行中的请求"""
+        if self.agent_worker.cancel():
+            self._add_message("助手：已取消进行中的请求", "system")
+
+    def update_pending(self, pending):
+        """更新进行中请求的提示"""
+        self.pending_var.set(f"处理中… {pending} 个请求" if pending else "")
+        self.update_cache_stats()
+
+    def update_cache_stats(self):
+        """显示回答缓存的命中 / 未命中次数"""
+        stats = self.response_cache.stats()
+        if stats['hits'] or stats['misses']:
+            self.cache_var.set(f"缓存 命中 {stats['hits']} / 未命中 {stats['misses']}")
  
-    def mock_qa_engine(self, question):
+    def mock_qa_engine(self, question, on_token=None):
+        # 简单明确的新增 / 查询在本地处理，不调用模型
+        answer = self.answer_locally(question)
+        if answer is not None:
+            return answer
+        # 同一日历版本下问过的问题直接返回缓存的回答；其他进程修改过数据时 sync() 会递增版本号
+        self.storage.sync()
+        key = self.response_cache.key(question, self.storage.version)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+        self.agent_loader.get()
         print(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        res = self.agent_executor.invoke(
-                {
-                    "input": question,
-                    "current_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                },
-                #config={"callbacks": [ConsoleCallbackHandler()]}
-            )
+        inputs = {
+            "input": question,
+            "current_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if on_token is not None:
+            import asyncio
+            output = asyncio.run(self._stream_answer(inputs, on_token))
+        else:
+            res = self.agent_executor.invoke(
+                    inputs,
+                    #config={"callbacks": [ConsoleCallbackHandler()]}
+                )
+            output = res["output"]
         
         print(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        return res["output"]
+        # 回答期间日历被修改过（调用了新增工具、其他进程写入等）时不会写入
+        self.storage.sync()
+        self.response_cache.put(key, output, self.storage.version)
+        return output
+
+    async def _stream_answer(self, inputs, on_token):
+        """通过 astream_events 逐个 token 获取回答"""
+        output = None
+        async for event in self.agent_executor.astream_events(inputs, version="v1"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content:
+                    on_token(content)
+            elif kind == "on_chain_end" and event["name"] == "AgentExecutor":
+                output = event["data"]["output"]["output"]
+        return output
     
     def generate_answer(self, question):
         """生成回答的核心逻辑"""
@@ -473,16 +810,18 @@ class CalendarApp:
         
         # 事件统计
         if "统计" in question or "多少" in question:
-            return f"当前共有 {len(self.events)} 个日期记录了事件，总计 {sum(len(v) for v in self.events.values())} 条事件"
+            days, total = self.storage.stats()
+            return f"当前共有 {days} 个日期记录了事件，总计 {total} 条事件"
         
         # 默认回复
         return "我可以帮助您查询日历事件，请尝试以下问法：\n- 今天有什么安排？\n- 5号有什么事件？\n- 最近三天有什么安排？"
     
     def _get_date_events(self, date_str):
         """获取指定日期事件"""
-        if date_str in self.events:
+        day_events = self.storage.get_by_date(date_str)
+        if day_events:
             events = "\n".join([f"{e['time']} {e['description']}" 
-                              for e in self.events[date_str]])
+                              for e in day_events])
             return f"{date_str} 的安排：\n{events}"
         return "该日期没有安排事件"
     
@@ -490,24 +829,54 @@ class CalendarApp:
         """获取近期事件"""
         today = datetime.now()
         result = []
-        for i in range(days):
-            date = today.replace(day=today.day+i)
-            date_str = date.strftime("%Y-%m-%d")
-            if date_str in self.events:
-                events = "\n".join([f"{e['time']} {e['description']}" 
-                                  for e in self.events[date_str]])
-                result.append(f"{date_str}：\n{events}")
+        for date_str, day_events in self.storage.get_range(today, today + timedelta(days=days)).items():
+            events = "\n".join([f"{e['time']} {e['description']}" 
+                              for e in day_events])
+            result.append(f"{date_str}：\n{events}")
         return "近期安排：\n" + "\n\n".join(result) if result else "近期没有安排"
     
     def _extract_date_from_question(self, question):
         """从问题中提取日期"""
+        expr = parse(question)
+        return expr.date.strftime("%Y-%m-%d") if expr.date else None
+
+    def answer_locally(self, question):
+        """时间表达解析置信度足够高的新增 / 查询请求直接在本地完成（在 agent 工作线程中执行）
+
+        Returns:
+            str|None: 回答；需要交给模型时返回 None
+        """
+        request = match_request(question)
+        if request is None:
+            self.llm_requests += 1
+            return None
+        self.local_requests += 1
+        if request['intent'] == 'add':
+            start = request['start']
+            date, time = start.strftime("%Y-%m-%d"), start.strftime("%H:%M:%S")
+            end = request['end'].strftime("%Y-%m-%d %H:%M:%S") if request['end'] else None
+            future = self.command_bus.submit(AddEvent(date, time, request['description'], end, check=True))
+            try:
+                conflicts = future.result(TOOL_WAIT_SECONDS)
+            except concurrent.futures.TimeoutError:
+                return f"日程 {date} {time} {request['description']} {TOOL_PENDING}"
+            if conflicts:
+                return f"时间冲突，未添加：{date} {time} 已有 {describe_conflicts(conflicts)}"
+            return f"已添加日程：{date} {time}{'~' + end[11:] if end else ''} {request['description']}"
+        start, end = request['start'], request['end']
+        # 在主线程中读取：json / memory 后端的事件表由主线程的命令总线修改，工作线程中遍历可能与之冲突
+        future = self.agent_worker.call_in_ui(self.storage.get_range, start, end + timedelta(days=1))
         try:
-            day = int(''.join(filter(str.isdigit, question)))
-            month = self.current_date.month
-            year = self.current_date.year
-            return f"{year}-{month:02d}-{day:02d}"
-        except:
+            days = future.result(TOOL_WAIT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            # 主线程一直没有空闲，交给模型回答
             return None
+        label = start.strftime("%Y-%m-%d") if start == end else f"{start:%Y-%m-%d} 至 {end:%Y-%m-%d}"
+        if not days:
+            return f"{label} 没有安排"
+        lines = [f"{date} {e['time']}{'~' + e['end'][11:] if e.get('end') else ''} {e['description']}"
+                 for date, events in days.items() for e in events]
+        return f"{label} 的安排：\n" + "\n".join(lines)
     
     def _add_message(self, message, sender):
         """添加消息到对话历史"""
@@ -519,52 +888,54 @@ class CalendarApp:
 
     def update_calendar(self):
         """更新日历显示"""
-        # 清空旧日历
-        for widget in self.cal_frame.winfo_children():
-            widget.destroy()
-        
         # 设置当前年月
         year = self.current_date.year
         month = self.current_date.month
         self.month_var.set(calendar.month_name[month])
         self.year_var.set(str(year))
         
-        # 生成日历数据
+        # 生成日历数据：整月的事件数一次取出
         cal = calendar.monthcalendar(year, month)
-        today = datetime.now().day if datetime.now().month == month and datetime.now().year == year else None
-        
-        # 创建表头
-        headers = [ "一", "二", "三", "四", "五", "六","日"]
-        for col, header in enumerate(headers):
-            ttk.Label(self.cal_frame, text=header,anchor="center",
-                     relief="ridge", width=10).grid(row=0, column=col, sticky="nsew")
-        
-        # 填充日期按钮
-        for week_num, week in enumerate(cal, start=1):
-            for day_num, day in enumerate(week):
-                if day == 0:
-                    continue
-                
-                btn = tk.Button(self.cal_frame, text=str(day),
-                                relief="ridge",
-                                command=lambda d=day: self.show_events(d),
-                                bg=self.get_day_color(day, month, year))
-                btn.grid(row=week_num, column=day_num, sticky="nsew")
-                
-                # 标记今天
-                if day == today:
-                    btn.config(bd=3, relief="sunken")
+        now = datetime.now()
+        today = now.day if now.month == month and now.year == year else None
+        counts = self.storage.month_summary(year, month)
         
-        # 设置网格等宽
-        for col in range(7):
-            self.cal_frame.grid_columnconfigure(col, weight=1)
+        # 计算 6×7 个格子的目标状态
+        cells = []
+        self.cell_days = [day for week in cal for day in week]
+        self.cell_days += [0] * (42 - len(self.cell_days))
+        for day in self.cell_days:
+            if day == 0:
+                cells.append(BLANK_CELL)
+                continue
+            count = counts[day]
+            cells.append({
+                "text": f"{day} ({count})" if count else str(day),
+                "bg": self.get_day_color(count, day == today),
+                "state": tk.NORMAL,
+                # 标记今天
+                "relief": "sunken" if day == today else "ridge",
+                "bd": 3 if day == today else 2,
+            })
+        self.calendar_grid.render(cells)
+
+    def on_cell_click(self, index):
+        """点击日历格子"""
+        day = self.cell_days[index]
+        if day:
+            self.show_events(day)
+
+    def report_render(self, elapsed_ms, changed):
+        """记下最近一次日历刷新的 (耗时ms, 更新的格子数)；每次渲染都会调用，不打印"""
+        self.last_render = (elapsed_ms, changed)
     
-    def get_day_color(self, day, month, year):
-        """获取日期背景颜色"""
-        date_str = f"{year}-{month:02d}-{day:02d}"
-        if date_str in self.events:
-            return COLORS["event_day"]
-        if day == datetime.now().day and month == datetime.now().month and year == datetime.now().year:
+    @staticmethod
+    def get_day_color(count, is_today):
+        """获取日期背景颜色：有事件时按事件数显示热力色"""
+        if count:
+            level = 0 if count == 1 else 1 if count == 2 else 2 if count <= 4 else 3
+            return HEATMAP_COLORS[level]
+        if is_today:
             return COLORS["current_day"]
         return COLORS["normal_day"]
     
@@ -575,9 +946,10 @@ class CalendarApp:
         self.selected_date = f"{year}-{month:02d}-{day:02d}"
         
         self.event_list.delete(0, tk.END)
-        if self.selected_date in self.events:
-            for event in self.events[self.selected_date]:
-                self.event_list.insert(tk.END, f"{event['time']} - {event['description']}")
+        for event in self.storage.get_by_date(self.selected_date):
+            end = event.get("end", "")
+            span = f"{event['time']}~{end[11:] if end[:10] == self.selected_date else end}" if end else event['time']
+            self.event_list.insert(tk.END, f"{span} - {event['description']}{'（重复）' if 'rule' in event else ''}")
     
     def add_event(self):
         """添加事件（整合式对话框版本）"""
@@ -599,6 +971,20 @@ class CalendarApp:
         desc_entry = ttk.Entry(dialog)
         desc_entry.grid(row=2, column=1, padx=5, pady=5)
 
+        ttk.Label(dialog, text="结束时间 (可选):").grid(row=3, column=0, padx=5, pady=5)
+        end_entry = ttk.Entry(dialog)
+        end_entry.grid(row=3, column=1, padx=5, pady=5)
+
+        # 重复：只保存一条规则，按需展开
+        ttk.Label(dialog, text="重复:").grid(row=4, column=0, padx=5, pady=5)
+        repeat_var = tk.StringVar(value="不重复")
+        ttk.Combobox(dialog, textvariable=repeat_var, values=list(REPEAT_RULES),
+                     state="readonly").grid(row=4, column=1, padx=5, pady=5)
+
+        ttk.Label(dialog, text="重复截止 (可选):").grid(row=5, column=0, padx=5, pady=5)
+        until_entry = ttk.Entry(dialog)
+        until_entry.grid(row=5, column=1, padx=5, pady=5)
+
         # 设置默认值
         if self.selected_date:
             date_entry.insert(0, self.selected_date)
@@ -611,6 +997,7 @@ class CalendarApp:
             date_str = date_entry.get().strip()
             time_str = time_entry.get().strip()
             description = desc_entry.get().strip()
+            end_str = end_entry.get().strip() or None
 
             # 输入验证
             if not all([date_str, time_str, description]):
@@ -624,27 +1011,41 @@ class CalendarApp:
             if not self.validate_time(time_str):
                 messagebox.showerror("错误", "无效时间格式")
                 return
+            # '2024-5-3'、'9:0:0' 之类的输入规范化后再检查冲突和保存
+            date_str, time_str = split_start_time(f"{date_str} {time_str}")
 
-            # 检查时间冲突
-            event_list = self.events.get(date_str, [])
-            if any(event["time"] == time_str for event in event_list):
-                messagebox.showerror("错误", "该时间已有安排")
+            if end_str and not self.validate_end(date_str, time_str, end_str):
+                messagebox.showerror("错误", "无效结束时间格式")
                 return
 
-            # 添加事件
-            event_list.append({
-                "time": time_str,
-                "description": description
-            })
-            event_list.sort(key=lambda x: x["time"])
-            self.events[date_str] = event_list
-            self.save_events()
-            self.update_calendar()
+            # 检查时间冲突：与已有事件的时间段重叠（重复事件只检查第一次）
+            conflicts = self.storage.conflicts(date_str, time_str, end_str)
+            if conflicts:
+                messagebox.showerror("错误", f"该时间已有安排：{describe_conflicts(conflicts)}")
+                return
+
+            rrule = REPEAT_RULES[repeat_var.get()]
+            if rrule is None:
+                # 添加事件
+                self.command_bus.submit(AddEvent(date_str, time_str, description, end_str))
+                dialog.destroy()
+                return
+
+            until_str = until_entry.get().strip()
+            if until_str and not (self.validate_date(until_str)
+                                  and split_start_time(f"{until_str} {time_str}")[0] >= date_str):
+                messagebox.showerror("错误", "无效重复截止日期")
+                return
+            if until_str:
+                rrule += f";UNTIL={until_str}"
+            end = normalize_end(date_str, time_str, end_str)
+            self.command_bus.submit(AddRule(Rule(None, date_str, time_str, description, **parse_rrule(rrule),
+                                                 end=end[11:] if end else None)))
             dialog.destroy()
 
         # 确认按钮
         ttk.Button(dialog, text="确认添加", 
-                command=on_confirm).grid(row=3, columnspan=2, pady=10)
+                command=on_confirm).grid(row=6, columnspan=2, pady=10)
 
         # 居中对话框
         dialog.update_idletasks()
@@ -671,15 +1072,20 @@ class CalendarApp:
             # 直接使用已存储的正确日期格式
             date_str = self.selected_date
             
-            if messagebox.askyesno("确认", "确定要删除该事件吗？"):
+            event = self.storage.get_by_date(date_str)[selection[0]]
+            if "rule" in event:
+                # 重复事件：是 - 只删除这一次（记为例外日期），否 - 删除整个系列
+                answer = messagebox.askyesnocancel("确认", "这是重复事件。\n是：只删除这一次\n否：删除全部重复")
+                if answer is None:
+                    return
+                if answer:
+                    self.command_bus.submit(DeleteEvent(date_str, event["time"], event["description"]))
+                else:
+                    self.command_bus.submit(DeleteRule(event["rule"]))
+                self.show_events(int(date_str.split('-')[2]))
+            elif messagebox.askyesno("确认", "确定要删除该事件吗？"):
                 # 删除指定索引的事件
-                del self.events[date_str][selection[0]]
-                
-                # 如果当天没有事件了，删除日期键
-                if not self.events[date_str]:
-                    del self.events[date_str]
-                
-                self.save_events()
+                self.command_bus.submit(DeleteEvent(date_str, event["time"], event["description"]))
                 # 刷新事件列表显示
                 self.show_events(int(date_str.split('-')[2]))
         except KeyError as e:
@@ -717,28 +1123,47 @@ class CalendarApp:
         except ValueError:
             return False
     
-    def load_events(self):
-        """加载事件数据"""
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
-        return {}
+    @staticmethod
+    def validate_end(date_str, time_str, end_str):
+        """验证结束时间：HH:MM:SS（不晚于开始时视为次日）或晚于开始的 YYYY-MM-DD HH:MM:SS"""
+        try:
+            return normalize_end(date_str, time_str, end_str) > f"{date_str} {time_str}"
+        except ValueError:
+            return False
     
-    def save_events(self):
-        """保存事件数据"""
-        with open(DATA_FILE, 'w') as f:
-            json.dump(self.events, f, indent=2)
+    def on_close(self):
+        """退出程序"""
+        if self.listener is not None:
+            self.listener.stop(timeout=2)
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        self.agent_worker.shutdown()
+        self.command_bus.close()
+        stats = self.command_bus.stats()
+        print(f"命令 {stats['applied']} 条，{stats['batches']} 批，最大队列深度 {stats['max_depth']}，"
+              f"提交到生效 p50 {stats['latency_p50_ms']:.1f}ms / p95 {stats['latency_p95_ms']:.1f}ms")
+        self.scheduler.flush()
+        self.storage.close()
+        self.response_cache.close(self.storage.fingerprint(), self.storage.version)
+        self.root.destroy()
         
     def init_agent(self):
+        """导入 langchain 并构建 agent，由 agent_loader 在预热线程或第一次提问时调用"""
+        from langchain.agents import AgentExecutor, create_tool_calling_agent
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.tools import tool
+        from langchain_openai import ChatOpenAI
+
         self.llm = ChatOpenAI(
             model="deepseek-chat",  # 根据DeepSeek实际模型名称调整
             openai_api_base="https://api.deepseek.com/v1",  # DeepSeek的API地址
             openai_api_key="sk-d07a8f9ffccb436fbc39f64317859243",
             temperature=0.3,  # 降低随机性
             max_tokens=500,   # 限制输出长度
-            top_p=0.9
+            top_p=0.9,
+            streaming=True    # 支持流式输出
         ) 
-        self.tools = [ add_schedule ]
+        self.tools = [ tool(add_schedule), tool(add_schedules), tool(add_recurring_schedule) ]
         # self.tools = []
         # self.tools.append(
         #     Tool(
@@ -754,7 +1179,8 @@ class CalendarApp:
             [
                 (
                     "system",
-                    "你是一个日程管理助手",
+                    "你是一个日程管理助手。"
+                    "需要新增多条日程时，请把它们放在一次 add_schedules 调用中批量新增，不要逐条调用 add_schedule。",
                 ),
                 ("placeholder", "{chat_history}"),
                 ("user", "{input} \n\n 当前时间为：{current_time}"),
@@ -763,6 +1189,7 @@ class CalendarApp:
         )
         self.agent = create_tool_calling_agent(self.llm_with_tools, self.tools, self.prompt)
         self.agent_executor = AgentExecutor(agent=self.agent, tools=self.tools, verbose=False)
+        return self.agent_executor
 if __name__ == "__main__":
     root = tk.Tk()
     global app 
@@ -0,0 +1,236 @@
+"""
+在后台线程中运行 agent
+
+agent_executor.invoke 一次要等几秒的网络往返，直接在 Tk 主线程调用会卡住整个窗口。
+AgentWorker 把请求放进有界队列，由工作线程执行；结果和工具产生的界面操作
+都放进结果队列，由主线程通过 root.after 轮询取出执行，工作线程从不直接操作 Tk 控件。
+
+流式输出时，工作线程产生的 token 先追加到请求自己的缓冲区，主线程每次轮询
+（默认约 30 帧/秒）把缓冲区中的内容合并成一次回调，避免每个 token 都触发一次 Tk 插入。
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class AgentRequest:
+    """一次 agent 请求"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, question, on_done, on_error, on_token=None):
+        self.id = next(self._ids)
+        self.question = question
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_token = on_token
+        self.cancelled = False
+        self.submitted_at = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self._tokens = []
+        self._tokens_lock = threading.Lock()
+
+    def emit(self, token):
+        """工作线程中调用：追加一段流式输出"""
+        with self._tokens_lock:
+            if self.first_token_at is None:
+                self.first_token_at = time.monotonic()
+            self._tokens.append(token)
+
+    def take_tokens(self):
+        """主线程中调用：取出缓冲区中的全部输出"""
+        with self._tokens_lock:
+            text = ''.join(self._tokens)
+            self._tokens.clear()
+        return text
+
+    @property
+    def time_to_first_token(self):
+        """首个 token 的延迟（秒），没有流式输出时为 None"""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.submitted_at
+
+    @property
+    def latency(self):
+        """总耗时（秒）"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+    def __repr__(self):
+        return f"<AgentRequest {self.id}: {self.question[:20]!r}>"
+
+
+class AgentWorker:
+    """agent 请求的后台执行器
+
+    Args:
+        root: Tk 根窗口
+        runner (callable): 在工作线程中执行 runner(question) -> answer；
+            流式请求执行 runner(question, on_token=request.emit)
+        workers (int): 工作线程数，即同时进行中的请求数
+        max_pending (int): 排队中的请求上限，超过时 submit 返回 None
+        poll_ms (int): 主线程轮询结果的间隔
+        on_change (callable, optional): 进行中的请求数变化时在主线程回调 on_change(pending)
+    """
+
+    def __init__(self, root, runner, workers=2, max_pending=8, poll_ms=33, on_change=None):
+        self.root = root
+        self.runner = runner
+        self.poll_ms = poll_ms
+        self.on_change = on_change
+        self._requests = queue.Queue(maxsize=max_pending)
+        self._results = queue.Queue()
+        self._active = set()
+        self._lock = threading.Lock()
+        self._ui_thread = threading.current_thread()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"agent-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    @property
+    def pending(self):
+        """排队中和执行中的请求数"""
+        with self._lock:
+            return len(self._active)
+
+    def submit(self, question, on_done, on_error=None, on_token=None):
+        """提交请求，on_done(answer) / on_error(exc) / on_token(text) 在主线程回调
+
+        Args:
+            on_token (callable, optional): 传入时以流式方式执行，每次轮询合并回调一次
+
+        Returns:
+            AgentRequest: 请求对象；队列已满时返回 None
+        """
+        request = AgentRequest(question, on_done, on_error, on_token)
+        try:
+            self._requests.put_nowait(request)
+        except queue.Full:
+            return None
+        with self._lock:
+            self._active.add(request)
+        self._notify()
+        return request
+
+    def cancel(self, request=None):
+        """取消请求，request 为 None 时取消全部
+
+        已经发出的网络请求无法中断，它的结果会被丢弃。
+
+        Returns:
+            int: 被取消的请求数
+        """
+        with self._lock:
+            targets = [request] if request is not None else list(self._active)
+            for r in targets:
+                r.cancelled = True
+                self._active.discard(r)
+        self._notify()
+        return len(targets)
+
+    def call_in_ui(self, fn, *args):
+        """在主线程中执行 fn(*args)，供工作线程中的工具函数操作界面
+
+        Returns:
+            Future: fn 的返回值
+        """
+        future = Future()
+        if threading.current_thread() is self._ui_thread:
+            self._run(future, fn, args)
+        else:
+            self._results.put((self._run, (future, fn, args)))
+        return future
+
+    @staticmethod
+    def _run(future, fn, args):
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _work(self):
+        while True:
+            request = self._requests.get()
+            if request is _STOP:
+                return
+            if request.cancelled:
+                continue
+            try:
+                if request.on_token is not None:
+                    answer = self.runner(request.question, on_token=request.emit)
+                else:
+                    answer = self.runner(request.question)
+            except Exception as e:
+                request.finished_at = time.monotonic()
+                self._results.put((self._finish, (request, None, e)))
+            else:
+                request.finished_at = time.monotonic()
+                self._results.put((self._finish, (request, answer, None)))
+
+    def _finish(self, request, answer, error):
+        with self._lock:
+            if request.cancelled:
+                return
+            self._active.discard(request)
+        self._deliver_tokens(request)
+        self._notify()
+        if error is None:
+            request.on_done(answer)
+        elif request.on_error is not None:
+            request.on_error(error)
+        else:
+            print(f"agent 请求失败：{request} {error}")
+
+    def _notify(self):
+        if self.on_change is None:
+            return
+        if threading.current_thread() is self._ui_thread:
+            self.on_change(self.pending)
+        else:
+            self._results.put((lambda: self.on_change(self.pending), ()))
+
+    @staticmethod
+    def _deliver_tokens(request):
+        if request.on_token is None:
+            return
+        text = request.take_tokens()
+        if text:
+            request.on_token(text)
+
+    def _poll(self):
+        with self._lock:
+            active = list(self._active)
+        for request in active:
+            self._deliver_tokens(request)
+        while True:
+            try:
+                fn, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"界面回调执行失败：{e}")
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        """取消全部请求并停止轮询"""
+        self.cancel()
+        self.root.after_cancel(self._poll_id)
+        for _ in self._threads:
+            try:
+                self._requests.put_nowait(_STOP)
+            except queue.Full:
+                # 队列里剩下的都是已取消的请求，工作线程是守护线程，随进程退出
+                break
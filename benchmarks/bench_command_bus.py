@@ -0,0 +1,169 @@
+"""
+命令总线基准（无界面）：多个生产线程并发新增日程，比较应用方式
+
+call_in_ui：原做法，每条新增作为一个回调交给主线程（AgentWorker 每 33ms 取一次结果队列），
+            回调中 storage.add + 标记刷新，16ms 后写盘
+bus       ：command_bus.CommandBus，主线程每 16ms 取一批命令，连续新增合并为一次 add_many，每批写盘一次
+
+主线程用一个简单的事件循环代替 Tk 的 after。存储为临时目录中的 JsonStorage（快照 + 追加日志）
+或 SqliteStorage（--backend sqlite，每次 add 一个事务，add_many 合并为一个事务）。
+输出总耗时、提交到生效的延迟（p50/p95）、写盘次数和最大队列深度。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_command_bus
+    python -m benchmarks.bench_command_bus --producers 8 --commands 1000
+    python -m benchmarks.bench_command_bus --backend sqlite --rate 200
+"""
+import argparse
+import heapq
+import itertools
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from command_bus import AddEvent, CommandBus
+from storage import open_storage
+
+
+class EventLoop:
+    """只实现 after / after_cancel 的主线程事件循环"""
+
+    def __init__(self):
+        self._timers = []
+        self._ids = itertools.count()
+        self._cancelled = set()
+
+    def after(self, ms, fn, *args):
+        timer_id = next(self._ids)
+        heapq.heappush(self._timers, (time.monotonic() + ms / 1000, timer_id, fn, args))
+        return timer_id
+
+    def after_cancel(self, timer_id):
+        self._cancelled.add(timer_id)
+
+    def run_until(self, done):
+        while not done():
+            due, timer_id, fn, args = heapq.heappop(self._timers)
+            if timer_id in self._cancelled:
+                continue
+            time.sleep(max(0.0, due - time.monotonic()))
+            fn(*args)
+
+
+class Persister:
+    """标记后 16ms 写一次盘，对应 RefreshScheduler 的持久化部分"""
+
+    def __init__(self, loop, storage):
+        self.loop = loop
+        self.storage = storage
+        self.flushes = 0
+        self._timer = None
+
+    def mark_dirty(self):
+        if self._timer is None:
+            self._timer = self.loop.after(16, self.flush)
+
+    def flush(self):
+        self._timer = None
+        self.storage.flush()
+        if hasattr(self.storage, 'journal'):
+            self.storage.journal.sync()
+        self.flushes += 1
+
+
+def items(producer, count):
+    start = date(2025, 3, 1)
+    for i in range(count):
+        day = start + timedelta(days=(producer * 7 + i) % 60)
+        yield day.isoformat(), f"{8 + i % 12:02d}:{i % 60:02d}:00", f"p{producer}-{i}"
+
+
+def produce(submit, producer, count, rate):
+    for item in items(producer, count):
+        submit(item)
+        if rate:
+            time.sleep(1 / rate)
+
+
+def run(mode, args):
+    tmp = tempfile.TemporaryDirectory()
+    storage = open_storage(args.backend, os.path.join(tmp.name, 'events'))
+    loop = EventLoop()
+    persister = Persister(loop, storage)
+    latencies = []
+    total = args.producers * args.commands
+    depth = [0]
+
+    if mode == 'bus':
+        bus = CommandBus(loop, storage, on_batch=lambda commands: persister.mark_dirty())
+
+        def submit(item):
+            t0 = time.monotonic()
+            future = bus.submit(AddEvent(*item))
+            future.add_done_callback(lambda f: latencies.append(time.monotonic() - t0))
+    else:
+        results = queue.Queue()
+
+        def apply(item, t0):
+            storage.add(*item)
+            persister.mark_dirty()
+            latencies.append(time.monotonic() - t0)
+
+        def poll():
+            depth[0] = max(depth[0], results.qsize())
+            while True:
+                try:
+                    fn, fn_args = results.get_nowait()
+                except queue.Empty:
+                    break
+                fn(*fn_args)
+            loop.after(33, poll)
+
+        def submit(item):
+            results.put((apply, (item, time.monotonic())))
+
+        loop.after(33, poll)
+
+    threads = [threading.Thread(target=produce, args=(submit, i, args.commands, args.rate))
+               for i in range(args.producers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    loop.run_until(lambda: len(latencies) >= total and persister._timer is None)
+    elapsed = time.perf_counter() - t0
+    for t in threads:
+        t.join()
+    if mode == 'bus':
+        stats = bus.stats()
+        depth[0] = stats['max_depth']
+        bus.close()
+    assert storage.stats()[1] == total, storage.stats()
+    storage.close()
+    tmp.cleanup()
+    return elapsed, sorted(latencies), persister.flushes, depth[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--producers', type=int, default=4)
+    parser.add_argument('--commands', type=int, default=500, help='每个生产线程提交的新增数')
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--rate', type=float, default=0, help='每个生产线程每秒提交数，0 为尽快提交')
+    args = parser.parse_args()
+
+    print(f"{args.backend} 存储，生产线程 {args.producers} 个 × {args.commands} 条新增，"
+          f"{'尽快提交' if not args.rate else f'每线程 {args.rate:.0f} 条/秒'}")
+    print(f"{'方式':<12}{'耗时s':>8}{'p50ms':>9}{'p95ms':>9}{'写盘':>6}{'最大深度':>10}")
+    for mode in ('call_in_ui', 'bus'):
+        elapsed, lat, flushes, depth = run(mode, args)
+        p50 = statistics.median(lat) * 1000
+        p95 = lat[int(len(lat) * 0.95)] * 1000
+        print(f"{mode:<12}{elapsed:>8.2f}{p50:>9.1f}{p95:>9.1f}{flushes:>6}{depth:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+区间索引基准：10 万条带时长的事件上检查时间冲突
+
+scan ：逐条比较全部事件的 [开始, 结束)，O(n)
+index：interval_index.IntervalIndex，找到全部 k 个冲突 O(k log n) 以内
+
+事件随机分布在 --days 天内，约一半有 15 分钟到 3 小时的时长（少数跨天），其余为时刻事件。
+输出建树耗时、每次新增 / 删除的耗时、两种方式每次查询的耗时，并核对两者结果一致；
+最后测经过存储接口（MemoryStorage.conflicts）的建树和查询耗时。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_interval_index
+    python -m benchmarks.bench_interval_index --events 200000 --queries 2000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from interval_index import IntervalIndex, to_seconds
+from storage import MemoryStorage
+
+START = datetime(2025, 1, 1)
+
+
+def make_events(count, days, rng):
+    """[(开始, 结束或 None, (date, time, description)), ...]"""
+    events = []
+    for i in range(count):
+        start = START + timedelta(days=rng.randrange(days), minutes=rng.randrange(7 * 60, 23 * 60))
+        end = start + timedelta(minutes=rng.randrange(15, 181)) if rng.random() < 0.5 else None
+        start_text = start.strftime('%Y-%m-%d %H:%M:%S')
+        events.append((start_text, end.strftime('%Y-%m-%d %H:%M:%S') if end else None,
+                       (start_text[:10], start_text[11:], f'事件{i}')))
+    return events
+
+
+def make_queries(count, days, rng):
+    queries = []
+    for _ in range(count):
+        start = START + timedelta(days=rng.randrange(days), minutes=rng.randrange(7 * 60, 23 * 60))
+        end = start + timedelta(minutes=rng.randrange(30, 121))
+        queries.append((start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')))
+    return queries
+
+
+def scan(spans, start, end):
+    """线性扫描：spans 为 [(开始秒, 结束秒, 值), ...]"""
+    qs, qe = to_seconds(start), to_seconds(end)
+    return [value for s, e, value in spans if s < qe and e > qs]
+
+
+def per_call_us(fn, calls):
+    t0 = time.perf_counter()
+    results = [fn(*args) for args in calls]
+    return (time.perf_counter() - t0) / len(calls) * 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    events = make_events(args.events, args.days, rng)
+    queries = make_queries(args.queries, args.days, rng)
+    print(f"{args.events} 条事件（{args.days} 天），{args.queries} 次查询")
+
+    t0 = time.perf_counter()
+    index = IntervalIndex(events)
+    print(f"建树：{time.perf_counter() - t0:.2f}s")
+
+    spans = []
+    for start, end, value in events:
+        s = to_seconds(start)
+        spans.append((s, max(to_seconds(end) if end else s, s + 1), value))
+
+    scan_us, expected = per_call_us(lambda s, e: scan(spans, s, e), queries)
+    index_us, found = per_call_us(lambda s, e: [value for _, _, value in index.overlaps(s, e)], queries)
+    any_us, first = per_call_us(lambda s, e: index.overlaps(s, e, limit=1), queries)
+    mismatches = sum(sorted(a) != sorted(b) for a, b in zip(expected, found))
+    mismatches += sum(bool(a) != bool(b) for a, b in zip(expected, first))
+    conflicts = sum(len(r) for r in expected) / len(expected)
+    print(f"{'方式':<20}{'µs/次':>10}")
+    print(f"{'scan':<22}{scan_us:>10.1f}")
+    print(f"{'index 全部冲突':<18}{index_us:>10.1f}")
+    print(f"{'index 是否冲突':<18}{any_us:>10.1f}")
+    print(f"平均每次 {conflicts:.2f} 个冲突，快 {scan_us / index_us:.0f} 倍，结果不一致 {mismatches} 次")
+
+    extra = make_events(args.queries, args.days, rng)
+    add_us, _ = per_call_us(index.add, extra)
+    remove_us, removed = per_call_us(index.remove, extra)
+    print(f"新增 {add_us:.1f}µs/次，删除 {remove_us:.1f}µs/次，删除后 {len(index)} 条"
+          f"{'' if all(removed) and len(index) == args.events else '  （不一致）'}")
+
+    days = {}
+    for start, end, (date, time_, description) in events:
+        event = {"time": time_, "description": description}
+        if end:
+            event["end"] = end
+        days.setdefault(date, []).append(event)
+    storage = MemoryStorage(days)
+    t0 = time.perf_counter()
+    storage.interval_index()
+    load = time.perf_counter() - t0
+    storage_us, _ = per_call_us(lambda s, e: storage.conflicts(s[:10], s[11:], e), queries)
+    print(f"MemoryStorage：第一次查询时建树 {load:.2f}s，之后 conflicts {storage_us:.1f}µs/次")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+新消息监听基准（模拟后端）：检测延迟、CPU 占用、抢焦点次数
+
+legacy  ：原做法，后台线程按固定间隔调用 wx.GetNextNewMessage()；
+          每一轮都经过 CheckNewMessage -> _show()，把微信窗口提到最前
+listener：wx_listener.MessageListener，只比较会话列表快照，发现变化后才读取消息
+
+驱动线程模拟用户在其他程序中工作（每条消息前把前台窗口切走），
+按 --rate 向随机会话注入消息并记录发送时间，订阅者收到后计算延迟。
+CPU 为轮询线程的 thread_time / 运行时长。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_listener
+    python -m benchmarks.bench_listener --sessions 60 --messages 40 --interval 0.2 --duration 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from fake_wechat import WeChatSim
+from uia_backend import load_wechat
+from wx_harvester import IncrementalHarvester
+from wx_listener import MessageListener, thread_initializer
+
+
+class Recorder:
+    """记录每条注入消息的发送时间和收到时间"""
+
+    def __init__(self):
+        self.sent = {}
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def on_batch(self, batch):
+        now = time.perf_counter()
+        with self.lock:
+            for msgs in batch.values():
+                for msg in msgs:
+                    t = self.sent.pop(msg[1], None)
+                    if t is not None:
+                        self.latencies.append(now - t)
+
+
+def drive(sim, recorder, rate, duration, seed):
+    """按 rate 条/秒向随机会话注入消息"""
+    rng = random.Random(seed)
+    names = [s.name for s in sim.sessions]
+    end = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < end:
+        sim.foreground = None      # 用户正在其他程序中工作
+        content = f'bench-{i} 明天下午{rng.randint(1, 5)}点开会'
+        with recorder.lock:
+            recorder.sent[content] = time.perf_counter()
+        sim.receive(rng.choice(names), content)
+        i += 1
+        time.sleep(rng.expovariate(rate))
+    return i
+
+
+class LegacyLoop:
+    """原来的轮询方式：固定间隔 GetNextNewMessage"""
+
+    def __init__(self, wx, interval, callback):
+        self.wx = wx
+        self.interval = interval
+        self.callback = callback
+        self.polls = 0
+        self.cpu_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        with thread_initializer(self.wx):
+            while not self._stop.is_set():
+                c0 = time.thread_time()
+                batch = self.wx.GetNextNewMessage()
+                self.polls += 1
+                self.cpu_seconds += time.thread_time() - c0
+                if batch:
+                    self.callback(batch)
+                self._stop.wait(self.interval)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.monotonic() - self.started_at
+
+    def stats(self):
+        return {'polls': self.polls, 'cpu_percent': self.cpu_seconds / self.elapsed * 100}
+
+
+def run(mode, args):
+    sim = WeChatSim(latency=args.latency, wait_scale=args.wait_scale)
+    sim.populate(sessions=args.sessions, messages=args.messages, seed=args.seed)
+    wx = load_wechat('fake', sim=sim).WeChat()
+    recorder = Recorder()
+    fd, state_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    os.remove(state_path)
+    try:
+        if mode == 'legacy':
+            runner = LegacyLoop(wx, args.interval, recorder.on_batch)
+        else:
+            runner = MessageListener(wx, args.interval, IncrementalHarvester(wx, state_path))
+            runner.subscribe(recorder.on_batch)
+        runner.start()
+        time.sleep(args.interval * 2)
+        sim.reset_stats()
+        sent = drive(sim, recorder, args.rate, args.duration, args.seed)
+        time.sleep(args.interval * 4 + 1)
+        runner.stop()
+    finally:
+        if os.path.exists(state_path):
+            os.remove(state_path)
+    calls = sim.snapshot()
+    return sent, recorder, runner.stats(), calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=30, help='每个会话的历史消息数')
+    parser.add_argument('--interval', type=float, default=0.2, help='轮询间隔秒数')
+    parser.add_argument('--rate', type=float, default=2.0, help='注入速率（条/秒）')
+    parser.add_argument('--duration', type=float, default=8.0)
+    parser.add_argument('--latency', type=float, default=0.0002, help='每次 UIA 调用的延迟秒数')
+    parser.add_argument('--wait-scale', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"会话 {args.sessions} 个，轮询间隔 {args.interval}s，注入 {args.rate} 条/秒 × {args.duration}s，"
+          f"UIA 延迟 {args.latency * 1e6:.0f}µs/次")
+    print(f"{'方式':<10}{'注入':>6}{'收到':>6}{'p50ms':>9}{'p95ms':>9}{'CPU%':>8}{'轮询':>7}{'UIA调用':>9}{'抢焦点':>8}")
+    for mode in ('legacy', 'listener'):
+        sent, recorder, stats, calls = run(mode, args)
+        lat = sorted(recorder.latencies)
+        p50 = statistics.median(lat) * 1000 if lat else float('nan')
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000 if lat else float('nan')
+        print(f"{mode:<10}{sent:>6}{len(lat):>6}{p50:>9.0f}{p95:>9.0f}{stats['cpu_percent']:>8.1f}"
+              f"{stats['polls']:>7}{calls['total']:>9}{calls['focus_changes']:>8}")
+
+
+if __name__ == '__main__':
+    main()
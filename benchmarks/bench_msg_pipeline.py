@@ -0,0 +1,85 @@
+"""
+微信消息 → 日程流水线基准（模拟后端）
+
+legacy  ：原 get_wx_msg，全部会话获取完后拼成一段文本，一次发给模型
+pipeline：msg_pipeline.MessagePipeline，获取和提取重叠，按 token 预算分包
+
+提取用 --llm-delay 秒的 sleep 模拟一次模型调用。输出：首次提取前的等待、总耗时、
+提示词 token 数（最大一次 / 合计）、模型调用次数，以及提取慢于获取时生产线程因背压阻塞的时间。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_msg_pipeline
+    python -m benchmarks.bench_msg_pipeline --sessions 80 --messages 40 --budget 800 --llm-delay 0.5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fake_wechat import WeChatSim
+from msg_pipeline import MessagePipeline, estimate_tokens, format_line, harvest_messages
+from uia_backend import load_wechat
+from wx_harvester import IncrementalHarvester
+
+
+def setup(args, state_path):
+    sim = WeChatSim(latency=args.latency, wait_scale=0)
+    sim.populate(sessions=args.sessions, messages=args.messages, seed=args.seed)
+    wx = load_wechat('fake', sim=sim).WeChat()
+    return IncrementalHarvester(wx, state_path)
+
+
+def legacy(args, state_path):
+    harvester = setup(args, state_path)
+    t0 = time.perf_counter()
+    lines = [f"{msg[0]}{msg[1]}" for _, msgs in harvester.harvest() for msg in msgs if msg[0] != 'SYS']
+    blob = '\n'.join(lines)
+    first = time.perf_counter() - t0
+    time.sleep(args.llm_delay)
+    tokens = estimate_tokens(blob)
+    return first, time.perf_counter() - t0, tokens, tokens, 1, 0.0
+
+
+def pipeline(args, state_path):
+    harvester = setup(args, state_path)
+    first = None
+    t0 = time.perf_counter()
+
+    def extract(batch):
+        nonlocal first
+        if first is None:
+            first = time.perf_counter() - t0
+        time.sleep(args.llm_delay)
+        return sum(estimate_tokens(format_line(m)) + 1 for m in batch)
+
+    p = MessagePipeline(harvest_messages(harvester), extract, budget=args.budget)
+    sizes = [tokens for _, tokens in p]
+    return first, time.perf_counter() - t0, max(sizes), sum(sizes), len(sizes), p.blocked_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=60)
+    parser.add_argument('--messages', type=int, default=40)
+    parser.add_argument('--budget', type=int, default=1200, help='每包 token 预算')
+    parser.add_argument('--llm-delay', type=float, default=0.2, help='每次模型调用的秒数')
+    parser.add_argument('--latency', type=float, default=0.00005, help='每次 UIA 调用的延迟秒数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"会话 {args.sessions} 个 × {args.messages} 条，每包 {args.budget} token，模型调用 {args.llm_delay}s/次")
+    print(f"{'方式':<10}{'首次提取s':>10}{'总耗时s':>9}{'最大提示token':>14}{'合计token':>10}{'调用':>6}{'背压s':>8}")
+    for name, fn in (('legacy', legacy), ('pipeline', pipeline)):
+        fd, state_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(state_path)
+        try:
+            first, total, largest, tokens, calls, blocked = fn(args, state_path)
+        finally:
+            if os.path.exists(state_path):
+                os.remove(state_path)
+        print(f"{name:<10}{first:>10.2f}{total:>9.2f}{largest:>14}{tokens:>10}{calls:>6}{blocked:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+多窗口并行获取基准（模拟后端）：吞吐量（条/秒）
+
+serial  ：IncrementalHarvester，所有会话都在主窗口中依次打开读取
+parallel：ParallelHarvester，流量最高的 --pool 个会话弹出独立窗口，由 --workers 个线程并发读取
+pool    ：同上，但只在每 --scan-every 轮扫描一次主窗口会话列表，其余轮次只读窗口池
+
+每轮向 --hot 个高流量会话各注入 --burst 条消息，另向 --cold 个随机会话各注入 1 条，然后获取一轮。
+先预热 --warmup 轮（首次获取整段历史、窗口池按流量建立），之后 --rounds 轮计入吞吐量。
+--serialize 把模拟器的 UIA 调用串行化，相当于微信 UI 线程逐个处理 UIA 请求时并发读取的上限。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_parallel_harvest
+    python -m benchmarks.bench_parallel_harvest --pool 8 --workers 4 --latency 0.0005 --serialize
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from fake_wechat import WeChatSim
+from uia_backend import load_wechat
+from wx_harvester import IncrementalHarvester
+from wx_parallel import ParallelHarvester
+
+
+def inject(sim, rng, names, args):
+    sent = 0
+    for name in names[:args.hot]:
+        for _ in range(args.burst):
+            sim.receive(name, f'{name} 新消息 {rng.random():.6f}')
+            sent += 1
+    for name in rng.sample(names[args.hot:], args.cold):
+        sim.receive(name, f'{name} 新消息 {rng.random():.6f}')
+        sent += 1
+    return sent
+
+
+def run(mode, args, state_path):
+    sim = WeChatSim(latency=args.latency, wait_scale=args.wait_scale, serialize=args.serialize)
+    sim.populate(sessions=args.sessions, messages=args.messages, seed=args.seed)
+    names = [s.name for s in sim.sessions]
+    wx = load_wechat('fake', sim=sim).WeChat()
+    harvester = IncrementalHarvester(wx, state_path)
+    if mode == 'serial':
+        def harvest(scan=True):
+            return dict(harvester.harvest())
+    else:
+        parallel = ParallelHarvester(wx, pool_size=args.pool, workers=args.workers, harvester=harvester)
+        harvest = parallel.harvest
+
+    rng = random.Random(args.seed)
+    harvest()
+    for _ in range(args.warmup):
+        inject(sim, rng, names, args)
+        harvest()
+
+    sent = received = 0
+    elapsed = 0.0
+    sim.reset_stats()
+    for i in range(args.rounds):
+        sent += inject(sim, rng, names, args)
+        t0 = time.perf_counter()
+        result = harvest(scan=mode != 'pool' or (i + 1) % args.scan_every == 0)
+        elapsed += time.perf_counter() - t0
+        received += sum(1 for msgs in result.values() for m in msgs if m[0] != 'SYS')
+    calls = sim.snapshot()
+    if mode != 'serial':
+        # 最后把窗口池中剩下的消息和未扫描到的会话都取完
+        t0 = time.perf_counter()
+        tail = parallel.harvest()
+        elapsed += time.perf_counter() - t0
+        received += sum(1 for msgs in tail.values() for m in msgs if m[0] != 'SYS')
+        pool = sorted(parallel.pool)
+        parallel.close()
+        extra = f"窗口池 {len(pool)} 个，调整 {parallel.rotations} 次"
+    else:
+        extra = ''
+    return sent, received, elapsed, calls, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=30, help='每个会话的历史消息数')
+    parser.add_argument('--hot', type=int, default=6, help='高流量会话数')
+    parser.add_argument('--burst', type=int, default=5, help='每轮每个高流量会话的新消息数')
+    parser.add_argument('--cold', type=int, default=2, help='每轮有 1 条新消息的其他会话数')
+    parser.add_argument('--pool', type=int, default=6)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--scan-every', type=int, default=5, help='pool 方式每多少轮扫描一次主窗口')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0002, help='每次 UIA 调用的延迟秒数')
+    parser.add_argument('--wait-scale', type=float, default=0.0)
+    parser.add_argument('--serialize', action='store_true')
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"会话 {args.sessions} 个，高流量 {args.hot} 个 × {args.burst} 条/轮，另 {args.cold} 个会话各 1 条/轮，"
+          f"{args.rounds} 轮，UIA 延迟 {args.latency * 1e6:.0f}µs/次{'，UIA 串行' if args.serialize else ''}")
+    print(f"{'方式':<10}{'注入':>6}{'收到':>6}{'耗时s':>8}{'条/秒':>8}{'UIA调用':>9}{'抢焦点':>8}")
+    for mode in ('serial', 'parallel', 'pool'):
+        fd, state_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(state_path)
+        try:
+            sent, received, elapsed, calls, extra = run(mode, args, state_path)
+        finally:
+            if os.path.exists(state_path):
+                os.remove(state_path)
+        print(f"{mode:<10}{sent:>6}{received:>6}{elapsed:>8.2f}{received / elapsed:>8.0f}"
+              f"{calls['total']:>9}{calls['focus_changes']:>8}  {extra}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+重复事件基准：按每次发生展开保存 vs 按规则保存、按需展开
+
+expanded：原做法，每次发生都是一条普通事件（JsonStorage 快照 + 日志）
+rules   ：recurrence.Rule，每个重复事件只保存一条规则，月历渲染 / 查询时按 (规则, 月份) 展开并缓存
+
+随机生成 --rules 个重复事件（每天 / 工作日 / 每周 / 每两周 / 每月），从 --start 开始重复 --years 年。
+输出写入耗时、数据文件大小、重新加载耗时、逐月渲染（month_summary）第一次和再次的耗时、
+逐天列出事件（get_by_date）的耗时，并核对两种方式每天的事件完全一致。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_recurrence
+    python -m benchmarks.bench_recurrence --rules 100 --years 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from recurrence import Rule, RecurrenceSet, parse_rrule
+from storage import JsonStorage
+
+PATTERNS = ['FREQ=DAILY', 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR', 'FREQ=WEEKLY',
+            'FREQ=WEEKLY;INTERVAL=2', 'FREQ=MONTHLY']
+
+
+def make_rules(count, start, years, rng):
+    until = date(start.year + years, start.month, start.day) - timedelta(days=1)
+    rules = []
+    for i in range(count):
+        first = start + timedelta(days=rng.randrange(60))
+        rules.append(Rule(None, first.isoformat(), f"{rng.randrange(8, 20):02d}:{rng.choice(['00', '30'])}:00",
+                          f"重复{i}", **parse_rrule(rng.choice(PATTERNS) + f";UNTIL={until.isoformat()}")))
+    return rules, until
+
+
+def months(start, until):
+    year, month = start.year, start.month
+    while (year, month) <= (until.year, until.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def file_size(*paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+def run(mode, rules, start, until):
+    tmp = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp.name, 'calendar_events.json')
+    storage = JsonStorage(path)
+    t0 = time.perf_counter()
+    if mode == 'expanded':
+        # 用 RecurrenceSet 算出每次发生，再逐条保存
+        expander = RecurrenceSet()
+        items = []
+        for rule in rules:
+            rule = expander.add(rule)
+            for day, events in expander.get_range(start.isoformat(), (until + timedelta(days=1)).isoformat()).items():
+                items += [(day, e["time"], e["description"]) for e in events if e["rule"] == rule.id]
+        storage.add_many(items)
+    else:
+        for rule in rules:
+            storage.add_rule(rule)
+    storage.flush()
+    storage.journal.compact(wait=True)
+    write = time.perf_counter() - t0
+    storage.close()
+    size = file_size(path, path + '.journal', path + '.rules')
+
+    t0 = time.perf_counter()
+    storage = JsonStorage(path)
+    load = time.perf_counter() - t0
+
+    render = []
+    for _ in range(2):
+        t0 = time.perf_counter()
+        summaries = [list(storage.month_summary(year, month)) for year, month in months(start, until)]
+        render.append(time.perf_counter() - t0)
+
+    days = [start + timedelta(days=i) for i in range((until - start).days + 1)]
+    t0 = time.perf_counter()
+    listing = [[(e["time"], e["description"]) for e in storage.get_by_date(day.isoformat())] for day in days]
+    by_date = (time.perf_counter() - t0) / len(days) * 1e6
+    events = sum(map(len, listing))
+    storage.close()
+    tmp.cleanup()
+    return {'write': write, 'size': size, 'load': load, 'render': render, 'by_date': by_date,
+            'events': events, 'summaries': summaries, 'listing': listing}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, default=30)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--start', default='2025-01-01')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = date.fromisoformat(args.start)
+    rules, until = make_rules(args.rules, start, args.years, random.Random(args.seed))
+    results = {mode: run(mode, rules, start, until) for mode in ('expanded', 'rules')}
+    n_months = sum(1 for _ in months(start, until))
+
+    print(f"{args.rules} 个重复事件，{start} 至 {until}（{n_months} 个月），共 {results['expanded']['events']} 次发生")
+    print(f"{'方式':<10}{'写入s':>8}{'文件KB':>10}{'加载ms':>9}{'首次渲染ms':>12}{'再次渲染ms':>12}{'按天µs':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['write']:>8.2f}{r['size'] / 1024:>10.1f}{r['load'] * 1000:>9.1f}"
+              f"{r['render'][0] * 1000:>12.1f}{r['render'][1] * 1000:>12.1f}{r['by_date']:>9.1f}")
+    same = (results['expanded']['summaries'] == results['rules']['summaries']
+            and [sorted(day) for day in results['expanded']['listing']] == [sorted(day) for day in results['rules']['listing']])
+    print(f"两种方式每天的事件{'一致' if same else '不一致'}")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
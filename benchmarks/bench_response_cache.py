@@ -0,0 +1,113 @@
+"""
+回答缓存基准：重复提问的命中率、省下的模型调用、是否返回过期回答
+
+用内存存储和一个按存储内容作答的假 agent（每次调用 sleep --latency 秒）模拟：
+按 Zipf 分布从一组只读问题中抽取提问，每 --write-every 次提问插入一次增删。
+每次命中都与假 agent 的即时回答比对，不一致即为过期回答。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_response_cache
+    python -m benchmarks.bench_response_cache --queries 2000 --write-every 10 --disk
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from response_cache import ResponseCache
+from storage import MemoryStorage
+from time_parser import parse
+
+QUESTIONS = [
+    "今天有什么安排", "今天有什么安排？", "明天有什么会", "明天有什么安排", "后天有什么事",
+    "这周有哪些安排", "下周有什么安排", "周末有空吗", "下个月有哪些安排", "5号有什么事件",
+    "最近三天忙吗", "今天下午有会吗", "what do I have tomorrow", "本月的日程", "未来一周有什么安排",
+]
+
+
+class FakeAgent:
+    """按存储内容作答，模拟一次模型往返的延迟"""
+
+    def __init__(self, storage, latency, now):
+        self.storage = storage
+        self.latency = latency
+        self.now = now
+        self.calls = 0
+
+    def answer(self, question):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.truth(question)
+
+    def truth(self, question):
+        expr = parse(question, self.now)
+        start = expr.date or self.now.date()
+        end = (expr.end_date or start) + timedelta(days=1)
+        days = self.storage.get_range(start, end)
+        return repr(sorted((d, e['time'], e['description']) for d, events in days.items() for e in events))
+
+
+def run(args, path=None):
+    rng = random.Random(args.seed)
+    now = datetime(2025, 3, 12, 10, 0)
+    storage = MemoryStorage()
+    for i in range(200):
+        day = now.date() + timedelta(days=rng.randint(-10, 40))
+        storage.add(day.isoformat(), f"{rng.randint(8, 20):02d}:00:00", f"事件{i}")
+    cache = ResponseCache(maxsize=args.maxsize, ttl=args.ttl, path=path)
+    agent = FakeAgent(storage, args.latency, now)
+    weights = [1 / (i + 1) for i in range(len(QUESTIONS))]
+    stale = 0
+    t0 = time.perf_counter()
+    for i in range(args.queries):
+        if args.write_every and i % args.write_every == args.write_every - 1:
+            day = now.date() + timedelta(days=rng.randint(0, 30))
+            if rng.random() < 0.7:
+                storage.add(day.isoformat(), f"{rng.randint(8, 20):02d}:30:00", f"新增{i}")
+            else:
+                events = storage.get_range(now.date(), now.date() + timedelta(days=30))
+                if events:
+                    date = rng.choice(list(events))
+                    event = events[date][0]
+                    storage.delete(date, event['time'], event['description'])
+        question = rng.choices(QUESTIONS, weights)[0]
+        key = cache.key(question, storage.version, now)
+        answer = cache.get(key)
+        if answer is None:
+            answer = agent.answer(question)
+            cache.put(key, answer, storage.version)
+        elif answer != agent.truth(question):
+            stale += 1
+    elapsed = time.perf_counter() - t0
+    cache.close(None, storage.version)
+    return cache.stats(), agent.calls, stale, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--write-every', type=int, default=20, help='每多少次提问插入一次增删，0 为只读')
+    parser.add_argument('--latency', type=float, default=0.002, help='假 agent 每次调用的秒数')
+    parser.add_argument('--maxsize', type=int, default=256)
+    parser.add_argument('--ttl', type=float, default=600)
+    parser.add_argument('--disk', action='store_true', help='同时启用 shelve 磁盘层')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory() if args.disk else None
+    path = os.path.join(tmp.name, 'cache') if tmp else None
+    stats, calls, stale, elapsed = run(args, path)
+    writes = f"每 {args.write_every} 次提问一次增删" if args.write_every else "只读"
+    print(f"提问 {args.queries} 次，不同问题 {len(QUESTIONS)} 个，{writes}，"
+          f"模型延迟 {args.latency * 1000:.0f}ms{'，磁盘层' if args.disk else ''}")
+    print(f"命中 {stats['hits']}，未命中 {stats['misses']}，命中率 {stats['hit_rate']:.0%}")
+    print(f"模型调用 {calls} 次（不缓存为 {args.queries} 次），过期回答 {stale} 次")
+    print(f"总耗时 {elapsed:.2f}s（不缓存约 {args.queries * args.latency:.2f}s）")
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
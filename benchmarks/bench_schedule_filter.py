@@ -0,0 +1,78 @@
+"""
+日程候选预筛基准
+
+1. 用一小组人工标注的消息检查 TIME_PATTERN 的召回率 / 误报率
+2. 合成 --messages 条聊天消息（其中约 --ratio 含日程），测每秒可筛的消息数，
+   以及经过 MessagePipeline 分包后，过滤前后的模型调用次数
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_schedule_filter
+    python -m benchmarks.bench_schedule_filter --messages 200000 --ratio 0.05
+"""
+import argparse
+import random
+import time
+
+from msg_pipeline import ChatMessage, MessagePipeline
+from schedule_filter import ScheduleFilter
+
+SCHEDULE = [
+    '明天下午3点开会', '下周三交报告', '周五晚上聚餐', '2024-05-03 20:00 周会', '5月3日体检',
+    '3号之前交材料', '十点半到公司', '15:30 面试', '后天上午去医院复查', '周末去爬山吗',
+    '下个月出差一周', '两点见', '今晚八点开黑', '星期六早上9:00集合', '月底前提交预算',
+    'meeting tomorrow at 3pm', 'call on Friday', 'deadline Jan 15', 'see you tonight', 'lunch at 12:30?',
+]
+CHATTER = [
+    '好的', '哈哈哈', '[图片]', '收到', '快一点', '你吃饭了吗', '谢谢老板', 'ok', '有一点累', '多少钱',
+    '链接发我一下', '在吗', '辛苦了', '[动画表情]', '这个方案不错', '我再看看', 'sounds good', 'the sun is up',
+    'I sat down', '👍', '转发一下', '哪个群', '晚点说', '可以的',
+]
+
+
+def labelled(keep):
+    hits = sum(1 for text in SCHEDULE if keep.match('群', '张三', text))
+    false = [text for text in CHATTER if keep.match('群', '张三', text)]
+    return hits, false
+
+
+def synthesize(n, ratio, seed):
+    rng = random.Random(seed)
+    for i in range(n):
+        session = f'会话{rng.randrange(50):02d}'
+        text = rng.choice(SCHEDULE) if rng.random() < ratio else rng.choice(CHATTER)
+        yield session, [session, text, str(i)]
+
+
+def count_chunks(items, keep=None):
+    pipeline = MessagePipeline(items, lambda batch: None, keep=keep)
+    return sum(1 for _ in pipeline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--ratio', type=float, default=0.05, help='含日程的消息比例')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    keep = ScheduleFilter()
+    hits, false = labelled(keep)
+    print(f"标注集：召回 {hits}/{len(SCHEDULE)}，误报 {len(false)}/{len(CHATTER)} {false if false else ''}")
+
+    messages = [ChatMessage(s, m[0], m[1], m[2]) for s, m in synthesize(args.messages, args.ratio, args.seed)]
+    t0 = time.perf_counter()
+    passed = sum(1 for m in messages if keep(m))
+    elapsed = time.perf_counter() - t0
+    print(f"筛选 {len(messages)} 条：{elapsed * 1000:.0f}ms，{len(messages) / elapsed / 1000:.0f}k 条/秒，"
+          f"命中 {passed} 条（{passed / len(messages):.1%}）")
+
+    keep = ScheduleFilter()
+    without = count_chunks(synthesize(args.messages, args.ratio, args.seed))
+    with_filter = count_chunks(synthesize(args.messages, args.ratio, args.seed), keep)
+    report = keep.report()
+    print(f"分包提取：不过滤 {without} 次模型调用，过滤后 {with_filter} 次，省下 {without - with_filter} 次"
+          f"（report 估计省下 {report['calls_avoided']} 次）")
+
+
+if __name__ == '__main__':
+    main()
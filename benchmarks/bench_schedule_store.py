@@ -0,0 +1,103 @@
+"""
+schedules 表查询延迟基准
+
+对比旧版 `start_time LIKE 'YYYY-MM-DD%'` 全表扫描与迁移后按索引范围扫描的
+单次查询延迟，数据量分别为 1万 / 10万 / 100万 行。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_schedule_store
+    python -m benchmarks.bench_schedule_store --sizes 10000 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from schedule_store import SQL_CREATE_TABLE, ScheduleStore, migrate
+
+LEGACY_QUERY = 'SELECT start_time, description FROM schedules WHERE start_time LIKE ?;'
+SPAN_DAYS = 3 * 365
+BASE_DAY = datetime(2022, 1, 1)
+
+
+def build_legacy_db(path, rows, seed=0):
+    """按旧版结构（无索引）生成测试库"""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute(SQL_CREATE_TABLE)
+    batch = []
+    with conn:
+        for i in range(rows):
+            t = BASE_DAY + timedelta(seconds=rnd.randrange(SPAN_DAYS * 86400))
+            batch.append((t.strftime('%Y-%m-%d %H:%M:%S'), f'日程{i}'))
+            if len(batch) >= 50000:
+                conn.executemany('INSERT INTO schedules (start_time, description) VALUES (?, ?);', batch)
+                batch = []
+        conn.executemany('INSERT INTO schedules (start_time, description) VALUES (?, ?);', batch)
+    conn.close()
+
+
+def timed(fn, args_list):
+    t0 = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(args_list) * 1000
+
+
+def run(rows, queries, seed=0):
+    rnd = random.Random(seed + 1)
+    days = [(BASE_DAY + timedelta(days=rnd.randrange(SPAN_DAYS))).strftime('%Y-%m-%d') for _ in range(queries)]
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        build_legacy_db(path, rows, seed)
+
+        conn = sqlite3.connect(path)
+        legacy_ms = timed(lambda d: conn.execute(LEGACY_QUERY, (f'{d}%',)).fetchall(), [(d,) for d in days])
+        t0 = time.perf_counter()
+        migrate(conn)
+        migrate_s = time.perf_counter() - t0
+        conn.close()
+
+        store = ScheduleStore(path)
+        plan = store.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT start_time, description FROM schedules '
+            'WHERE start_time >= ? AND start_time < ? ORDER BY start_time;', ('a', 'b')
+        ).fetchall()
+        day_ms = timed(store.get_by_date, [(d,) for d in days])
+        week_ms = timed(store.get_week, [(d,) for d in days])
+        range_args = [(f'{d} 08:00:00', f'{d} 20:00:00') for d in days]
+        range_ms = timed(store.get_range, range_args)
+        store.close()
+    finally:
+        os.remove(path)
+    return {
+        'rows': rows,
+        'legacy_like_ms': legacy_ms,
+        'day_ms': day_ms,
+        'week_ms': week_ms,
+        'range_ms': range_ms,
+        'migrate_s': migrate_s,
+        'plan': ' / '.join(str(p[-1]) for p in plan),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'行数':>10} {'LIKE(ms)':>10} {'按天(ms)':>10} {'按周(ms)':>10} {'区间(ms)':>10} {'迁移(s)':>8}")
+    for rows in args.sizes:
+        r = run(rows, args.queries)
+        print(f"{r['rows']:>10} {r['legacy_like_ms']:>10.3f} {r['day_ms']:>10.3f} "
+              f"{r['week_ms']:>10.3f} {r['range_ms']:>10.3f} {r['migrate_s']:>8.2f}")
+    print(f"查询计划：{r['plan']}")
+
+
+if __name__ == '__main__':
+    main()
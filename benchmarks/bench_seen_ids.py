@@ -0,0 +1,128 @@
+"""
+GetNextNewMessage 新消息判定基准
+
+before：旧版做法，usedmsgid 为 list，newmsgids / oldmsgids 两次 O(n·m) 列表推导，
+        每个控件的 runtime id 计算两次，usedmsgid 随监听时间无限增长。
+after ：SeenIds（set + deque，有界淘汰），每个控件只计算一次 runtime id。
+
+消息窗口为合成的 10000 条消息，每轮新增 --batch 条，输出每轮耗时和 usedmsgid 大小。
+
+wxauto.py 依赖包内的相对导入，这里只从源码中取出 SeenIds 和 RuntimeId 两个定义。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_seen_ids
+    python -m benchmarks.bench_seen_ids --messages 10000 --batch 20 --rounds 3 --maxlen 4096
+"""
+import argparse
+import ast
+import collections
+import os
+import time
+
+WXAUTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'wxauto.py')
+
+
+def load_from_wxauto(*names):
+    """从 wxauto.py 源码中取出指定的顶层定义"""
+    with open(WXAUTO, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    nodes = [n for n in tree.body
+             if isinstance(n, (ast.ClassDef, ast.FunctionDef)) and n.name in names]
+    namespace = {'collections': collections}
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), WXAUTO, 'exec'), namespace)
+    return [namespace[name] for name in names]
+
+
+SeenIds, RuntimeId = load_from_wxauto('SeenIds', 'RuntimeId')
+
+
+class FakeMsgItem:
+    """模拟消息控件：GetRuntimeId() 返回 int 元组"""
+    ControlTypeName = 'ListItemControl'
+
+    def __init__(self, n):
+        self._rid = (42, 1234, 4, n)
+
+    def GetRuntimeId(self):
+        return self._rid
+
+
+def legacy_round(usedmsgid, MsgItems):
+    """原 GetNextNewMessage 中的新消息判定"""
+    msgids = [''.join([str(i) for i in i.GetRuntimeId()]) for i in MsgItems]
+    if not usedmsgid:
+        usedmsgid = msgids
+    newmsgids = [i for i in msgids if i not in usedmsgid]
+    oldmsgids = [i for i in usedmsgid if i in msgids]
+    NewMsgItems = []
+    if newmsgids and oldmsgids:
+        msgids = [''.join([str(i) for i in i.GetRuntimeId()]) for i in MsgItems]
+        new = []
+        for i in range(len(msgids)-1, -1, -1):
+            if msgids[i] in usedmsgid:
+                new = msgids[i+1:]
+                break
+        NewMsgItems = [
+            i for i in MsgItems
+            if ''.join([str(i) for i in i.GetRuntimeId()]) in new
+            and i.ControlTypeName == 'ListItemControl'
+        ]
+        usedmsgid = msgids
+    return usedmsgid, NewMsgItems
+
+
+def seen_round(usedmsgid, MsgItems):
+    """新版 GetNextNewMessage 中的新消息判定"""
+    itemids = [RuntimeId(i) for i in MsgItems]
+    if not usedmsgid:
+        usedmsgid.update(itemids)
+    hasnew = hasold = False
+    for msgid in itemids:
+        if msgid in usedmsgid:
+            hasold = True
+        else:
+            hasnew = True
+    NewMsgItems = []
+    if hasnew and hasold:
+        for i in range(len(itemids)-1, -1, -1):
+            if itemids[i] in usedmsgid:
+                NewMsgItems = [item for item in MsgItems[i+1:]
+                               if item.ControlTypeName == 'ListItemControl']
+                break
+        usedmsgid.update(itemids)
+    return usedmsgid, NewMsgItems
+
+
+def run(step, used, messages, batch, rounds):
+    """每轮窗口向后滑动 batch 条，返回 (平均每轮毫秒, 最终 usedmsgid 大小)"""
+    items = [FakeMsgItem(n) for n in range(messages + batch * rounds)]
+    used, _ = step(used, items[:messages])
+    elapsed = 0.0
+    for r in range(1, rounds + 1):
+        window = items[r * batch:messages + r * batch]
+        t0 = time.perf_counter()
+        used, new = step(used, window)
+        elapsed += time.perf_counter() - t0
+        assert len(new) == batch, (r, len(new))
+    return elapsed / rounds * 1000, len(used)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--maxlen', type=int, default=4096)
+    args = parser.parse_args()
+
+    print(f"消息窗口 {args.messages} 条，每轮新增 {args.batch} 条，共 {args.rounds} 轮")
+    after_ms, after_size = run(seen_round, SeenIds(maxlen=args.maxlen),
+                               args.messages, args.batch, args.rounds)
+    print(f"after : {after_ms:9.2f} ms/轮  usedmsgid {after_size}")
+    before_ms, before_size = run(legacy_round, [], args.messages, args.batch, args.rounds)
+    print(f"before: {before_ms:9.2f} ms/轮  usedmsgid {before_size}")
+    print(f"加速 {before_ms / after_ms:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
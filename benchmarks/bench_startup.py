@@ -0,0 +1,88 @@
+"""
+启动耗时基准：用 python -X importtime 测量两个入口模块的导入耗时，并检查预算
+
+每个入口在新的解释器中导入 --runs 次，取导入自身（cumulative）的中位数，列出最慢的直接依赖。
+以下模块应在窗口显示后才加载（lazy_loader），出现在导入链中即视为违规：
+    langchain* / openai / wxauto / uiautomation / win32* / comtypes
+超出 --budget-ms 或有违规时退出码为 1，可以放进 CI 或提交前检查。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 200 --runs 10 --top 8
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_MODULES = ['SmartCalendar', 'CalendarManagement']
+DEFERRED = re.compile(r'^(?:langchain\w*|openai|wxauto|uiautomation|win32\w*|pywintypes|comtypes)(?:\.|$)')
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_times(module):
+    """在新的解释器中导入 module
+
+    Returns:
+        list: [(模块名, 自身µs, 累计µs, 缩进层级), ...]，按 -X importtime 的输出顺序
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=REPO_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'导入 {module} 失败：\n{proc.stderr.strip().splitlines()[-1]}')
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def measure(module, runs):
+    totals = []
+    children = {}
+    deferred = set()
+    for _ in range(runs):
+        rows = import_times(module)
+        totals.append(next(cum for name, _, cum, level in rows if name == module and level == 0))
+        for name, _, cum, level in rows:
+            if level == 1:
+                children.setdefault(name, []).append(cum)
+            if DEFERRED.match(name):
+                deferred.add(name.split('.')[0])
+    children = {name: statistics.median(values) for name, values in children.items()}
+    return statistics.median(totals), children, sorted(deferred)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=ENTRY_MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250.0, help='每个入口模块导入耗时的上限')
+    parser.add_argument('--top', type=int, default=5, help='列出最慢的直接依赖个数')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        try:
+            total, children, deferred = measure(module, args.runs)
+        except RuntimeError as e:
+            print(e)
+            failed = True
+            continue
+        over = total / 1000 > args.budget_ms
+        failed |= over or bool(deferred)
+        print(f"{module}: 导入 {total / 1000:.1f}ms（预算 {args.budget_ms:.0f}ms）{'  超出预算' if over else ''}")
+        for name, cum in sorted(children.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<28}{cum / 1000:>8.1f}ms")
+        if deferred:
+            print(f"    应延迟加载的模块被提前导入：{', '.join(deferred)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+本地时间解析基准：标注语料上的准确率、解析耗时、本地快速通道的覆盖率和准确率
+
+语料 benchmarks/time_corpus.jsonl 每行一条：
+    text    - 用户输入
+    intent  - "add" / "query" 表示应在本地处理，null 表示应交给模型
+    expect  - 需要核对的字段：date / end_date / time / end_time / description，没列出的字段不核对
+所有条目都以 --now 为当前时间（默认 2025-03-12 10:00，周三）解析。
+
+对照组为原来的 _extract_date_from_question：把问题中的数字拼起来当作本月的日。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_time_parser
+    python -m benchmarks.bench_time_parser --verbose
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from time_parser import match_request, parse
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'time_corpus.jsonl')
+FIELDS = ('date', 'end_date', 'time', 'end_time')
+
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_date(question, now):
+    """原来的日期提取：问题中的数字拼成本月的日"""
+    try:
+        day = int(''.join(filter(str.isdigit, question)))
+        return f"{now.year}-{now.month:02d}-{day:02d}"
+    except ValueError:
+        return None
+
+
+def fmt(value):
+    if value is None:
+        return None
+    return value.strftime('%H:%M') if hasattr(value, 'hour') and not hasattr(value, 'year') else value.isoformat()
+
+
+def check_parse(item, now):
+    """逐字段核对 parse() 的结果，返回 (核对字段数, 正确字段数, 出错字段)"""
+    expr = parse(item['text'], now)
+    checked = correct = 0
+    wrong = []
+    for field in FIELDS:
+        if field not in item['expect']:
+            continue
+        checked += 1
+        got = fmt(getattr(expr, field))
+        if got == item['expect'][field]:
+            correct += 1
+        else:
+            wrong.append(f"{field}={got}≠{item['expect'][field]}")
+    return checked, correct, wrong
+
+
+def check_request(item, now):
+    """核对 match_request() 的本地判断，返回 (结果, 是否正确, 说明)"""
+    request = match_request(item['text'], now)
+    intent = request['intent'] if request else None
+    if intent != item['intent']:
+        return request, False, f"intent={intent}≠{item['intent']}"
+    if request is None:
+        return request, True, ''
+    expect = item['expect']
+    got = {'date': request['start'].strftime('%Y-%m-%d')}
+    if intent == 'add':
+        got['time'] = request['start'].strftime('%H:%M')
+        if request['end'] is not None:
+            got['end_time'] = request['end'].strftime('%H:%M')
+        got['description'] = request['description']
+    elif request['end'] != request['start']:
+        got['end_date'] = request['end'].isoformat()
+    for field in set(got) | {'end_date', 'end_time', 'description'}:
+        if got.get(field) != expect.get(field) and (field in expect or field in got):
+            return request, False, f"{field}={got.get(field)}≠{expect.get(field)}"
+    return request, True, ''
+
+
+def timeit(fn, texts, now, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in texts:
+            fn(text, now)
+        samples.append((time.perf_counter() - t0) / len(texts))
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--now', default='2025-03-12 10:00')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--verbose', action='store_true', help='列出每条出错的语料')
+    args = parser.parse_args()
+
+    now = datetime.strptime(args.now, '%Y-%m-%d %H:%M')
+    corpus = load_corpus(args.corpus)
+    texts = [item['text'] for item in corpus]
+
+    # 解析准确率
+    checked = correct = 0
+    legacy_checked = legacy_correct = 0
+    for item in corpus:
+        c, k, wrong = check_parse(item, now)
+        checked += c
+        correct += k
+        if wrong and args.verbose:
+            print(f"  解析  {item['text']!r}: {', '.join(wrong)}")
+        if 'date' in item['expect']:
+            legacy_checked += 1
+            legacy_correct += legacy_date(item['text'], now) == item['expect']['date']
+
+    # 本地快速通道
+    local = sum(1 for item in corpus if item['intent'])
+    handled = handled_ok = declined_ok = 0
+    for item in corpus:
+        request, ok, why = check_request(item, now)
+        if request is not None:
+            handled += 1
+            handled_ok += ok
+        elif item['intent'] is None:
+            declined_ok += 1
+        if not ok and args.verbose:
+            print(f"  请求  {item['text']!r}: {why}")
+
+    parse_us = timeit(parse, texts, now, args.repeat)
+    match_us = timeit(match_request, texts, now, args.repeat)
+    legacy_us = timeit(legacy_date, texts, now, args.repeat)
+
+    print(f"语料 {len(corpus)} 条（应本地处理 {local} 条，应交给模型 {len(corpus) - local} 条），当前时间 {now}")
+    print(f"{'':<22}{'准确率':>12}{'耗时µs/条':>12}")
+    print(f"{'parse 字段':<22}{f'{correct}/{checked}':>12}{parse_us:>12.1f}")
+    print(f"{'原日期提取（仅日期）':<18}{f'{legacy_correct}/{legacy_checked}':>12}{legacy_us:>12.1f}")
+    print(f"{'match_request':<22}{'':>12}{match_us:>12.1f}")
+    print(f"本地处理 {handled} 条，其中正确 {handled_ok} 条（准确率 {handled_ok / handled:.0%}）" if handled else "本地处理 0 条")
+    print(f"覆盖率 {handled_ok}/{local}（应本地处理的请求中正确处理的比例）")
+    print(f"正确交给模型 {declined_ok}/{len(corpus) - local}")
+
+
+if __name__ == '__main__':
+    main()
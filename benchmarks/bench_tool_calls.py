@@ -0,0 +1,138 @@
+"""
+agent 工具调用吞吐基准
+
+before：旧版工具的做法，每次调用 sqlite3.connect()、执行、commit、close，
+        使用 SQLite 默认的 rollback journal + synchronous=FULL。
+after ：ScheduleStore + ConnectionManager，线程内长连接、WAL、synchronous=NORMAL。
+
+按 add_schedule : get_schedules_by_date : delete_schedule_by_time = 6 : 3 : 1 的比例
+模拟一串连续的工具调用，输出每秒调用次数。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_tool_calls --calls 2000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from schedule_store import SQL_CREATE_TABLE, ScheduleStore
+
+
+def legacy_tools(path):
+    """原 CalendarManagement.py 中三个工具的实现"""
+    def connect_db():
+        return sqlite3.connect(path)
+
+    def add_schedule(start_time, description):
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO schedules (start_time, description) VALUES (?, ?);", (start_time, description))
+        conn.commit()
+        conn.close()
+        return "true"
+
+    def delete_schedule_by_time(start_time):
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM schedules WHERE start_time = ?;", (start_time,))
+        conn.commit()
+        conn.close()
+        return "true"
+
+    def get_schedules_by_date(query_date):
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT start_time, description FROM schedules WHERE start_time LIKE ?;", (f"{query_date}%",))
+        schedules = cursor.fetchall()
+        conn.close()
+        return str(schedules)
+
+    return add_schedule, delete_schedule_by_time, get_schedules_by_date
+
+
+def store_tools(store):
+    def add_schedule(start_time, description):
+        store.add(start_time, description)
+        return "true"
+
+    def delete_schedule_by_time(start_time):
+        store.delete_by_time(start_time)
+        return "true"
+
+    def get_schedules_by_date(query_date):
+        return str(store.get_by_date(query_date))
+
+    return add_schedule, delete_schedule_by_time, get_schedules_by_date
+
+
+def make_calls(count, seed=0):
+    rnd = random.Random(seed)
+    calls = []
+    for i in range(count):
+        day = f'2024-05-{rnd.randint(1, 28):02d}'
+        start_time = f'{day} {rnd.randint(8, 20):02d}:{rnd.choice((0, 30)):02d}:00'
+        r = rnd.random()
+        if r < 0.6:
+            calls.append(('add', (start_time, f'日程{i}')))
+        elif r < 0.9:
+            calls.append(('get', (day,)))
+        else:
+            calls.append(('delete', (start_time,)))
+    return calls
+
+
+def run_calls(tools, calls):
+    add, delete, get = tools
+    table = {'add': add, 'delete': delete, 'get': get}
+    t0 = time.perf_counter()
+    for name, args in calls:
+        table[name](*args)
+    return len(calls) / (time.perf_counter() - t0)
+
+
+def new_db():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    conn.execute(SQL_CREATE_TABLE)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def cleanup(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+    calls = make_calls(args.calls)
+
+    path = new_db()
+    try:
+        before = run_calls(legacy_tools(path), calls)
+    finally:
+        cleanup(path)
+
+    path = new_db()
+    try:
+        store = ScheduleStore(path)
+        after = run_calls(store_tools(store), calls)
+        store.close()
+    finally:
+        cleanup(path)
+
+    print(f'工具调用次数：{args.calls}')
+    print(f'before（每次新建连接）：{before:10.0f} 次/秒')
+    print(f'after （长连接 + WAL）：{after:10.0f} 次/秒  (x{after / before:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+wxauto 高层操作基准（模拟后端）
+
+用 fake_wechat.WeChatSim 模拟已登录的微信，原样加载仓库中的 wxauto.py，
+统计每个高层操作的 UIA 调用次数（按 walk / property / input / window / capture 分类）和耗时。
+
+默认 --wait-scale 0，即不执行 Click / SendKeys 等自带的 waitTime，耗时只反映 UIA 调用本身；
+--wait-scale 1 按真实的固定等待执行。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_wechat_sim
+    python -m benchmarks.bench_wechat_sim --sessions 200 --messages 60 --latency 0.0002
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fake_wechat import WeChatSim
+from uia_backend import load_wechat
+from wx_harvester import IncrementalHarvester
+
+COLUMNS = ['walk', 'property', 'input', 'window', 'capture']
+
+
+def measure(sim, label, fn, rows):
+    sim.reset_stats()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    stats = sim.snapshot()
+    rows.append((label, elapsed, stats))
+    return result
+
+
+def legacy_harvest(wx):
+    """原 get_wx_msg：遍历全部会话，每个会话 ChatWith + rollToTop + GetAllMessage"""
+    count = 0
+    for name in wx.GetAllSessionList():
+        wx.ChatWith(name)
+        wx.rollToTop()
+        count += len(wx.GetAllMessage())
+    return count
+
+
+def harvest(wx, state_path):
+    harvester = IncrementalHarvester(wx, state_path)
+    return sum(len(msgs) for _, msgs in harvester.harvest())
+
+
+def print_rows(rows):
+    header = f"{'操作':<28}{'耗时ms':>10}{'UIA调用':>9}" + ''.join(f'{c:>10}' for c in COLUMNS) + f"{'抢焦点':>8}"
+    print(header)
+    for label, elapsed, stats in rows:
+        line = f'{label:<28}{elapsed:>10.1f}{stats["total"]:>9}'
+        line += ''.join(f'{stats.get(c, 0):>10}' for c in COLUMNS)
+        line += f'{stats["focus_changes"]:>8}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=60)
+    parser.add_argument('--messages', type=int, default=60, help='每个会话的消息数')
+    parser.add_argument('--latency', type=float, default=0.00005, help='每次 UIA 调用的延迟秒数')
+    parser.add_argument('--wait-scale', type=float, default=0.0)
+    parser.add_argument('--search-delay', type=float, default=0.0)
+    args = parser.parse_args()
+    if args.sessions < 4:
+        parser.error('--sessions 至少为 4')
+
+    sim = WeChatSim(latency=args.latency, wait_scale=args.wait_scale, search_delay=args.search_delay)
+    sim.populate(sessions=args.sessions, messages=args.messages)
+    wxauto = load_wechat('fake', sim=sim)
+    print(f"会话 {args.sessions} 个，每个 {args.messages} 条消息，UIA 延迟 {args.latency * 1e6:.0f}µs/次，"
+          f"waitTime 缩放 {args.wait_scale}")
+
+    rows = []
+    wx = measure(sim, 'WeChat()', wxauto.WeChat, rows)
+    names = measure(sim, 'GetAllSessionList', wx.GetAllSessionList, rows)
+    measure(sim, 'ChatWith（搜索）', lambda: wx.ChatWith(names[0]), rows)
+    measure(sim, 'ChatWith（可见，首次）', lambda: wx.ChatWith(names[1]), rows)
+    measure(sim, 'ChatWith（可见，缓存）', lambda: wx.ChatWith(names[2]), rows)
+    measure(sim, 'GetAllMessage', wx.GetAllMessage, rows)
+    measure(sim, 'rollToTop', wx.rollToTop, rows)
+    sim.receive(names[2], '当前窗口的新消息')
+    measure(sim, 'GetNextNewMessage（当前）', wx.GetNextNewMessage, rows)
+    sim.receive(names[-1], '其他会话的新消息')
+    measure(sim, 'GetNextNewMessage（其他）', wx.GetNextNewMessage, rows)
+    measure(sim, 'GetNextNewMessage（无）', wx.GetNextNewMessage, rows)
+
+    legacy_count = measure(sim, '全量获取（原 get_wx_msg）', lambda: legacy_harvest(wx), rows)
+    fd, state_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    os.remove(state_path)
+    try:
+        first = measure(sim, '增量获取（首次）', lambda: harvest(wx, state_path), rows)
+        # 默认从第 11 个会话起取 3 个，会话较少时取最后 3 个
+        for i, name in enumerate(names[min(10, len(names) - 3):][:3]):
+            sim.receive(name, f'第 {i} 条新消息')
+        again = measure(sim, '增量获取（3 个会话有新消息）', lambda: harvest(wx, state_path), rows)
+    finally:
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+    print_rows(rows)
+    print(f"全量获取 {legacy_count} 条，增量首次 {first} 条，再次 {again} 条")
+    stats = wxauto.GetWaitStats()
+    if stats:
+        print('轮询等待：' + '，'.join(f"{site} {s['calls']} 次 实际 {s['waited']:.2f}s / 原固定 {s['budget']:.2f}s"
+                                  for site, s in stats.items()))
+
+
+if __name__ == '__main__':
+    main()
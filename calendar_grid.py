@@ -0,0 +1,72 @@
+"""
+可复用的月历网格
+
+表头和 6×7 个日期按钮只在创建时生成一次。每次刷新传入 42 个格子的目标状态，
+与上一次渲染的状态逐项比较，只对真正变化的选项调用 configure，
+避免销毁重建控件带来的闪烁和开销。
+"""
+import time
+import tkinter as tk
+from tkinter import ttk
+
+WEEKDAY_HEADERS = ["一", "二", "三", "四", "五", "六", "日"]
+ROWS = 6
+COLUMNS = 7
+
+# 空白格子的状态
+BLANK_CELL = {
+    "text": "",
+    "bg": "#FFFFFF",
+    "state": tk.DISABLED,
+    "relief": "flat",
+    "bd": 2,
+}
+
+
+class CalendarGrid:
+    """月历网格
+
+    Args:
+        parent: 父容器
+        on_click (callable): 点击格子时回调 on_click(index)，index 为 0~41
+        on_render (callable, optional): 每次渲染后回调 on_render(elapsed_ms, changed_cells)
+    """
+
+    def __init__(self, parent, on_click, on_render=None):
+        self.parent = parent
+        self.on_render = on_render
+        for col, header in enumerate(WEEKDAY_HEADERS):
+            ttk.Label(parent, text=header, anchor="center",
+                      relief="ridge", width=10).grid(row=0, column=col, sticky="nsew")
+
+        self.buttons = []
+        for index in range(ROWS * COLUMNS):
+            btn = tk.Button(parent, command=lambda i=index: on_click(i), **BLANK_CELL)
+            btn.grid(row=index // COLUMNS + 1, column=index % COLUMNS, sticky="nsew")
+            self.buttons.append(btn)
+        self._rendered = [dict(BLANK_CELL) for _ in self.buttons]
+
+        # 设置网格等宽
+        for col in range(COLUMNS):
+            parent.grid_columnconfigure(col, weight=1)
+
+    def render(self, cells):
+        """按目标状态刷新网格
+
+        Args:
+            cells (list): 42 个 dict，键为 BLANK_CELL 中的选项
+
+        Returns:
+            int: 实际发生变化的格子数
+        """
+        t0 = time.perf_counter()
+        changed = 0
+        for btn, old, new in zip(self.buttons, self._rendered, cells):
+            diff = {key: value for key, value in new.items() if old.get(key) != value}
+            if diff:
+                btn.configure(**diff)
+                old.update(diff)
+                changed += 1
+        if self.on_render:
+            self.on_render((time.perf_counter() - t0) * 1000, changed)
+        return changed
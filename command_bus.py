@@ -0,0 +1,261 @@
+"""
+日历修改的命令总线
+
+agent 工具、微信提取线程、界面都会修改日历。原来各自调用 storage.add / delete 再 mark_dirty，
+工具还要通过 call_in_ui 绕回主线程，存储和界面的线程安全全靠调用方自觉。
+这里改成：任何线程都只提交命令（AddEvent / ModifyEvent / DeleteEvent，重复事件为 AddRule / DeleteRule），
+由主线程中唯一的应用者按批取出执行——连续的新增合并为一次 add_many，
+每批只回调一次 on_batch（刷新界面 + 写盘），并统计队列深度和从提交到生效的延迟。
+
+在主线程中提交时立即执行（连同队列中已有的命令），返回时 Future 已完成，界面可以马上读到结果。
+check=True 的新增先经区间索引检查时间冲突（包括同一批中先于它的新增），有冲突时不写入。
+
+用法：
+    >>> bus = CommandBus(root, storage, on_batch=lambda commands: scheduler.mark_dirty())
+    >>> future = bus.submit(AddEvent('2024-05-03', '20:00:00', '周会'))   # 任何线程
+    >>> bus.stats()
+"""
+import collections
+import queue
+import statistics
+import threading
+import time
+from concurrent.futures import Future
+
+from interval_index import IntervalIndex
+from storage import normalize_end, split_start_time
+
+AddEvent = collections.namedtuple('AddEvent', ['date', 'time', 'description', 'end', 'check'])
+DeleteEvent = collections.namedtuple('DeleteEvent', ['date', 'time', 'description'])
+ModifyEvent = collections.namedtuple('ModifyEvent', ['date', 'time', 'description',
+                                                     'new_date', 'new_time', 'new_description', 'new_end'])
+# AddEvent 的 end 为可选的结束时间，check 为 True 时有时间冲突就不新增
+AddEvent.__new__.__defaults__ = (None, False)
+# DeleteEvent 的 description 为 None 时删除该时间的全部事件
+DeleteEvent.__new__.__defaults__ = (None,)
+ModifyEvent.__new__.__defaults__ = (None,)
+# rule 为 recurrence.Rule；删除重复事件的某一次用 DeleteEvent，删除整个系列用 DeleteRule
+AddRule = collections.namedtuple('AddRule', ['rule'])
+DeleteRule = collections.namedtuple('DeleteRule', ['rule_id'])
+
+
+class CommandBus:
+    """日历修改命令的队列和应用者
+
+    Args:
+        root: Tk 根窗口，命令在主线程中应用
+        storage (EventStorage): 事件存储
+        on_batch (callable, optional): 每批命令应用后在主线程回调 on_batch(commands)
+        poll_ms (int): 主线程检查队列的间隔
+        max_batch (int): 每批最多应用的命令数，避免一次占用主线程太久
+        samples (int): 保留的延迟样本数
+    """
+
+    def __init__(self, root, storage, on_batch=None, poll_ms=16, max_batch=500, samples=1000):
+        self.root = root
+        self.storage = storage
+        self.on_batch = on_batch
+        self.poll_ms = poll_ms
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._ui_thread = threading.current_thread()
+        self._lock = threading.Lock()
+        self._closed = False
+        # 统计
+        self.submitted = 0
+        self.applied = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.apply_seconds = 0.0
+        self._latencies = collections.deque(maxlen=samples)
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    @property
+    def depth(self):
+        """排队中的命令数"""
+        return self._queue.qsize()
+
+    def submit(self, command):
+        """提交一条命令，可在任何线程中调用
+
+        Returns:
+            Future: 命令的结果——AddEvent 为冲突的事件列表（空列表表示已新增，见 EventStorage.conflicts），
+                    DeleteEvent 为删除条数，ModifyEvent 为是否找到原事件，
+                    AddRule 为带 id 的规则，DeleteRule 为是否找到规则
+        """
+        return self.submit_many([command])[0]
+
+    def submit_many(self, commands):
+        """按顺序提交多条命令
+
+        Returns:
+            list: 每条命令的 Future
+        """
+        if self._closed:
+            raise RuntimeError('命令总线已关闭')
+        futures = []
+        now = time.monotonic()
+        for command in commands:
+            future = Future()
+            self._queue.put((command, future, now))
+            futures.append(future)
+        if futures:
+            # 日历即将变化：之后开始的问答不会缓存变化前的回答
+            self.storage.bump_version()
+        with self._lock:
+            self.submitted += len(futures)
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        if threading.current_thread() is self._ui_thread:
+            self.drain()
+        return futures
+
+    def _poll(self):
+        self.drain()
+        if not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def drain(self):
+        """在主线程中应用排队的命令，直到队列为空
+
+        Returns:
+            int: 应用的命令数
+        """
+        total = 0
+        while True:
+            batch = []
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return total
+            self._apply(batch)
+            total += len(batch)
+
+    def _apply(self, batch):
+        t0 = time.perf_counter()
+        adds = []
+        for command, future, submitted_at in batch:
+            if isinstance(command, AddEvent):
+                adds.append((command, future, submitted_at))
+                continue
+            self._apply_adds(adds)
+            adds = []
+            self._apply_one(command, future, submitted_at)
+        self._apply_adds(adds)
+        self.batches += 1
+        self.apply_seconds += time.perf_counter() - t0
+        if self.on_batch is not None:
+            self.on_batch([command for command, _, _ in batch])
+
+    def _apply_adds(self, adds):
+        """连续的新增合并为一次 add_many"""
+        if not adds:
+            return
+        accepted, results = [], []
+        batch_index = None
+        try:
+            for command, future, submitted_at in adds:
+                conflicts = []
+                if command.check:
+                    conflicts = self.storage.conflicts(command.date, command.time, command.end)
+                    if not conflicts and accepted:
+                        # 同一批中已接受、尚未写入存储的新增
+                        if batch_index is None:
+                            batch_index = IntervalIndex(self._interval(c) for c, _, _ in accepted)
+                        conflicts = [self._conflict(end, value) for _, end, value in batch_index.overlaps(*self._span(command))]
+                if not conflicts:
+                    accepted.append((command, future, submitted_at))
+                    if batch_index is not None:
+                        batch_index.add(*self._interval(command))
+                results.append(conflicts)
+            self.storage.add_many([command[:4] for command, _, _ in accepted])
+        except Exception as e:
+            for _, future, submitted_at in adds:
+                self._done(future, submitted_at, error=e)
+            return
+        for (_, future, submitted_at), conflicts in zip(adds, results):
+            self._done(future, submitted_at, conflicts)
+
+    @staticmethod
+    def _conflict(end, value):
+        event = {"date": value[0], "time": value[1], "description": value[2]}
+        if end:
+            event["end"] = end
+        return event
+
+    @staticmethod
+    def _span(command):
+        return f"{command.date} {command.time}", normalize_end(command.date, command.time, command.end)
+
+    @classmethod
+    def _interval(cls, command):
+        return (*cls._span(command), (command.date, command.time, command.description))
+
+    def _apply_one(self, command, future, submitted_at):
+        try:
+            if isinstance(command, DeleteEvent):
+                result = self.storage.delete(command.date, command.time, command.description)
+            elif isinstance(command, AddRule):
+                result = self.storage.add_rule(command.rule)
+            elif isinstance(command, DeleteRule):
+                result = self.storage.delete_rule(command.rule_id)
+            elif isinstance(command, ModifyEvent):
+                result = self._modify(command)
+            else:
+                raise TypeError(f'未知的命令：{command!r}')
+        except Exception as e:
+            self._done(future, submitted_at, error=e)
+        else:
+            self._done(future, submitted_at, result)
+
+    def _modify(self, command):
+        """修改事件：先校验新的时间再删除原事件，新增仍然失败时恢复原事件，不会只删不加"""
+        new_date, new_time = split_start_time(f"{command.new_date} {command.new_time}")
+        new_end = normalize_end(new_date, new_time, command.new_end)
+        originals = [e for e in self.storage.get_by_date(command.date)
+                     if e["time"] == command.time and e["description"] == command.description and "rule" not in e]
+        if not self.storage.delete(command.date, command.time, command.description):
+            return False
+        try:
+            self.storage.add(new_date, new_time, command.new_description, new_end)
+        except Exception:
+            for event in originals[:1]:
+                self.storage.add(command.date, event["time"], event["description"], event.get("end"))
+            raise
+        return True
+
+    def _done(self, future, submitted_at, result=None, error=None):
+        self._latencies.append(time.monotonic() - submitted_at)
+        if error is None:
+            self.applied += 1
+            future.set_result(result)
+        else:
+            self.failed += 1
+            print(f"命令执行失败：{error}")
+            future.set_exception(error)
+
+    def close(self):
+        """应用剩余的命令并停止轮询，在主线程中调用"""
+        self._closed = True
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self.drain()
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'submitted': self.submitted,
+            'applied': self.applied,
+            'failed': self.failed,
+            'batches': self.batches,
+            'commands_per_batch': (self.applied + self.failed) / self.batches if self.batches else 0.0,
+            'latency_p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+            'latency_p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+            'apply_ms_per_batch': self.apply_seconds / self.batches * 1000 if self.batches else 0.0,
+        }
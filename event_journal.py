@@ -0,0 +1,170 @@
+"""
+日历事件的追加式持久化
+
+calendar_events.json 作为快照，每次增删改只向 calendar_events.json.journal
+追加一行 JSON（JSON Lines），记录某一天修改后的完整事件列表：
+
+    {"d": "2024-05-03", "e": [{"time": "20:00:00", "description": "周会"}]}
+    {"d": "2024-05-04"}                       <- 当天已没有事件
+
+每条记录都是“覆盖某一天”，重放是幂等的。写入时先 flush 到操作系统，
+按条数 / 时间间隔批量 fsync；日志超过阈值后在后台线程把当前状态压缩成新快照。
+加载时读取快照再重放日志尾部，耗时只与快照大小和日志尾部长度有关。
+"""
+import json
+import os
+import threading
+import time
+
+DATA_FILE = "calendar_events.json"
+
+
+class EventJournal:
+    """快照 + 追加日志
+
+    Args:
+        path (str): 快照文件路径，日志文件为 path + '.journal'
+        fsync_every (int): 累计多少条记录后 fsync 一次
+        fsync_interval (float): 距离上次 fsync 超过多少秒后，下一次写入时 fsync
+        compact_bytes (int): 日志超过多少字节后触发后台压缩
+    """
+
+    def __init__(self, path=DATA_FILE, fsync_every=32, fsync_interval=1.0, compact_bytes=1 << 20):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compacting_path = path + '.journal.compacting'
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self._state = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._compactor = None
+
+    # ---------- 加载 ----------
+
+    def load(self):
+        """读取快照并重放日志，返回 {date: [event, ...]}"""
+        state = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        # 上次压缩未完成时，.compacting 中的记录比 .journal 更早
+        interrupted = os.path.exists(self.compacting_path)
+        if interrupted:
+            self._replay(self.compacting_path, state)
+        self._replay(self.journal_path, state)
+        self._state = state
+
+        with self._lock:
+            if interrupted:
+                self._write_snapshot(dict(state))
+                os.remove(self.compacting_path)
+                open(self.journal_path, 'wb').close()
+            self._file = open(self.journal_path, 'ab')
+        return {date: [dict(e) for e in events] for date, events in state.items()}
+
+    @staticmethod
+    def _replay(path, state):
+        if not os.path.exists(path):
+            return
+        good = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时写了一半的最后一行，丢弃并截断，避免后续追加接在残行后面
+                    break
+                if record.get("e"):
+                    state[record["d"]] = record["e"]
+                else:
+                    state.pop(record["d"], None)
+                good += len(line)
+        if good != os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+
+    # ---------- 写入 ----------
+
+    def put_day(self, date, events):
+        """记录某一天修改后的事件列表，events 为空表示当天已无事件"""
+        events = [dict(e) for e in events or []]
+        record = {"d": date, "e": events} if events else {"d": date}
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            if events:
+                self._state[date] = events
+            else:
+                self._state.pop(date, None)
+            self._file.write(line.encode('utf-8'))
+            self._file.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+            if self._file.tell() >= self.compact_bytes:
+                self._start_compaction_locked()
+
+    def sync(self):
+        """立即把日志 fsync 到磁盘"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    # ---------- 压缩 ----------
+
+    def compact(self, wait=False):
+        """把当前状态压缩成新快照并清空日志"""
+        with self._lock:
+            self._start_compaction_locked()
+            compactor = self._compactor
+        if wait and compactor is not None:
+            compactor.join()
+
+    def _start_compaction_locked(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if os.path.exists(self.compacting_path):
+            # 上一次压缩失败留下的文件，直接覆盖会丢失其中的记录
+            print(f'日志压缩未完成，跳过本次压缩：{self.compacting_path}')
+            return
+        self._sync_locked()
+        self._file.close()
+        os.replace(self.journal_path, self.compacting_path)
+        self._file = open(self.journal_path, 'ab')
+        # put_day 总是整体替换某天的列表，浅拷贝即可得到此刻的一致状态
+        snapshot = dict(self._state)
+        self._compactor = threading.Thread(target=self._compact_worker, args=(snapshot,), daemon=True)
+        self._compactor.start()
+
+    def _compact_worker(self, snapshot):
+        self._write_snapshot(snapshot)
+        os.remove(self.compacting_path)
+
+    def _write_snapshot(self, snapshot):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """fsync 日志并等待后台压缩结束"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync_locked()
+            self._file.close()
+            self._file = None
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
@@ -0,0 +1,596 @@
+"""
+内存中的模拟微信窗口
+
+WeChatSim 按 wxauto 访问的控件结构维护一棵 UIA 元素树（Node）：
+    桌面
+    ├── 主窗口 WeChatMainWndForPC
+    │   └── 导航栏 / 会话列表（带滚动视口和搜索） / 聊天框（消息列表按页加载，“查看更多消息”）
+    └── 独立聊天窗口 ChatWnd（双击会话弹出）
+
+fake_wxauto/uiautomation.py 把 Node 包装成 uiautomation 风格的控件，每次跨进程调用
+都经过 WeChatSim.call() 计数，并按 latency 模拟延迟；Click / SendKeys 等操作自带的
+waitTime 按 wait_scale 缩放后真实等待。
+
+用法：
+    >>> from fake_wechat import WeChatSim
+    >>> from uia_backend import load_wechat
+    >>> sim = WeChatSim(latency=0.0002)
+    >>> sim.populate(sessions=50, messages=40)
+    >>> wxauto = load_wechat('fake', sim=sim)
+    >>> wx = wxauto.WeChat()
+    >>> sim.receive('联系人003', '明天下午三点开会')
+"""
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+
+NAV_BUTTONS = ['聊天', '通讯录', '收藏', '聊天文件', '朋友圈', '小程序面板', '手机', '设置及其他']
+MORE_MESSAGES = '查看更多消息'
+SPECIAL_KEYS = ('{Ctrl}', '{Alt}', '{Esc}', '{Enter}', '{ENTER}', '{Home}', '{DOWN}', '{UP}')
+
+
+class ControlType:
+    ButtonControl = 50000
+    CheckBoxControl = 50002
+    ComboBoxControl = 50003
+    EditControl = 50004
+    ImageControl = 50006
+    ListItemControl = 50007
+    ListControl = 50008
+    MenuItemControl = 50011
+    ProgressBarControl = 50012
+    TextControl = 50020
+    GroupControl = 50026
+    DocumentControl = 50030
+    WindowControl = 50032
+    PaneControl = 50033
+
+
+class Rect:
+    def __init__(self, left=0, top=0, right=0, bottom=0):
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+    def width(self):
+        return self.right - self.left
+
+    def height(self):
+        return self.bottom - self.top
+
+    def xcenter(self):
+        return self.left + self.width() // 2
+
+    def ycenter(self):
+        return self.top + self.height() // 2
+
+    def __repr__(self):
+        return f'({self.left},{self.top},{self.right},{self.bottom})[{self.width()}x{self.height()}]'
+
+
+def _value(v):
+    return v() if callable(v) else v
+
+
+class Node:
+    """模拟的 UIA 元素
+
+    name / rect / children 可以是值，也可以是无参函数（每次访问时计算）。
+    点击、按键和滚轮没有处理函数时交给父元素处理：点击落在子元素上时由外层控件响应，
+    键盘、滚轮事件发往所在窗口。
+    """
+
+    def __init__(self, sim, control_type, name='', class_name='', rect=None, children=(), hwnd=0,
+                 on_click=None, on_double_click=None, on_keys=None, on_wheel=None, focus=False, value=''):
+        self.sim = sim
+        self.control_type = control_type
+        self.type_value = getattr(ControlType, control_type)
+        self._name = name
+        self.class_name = class_name
+        self._rect = rect if rect is not None else Rect(0, 0, 100, 30)
+        self._children = children if callable(children) else list(children)
+        self.hwnd = hwnd
+        self.runtime_id = sim.new_runtime_id()
+        self.parent = None
+        self.alive = True
+        self._on_click = on_click
+        self._on_double_click = on_double_click
+        self._on_keys = on_keys
+        self._on_wheel = on_wheel
+        self._focus = focus
+        self._value = value
+        if not callable(children):
+            for child in self._children:
+                child.parent = self
+
+    @property
+    def name(self):
+        return _value(self._name)
+
+    @property
+    def rect(self):
+        return _value(self._rect)
+
+    @property
+    def has_focus(self):
+        return bool(_value(self._focus))
+
+    @property
+    def value(self):
+        return _value(self._value)
+
+    def children(self):
+        if not callable(self._children):
+            return self._children
+        children = self._children()
+        for child in children:
+            child.parent = self
+        return children
+
+    def click(self):
+        if self._on_click:
+            self._on_click()
+        elif self.parent is not None:
+            self.parent.click()
+
+    def double_click(self):
+        if self._on_double_click:
+            self._on_double_click()
+        elif self._on_click:
+            self._on_click()
+        elif self.parent is not None:
+            self.parent.double_click()
+
+    def right_click(self):
+        pass
+
+    def focus(self):
+        pass
+
+    def send_keys(self, text):
+        if self._on_keys:
+            self._on_keys(text)
+        elif self.parent is not None:
+            self.parent.send_keys(text)
+
+    def wheel(self, times):
+        if self._on_wheel:
+            self._on_wheel(times)
+        elif self.parent is not None:
+            self.parent.wheel(times)
+
+    def window(self):
+        node = self
+        while node.parent is not None and node.parent is not self.sim.root:
+            node = node.parent
+        return node
+
+    def __repr__(self):
+        return f'<Node {self.control_type} {self.name!r}>'
+
+
+class SimSession:
+    """一个聊天对象：消息为 (发送者, 内容)，发送者为 'SYS' 表示时间等系统消息，'Self' 表示自己"""
+
+    def __init__(self, name, messages=(), unread=0):
+        self.name = name
+        self.messages = list(messages)
+        self.unread = unread
+
+    @property
+    def last_time(self):
+        for sender, content in reversed(self.messages):
+            if sender == 'SYS':
+                return content
+        return ''
+
+    @property
+    def preview(self):
+        for sender, content in reversed(self.messages):
+            if sender != 'SYS':
+                return content
+        return ''
+
+
+class ChatView:
+    """一个聊天界面（主窗口右侧或独立聊天窗口）：消息列表从末尾按页加载"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.session = None
+        self.loaded = 0
+        self.draft = ''
+        self._items = {}
+        self.title = Node(sim, 'TextControl', name=lambda: self.session.name if self.session else '')
+        self.more = Node(sim, 'ButtonControl', name=MORE_MESSAGES, on_click=self.load_more)
+        self.msg_list = Node(sim, 'ListControl', name='消息', rect=Rect(320, 60, 920, 560),
+                             children=self.children, on_keys=self._list_keys, on_wheel=self._list_wheel)
+        self.edit = Node(sim, 'EditControl', name=lambda: self.session.name if self.session else '',
+                         on_keys=self._edit_keys, value=lambda: self.draft)
+        self.box = Node(sim, 'PaneControl', children=[
+            Node(sim, 'PaneControl', children=[self.title]),
+            self.msg_list,
+            self.edit,
+        ])
+
+    def show(self, session):
+        """切换到某个聊天对象，重新渲染的消息控件 runtime id 都会变化"""
+        self.session = session
+        self.loaded = min(self.sim.page_size, len(session.messages))
+        self.draft = ''
+        self._items = {}
+
+    def load_more(self):
+        if self.session is not None:
+            self.loaded = min(self.loaded + self.sim.page_size, len(self.session.messages))
+
+    def appended(self):
+        self.loaded += 1
+
+    def _list_keys(self, text):
+        if '{Home}' in text:
+            self.load_more()
+
+    def _list_wheel(self, times):
+        if times < 0:
+            self.load_more()
+
+    def _edit_keys(self, text):
+        if text == '{Ctrl}a':
+            self.draft = ''
+        elif text == '{Ctrl}v':
+            self.draft += self.sim.clipboard
+        elif text in ('{Enter}', '{ENTER}'):
+            if self.draft and self.session is not None:
+                self.sim.send(self.session.name, self.draft)
+            self.draft = ''
+        elif not text.startswith('{'):
+            self.draft += text
+
+    def _item(self, index):
+        node = self._items.get(index)
+        if node is None:
+            sender, content = self.session.messages[index]
+            if sender == 'SYS':
+                node = Node(self.sim, 'ListItemControl', name=content, rect=Rect(320, 0, 920, 40))
+            else:
+                left = 860 if sender == 'Self' else 330
+                button = Node(self.sim, 'ButtonControl', name=self.sim.nickname if sender == 'Self' else sender,
+                              rect=Rect(left, 0, left + 40, 40))
+                node = Node(self.sim, 'ListItemControl', name=content, rect=Rect(320, 0, 920, 60),
+                            children=[Node(self.sim, 'PaneControl', children=[button])])
+            self._items[index] = node
+        return node
+
+    def children(self):
+        with self.sim.lock:
+            if self.session is None:
+                return []
+            total = len(self.session.messages)
+            start = total - self.loaded
+            items = [self._item(i) for i in range(start, total)]
+        return ([self.more] if start > 0 else []) + items
+
+
+class ChatWindow:
+    """独立聊天窗口 ChatWnd"""
+
+    def __init__(self, sim, session):
+        self.view = ChatView(sim)
+        self.view.show(session)
+        self.node = Node(sim, 'WindowControl', name=session.name, class_name='ChatWnd',
+                         hwnd=sim.new_hwnd(), children=[Node(sim, 'PaneControl', children=[self.view.box])])
+
+
+class WeChatSim:
+    """模拟的微信客户端
+
+    Args:
+        nickname (str): 登录账号昵称
+        visible_sessions (int): 会话列表视口中完整可见的会话数（另有一个露出一半）
+        page_size (int): 打开聊天 / “查看更多消息”每次加载的消息数
+        latency (float|dict): 每次 UIA 调用的延迟秒数，也可以按调用类型给出
+            {'walk': ..., 'property': ..., 'input': ..., 'window': ..., 'capture': ...}
+        wait_scale (float): Click / SendKeys / WheelDown 等操作的 waitTime 缩放系数，0 表示不等待
+        search_delay (float): 输入搜索词到出现搜索结果的延迟秒数
+        serialize (bool): 是否把 UIA 调用串行化（模拟微信 UI 线程逐个处理 UIA 请求）
+        rows_per_wheel (int): 滚轮每格滚动的会话数
+    """
+
+    def __init__(self, nickname='我', visible_sessions=12, page_size=20, latency=0.0, wait_scale=1.0,
+                 search_delay=0.0, serialize=False, rows_per_wheel=1):
+        self.nickname = nickname
+        self.visible_sessions = visible_sessions
+        self.page_size = page_size
+        self.latency = latency
+        self.wait_scale = wait_scale
+        self.search_delay = search_delay
+        self.rows_per_wheel = rows_per_wheel
+        self.lock = threading.RLock()
+        self._provider_lock = threading.Lock() if serialize else None
+        self._stats_lock = threading.Lock()
+        self._runtime_ids = itertools.count(1)
+        self._hwnds = itertools.count(0x10010)
+        self.calls = Counter()
+        self.focus_changes = 0
+        self.clipboard = ''
+
+        self.sessions = []
+        self._by_name = {}
+        self.offset = 0
+        self.current = None
+        self.chat_windows = {}
+        self.foreground = None
+
+        self.search_focus = False
+        self.search_query = ''
+        self._typed_at = 0.0
+        self._results = {}
+
+        self._build_tree()
+
+    # ---------- 统计 ----------
+
+    def new_runtime_id(self):
+        return (42, 4242, next(self._runtime_ids))
+
+    def new_hwnd(self):
+        return next(self._hwnds)
+
+    def call(self, kind):
+        """一次跨进程的 UIA / Win32 调用"""
+        with self._stats_lock:
+            self.calls[kind] += 1
+        delay = self.latency.get(kind, 0.0) if isinstance(self.latency, dict) else self.latency
+        if delay:
+            if self._provider_lock is not None:
+                with self._provider_lock:
+                    time.sleep(delay)
+            else:
+                time.sleep(delay)
+
+    def wait(self, seconds):
+        if seconds and self.wait_scale:
+            time.sleep(seconds * self.wait_scale)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.calls = Counter()
+        self.focus_changes = 0
+
+    def snapshot(self):
+        """当前的调用计数，附带 total 和 focus_changes"""
+        with self._stats_lock:
+            stats = dict(self.calls)
+        stats['total'] = sum(stats.values())
+        stats['focus_changes'] = self.focus_changes
+        return stats
+
+    # ---------- 元素树 ----------
+
+    def _build_tree(self):
+        self.main_view = ChatView(self)
+        self.search_edit = Node(self, 'EditControl', name='搜索', focus=lambda: self.search_focus,
+                                on_keys=self._search_keys)
+        self.session_list = Node(self, 'ListControl', name='会话', children=self._visible_items,
+                                 on_wheel=self.scroll_sessions)
+        blank = Node(self, 'PaneControl')
+        session_box = Node(self, 'PaneControl', on_wheel=self.scroll_sessions, children=[
+            Node(self, 'PaneControl', children=[self.search_edit]),
+            Node(self, 'PaneControl', children=lambda: [blank, self._results_pane() or self.session_list]),
+        ])
+        navigation = Node(self, 'PaneControl', children=[Node(self, 'ButtonControl', name=self.nickname)] + [
+            Node(self, 'ButtonControl', name=name,
+                 on_double_click=self.jump_to_unread if name == '聊天' else None)
+            for name in NAV_BUTTONS
+        ])
+        main = Node(self, 'PaneControl', class_name='', children=[
+            Node(self, 'PaneControl', children=[navigation, session_box, self.main_view.box]),
+        ])
+        self.main_window = Node(self, 'WindowControl', name='微信', class_name='WeChatMainWndForPC',
+                                rect=Rect(0, 0, 940, 600), hwnd=self.new_hwnd(),
+                                children=[main], on_keys=self._main_keys)
+        self.root = Node(self, 'PaneControl', name='桌面', rect=Rect(0, 0, 1920, 1080), children=lambda: [
+            self.main_window] + [w.node for w in list(self.chat_windows.values())])
+        self._items = {}
+
+    def _session_item(self, session):
+        item = self._items.get(session.name)
+        if item is not None:
+            return item
+        name = session.name
+        button = Node(self, 'ButtonControl', name=name)
+        badge = Node(self, 'TextControl', name=lambda: str(session.unread))
+        top = Node(self, 'PaneControl', children=[
+            Node(self, 'TextControl', name=name),
+            Node(self, 'TextControl', name=lambda: session.last_time),
+        ])
+        bottom = Node(self, 'PaneControl', children=[Node(self, 'TextControl', name=lambda: session.preview)])
+        box = Node(self, 'PaneControl', children=lambda: [button] + ([badge] if session.unread else []) + [top, bottom])
+        item = Node(self, 'ListItemControl',
+                    name=lambda: f'{name}{session.unread}条新消息' if session.unread else name,
+                    rect=lambda: self._item_rect(session),
+                    children=[box],
+                    on_click=lambda: self.open_chat(name),
+                    on_double_click=lambda: self.pop_out(name))
+        self._items[name] = item
+        return item
+
+    def _item_rect(self, session):
+        with self.lock:
+            if session not in self.sessions:
+                return Rect()
+            index = self.sessions.index(session) - self.offset
+        if 0 <= index <= self.visible_sessions:
+            top = 80 + 64 * index
+            return Rect(60, top, 310, top + 64)
+        return Rect()
+
+    def _visible_items(self):
+        with self.lock:
+            visible = self.sessions[self.offset:self.offset + self.visible_sessions + 1]
+        return [self._session_item(s) for s in visible]
+
+    def _results_pane(self):
+        if not self.search_query or time.monotonic() - self._typed_at < self.search_delay:
+            return None
+        query = self.search_query
+        pane = self._results.get(query)
+        if pane is None:
+            with self.lock:
+                matches = [s.name for s in self.sessions if query in s.name]
+            items = [
+                Node(self, 'ListItemControl', name=name, on_click=lambda n=name: self._open_from_search(n),
+                     children=[Node(self, 'TextControl', name=name.replace(query, f'<em>{query}</em>', 1))])
+                for name in matches
+            ]
+            header = [Node(self, 'PaneControl', children=[Node(self, 'TextControl', name='联系人')])] if items else []
+            pane = Node(self, 'PaneControl', children=[Node(self, 'ListControl', name='', children=header + items)])
+            self._results = {query: pane}
+        return pane
+
+    # ---------- 界面行为 ----------
+
+    def _main_keys(self, text):
+        if text == '{Ctrl}f':
+            self.search_focus = True
+            self.search_query = ''
+        elif text == '{Ctrl}{Alt}w' or text == '{Esc}':
+            self.reset_search()
+
+    def _search_keys(self, text):
+        if text == '{Esc}':
+            self.reset_search()
+        elif text == '{Ctrl}a':
+            self.search_query = ''
+        elif not text.startswith(SPECIAL_KEYS):
+            self.search_query += text
+            self._typed_at = time.monotonic()
+
+    def reset_search(self):
+        self.search_focus = False
+        self.search_query = ''
+
+    def _open_from_search(self, name):
+        self.reset_search()
+        with self.lock:
+            index = self.sessions.index(self._by_name[name])
+            if not self.offset <= index < self.offset + self.visible_sessions:
+                self.offset = max(0, min(index, len(self.sessions) - self.visible_sessions))
+        self.open_chat(name)
+
+    def scroll_sessions(self, times):
+        with self.lock:
+            max_offset = max(0, len(self.sessions) - self.visible_sessions)
+            self.offset = max(0, min(self.offset + times * self.rows_per_wheel, max_offset))
+
+    def jump_to_unread(self):
+        """双击“聊天”图标：会话列表滚动到下一个有未读消息的会话"""
+        with self.lock:
+            unread = [i for i, s in enumerate(self.sessions) if s.unread]
+            if unread:
+                after = [i for i in unread if i > self.offset]
+                target = after[0] if after else unread[0]
+                self.offset = max(0, min(target, len(self.sessions) - self.visible_sessions))
+
+    def open_chat(self, name):
+        with self.lock:
+            session = self._by_name[name]
+            session.unread = 0
+            self.current = name
+            self.main_view.show(session)
+
+    def pop_out(self, name):
+        with self.lock:
+            self.open_chat(name)
+            if name not in self.chat_windows:
+                self.chat_windows[name] = ChatWindow(self, self._by_name[name])
+
+    def close_window(self, hwnd):
+        """关闭独立聊天窗口"""
+        with self.lock:
+            for name, window in list(self.chat_windows.items()):
+                if window.node.hwnd == hwnd:
+                    del self.chat_windows[name]
+                    if self.foreground is window.node:
+                        self.foreground = None
+
+    def activate(self, element):
+        window = element.window()
+        if self.foreground is not window:
+            self.foreground = window
+            self.focus_changes += 1
+
+    def find_window(self, name=None, classname=None):
+        self.call('window')
+        if classname == 'ChatWnd' or (classname is None and name in self.chat_windows):
+            window = self.chat_windows.get(name)
+            return window.node.hwnd if window else 0
+        if classname in (None, 'WeChatMainWndForPC') and name in (None, '微信'):
+            return self.main_window.hwnd
+        return 0
+
+    def has_unread(self):
+        with self.lock:
+            return any(s.unread for s in self.sessions)
+
+    # ---------- 数据 ----------
+
+    def add_session(self, name, messages=(), unread=0, top=False):
+        with self.lock:
+            session = SimSession(name, messages, unread)
+            self._by_name[name] = session
+            if top:
+                self.sessions.insert(0, session)
+            else:
+                self.sessions.append(session)
+            return session
+
+    def _views_showing(self, session):
+        views = [w.view for w in self.chat_windows.values() if w.view.session is session]
+        if self.current == session.name:
+            views.append(self.main_view)
+        return views
+
+    def _append(self, name, sender, content):
+        with self.lock:
+            session = self._by_name.get(name) or self.add_session(name)
+            session.messages.append((sender, content))
+            views = self._views_showing(session)
+            for view in views:
+                view.appended()
+            if self.sessions[0] is not session:
+                self.sessions.remove(session)
+                self.sessions.insert(0, session)
+            return session, views
+
+    def receive(self, name, content, sender=None):
+        """收到一条消息：会话移到列表顶部，聊天未打开时未读数加一"""
+        with self.lock:
+            session, views = self._append(name, sender or name, content)
+            if not views:
+                session.unread += 1
+
+    def receive_time(self, name, text):
+        """插入一条时间标记"""
+        self._append(name, 'SYS', text)
+
+    def send(self, name, content):
+        self._append(name, 'Self', content)
+
+    def populate(self, sessions=100, messages=50, seed=0, time_every=10):
+        """生成测试数据：每个会话 messages 条消息，每 time_every 条插入一个时间标记"""
+        rnd = random.Random(seed)
+        for i in range(sessions):
+            name = f'联系人{i:03d}'
+            msgs = []
+            for j in range(messages):
+                if j % time_every == 0:
+                    msgs.append(('SYS', f'{(8 + j // 60) % 24:02d}:{j % 60:02d}'))
+                sender = 'Self' if rnd.random() < 0.3 else name
+                msgs.append((sender, f'{name} 的第 {j} 条消息'))
+            self.add_session(name, msgs)
+        return self
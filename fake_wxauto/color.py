@@ -0,0 +1,8 @@
+"""模拟后端的 wxauto.color：只保留 wxauto.py 用到的 Warnings"""
+import warnings
+
+
+class Warnings:
+    @staticmethod
+    def lightred(text, stacklevel=1):
+        warnings.warn(text, stacklevel=stacklevel + 1)
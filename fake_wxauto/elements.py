@@ -0,0 +1,116 @@
+"""
+模拟后端的 wxauto.elements
+
+按模拟窗口树的控件结构实现 wxauto.py 依赖的 WeChatBase / SessionElement / ChatWnd，
+消息统一表示为 [发送者, 内容, 消息 id]，发送者为 'SYS' / 'Self' / 'Recall' 或好友名。
+"""
+from . import uiautomation as uia
+from .languages import *
+from .utils import *
+
+
+class WeChatBase:
+    def _lang(self, text, langtype='MAIN'):
+        if langtype == 'MAIN':
+            return MAIN_LANGUAGE[text][self.language]
+        elif langtype == 'WARNING':
+            return WARNING[text][self.language]
+
+    def _split(self, MsgItem):
+        uia.SetGlobalSearchTimeout(0)
+        MsgItemName = MsgItem.Name
+        msgid = ''.join([str(i) for i in MsgItem.GetRuntimeId()])
+        if MsgItem.BoundingRectangle.height() == 40:
+            # 系统消息（时间、撤回提示等）
+            Msg = ['SYS', MsgItemName, msgid]
+        else:
+            try:
+                User = MsgItem.ButtonControl(foundIndex=1)
+                winrect = MsgItem.BoundingRectangle
+                mid = (winrect.left + winrect.right) / 2
+                if User.BoundingRectangle.left < mid:
+                    name = User.Name
+                else:
+                    name = 'Self'
+                Msg = [name, MsgItemName, msgid]
+            except LookupError:
+                Msg = ['Recall', MsgItemName, msgid]
+        uia.SetGlobalSearchTimeout(10.0)
+        return Msg
+
+    def _getmsgs(self, msgitems, savepic=False, savefile=False, savevoice=False):
+        return [self._split(MsgItem) for MsgItem in msgitems if MsgItem.ControlTypeName == 'ListItemControl']
+
+
+class SessionElement:
+    """会话列表中的一个聊天对象"""
+
+    def __init__(self, item):
+        box = item.GetFirstChildControl()
+        children = box.GetChildren()
+        self.name = children[0].Name
+        self.isnew = type(children[1]) == uia.TextControl
+        self.time = children[-2].GetLastChildControl().Name
+        self.content = children[-1].GetFirstChildControl().Name
+
+    def __repr__(self) -> str:
+        return f"<wxauto Session Element at {hex(id(self))} ({self.name}: {self.content})>"
+
+
+class ChatWnd(WeChatBase):
+    """独立的聊天窗口"""
+
+    def __init__(self, who, language='cn'):
+        self.who = who
+        self.language = language
+        self.UiaAPI = uia.WindowControl(searchDepth=1, ClassName='ChatWnd', Name=who)
+        self.editbox = self.UiaAPI.EditControl()
+        self.C_MsgList = self.UiaAPI.ListControl(Name=self._lang('消息'))
+        self.savepic = False
+        self.savefile = False
+        self.savevoice = False
+        self.usedmsgid = [i[-1] for i in self.GetAllMessage()]
+
+    def __repr__(self) -> str:
+        return f"<wxauto Chat Window at {hex(id(self))} for {self.who}>"
+
+    def _show(self):
+        self.HWND = FindWindow(name=self.who, classname='ChatWnd')
+        win32gui.ShowWindow(self.HWND, 1)
+        self.UiaAPI.SwitchToThisWindow()
+
+    def GetAllMessage(self, savepic=False, savefile=False, savevoice=False):
+        MsgItems = self.C_MsgList.GetChildren()
+        return self._getmsgs(MsgItems, savepic, savefile, savevoice)
+
+    def GetNewMessage(self, savepic=False, savefile=False, savevoice=False):
+        """获取窗口中上次读取之后的新消息"""
+        MsgItems = self.C_MsgList.GetChildren()
+        msgids = [''.join([str(i) for i in i.GetRuntimeId()]) for i in MsgItems]
+        used = set(self.usedmsgid)
+        NewMsgItems = [item for item, msgid in zip(MsgItems, msgids) if msgid not in used]
+        if not NewMsgItems:
+            return []
+        self.usedmsgid = msgids
+        return self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
+
+    def LoadMoreMessage(self):
+        self.C_MsgList.WheelUp(wheelTimes=10, waitTime=0.1)
+        return True
+
+    def SendMsg(self, msg, at=None):
+        self._show()
+        SetClipboardText(msg)
+        self.editbox.SendKeys('{Ctrl}a', waitTime=0)
+        self.editbox.SendKeys('{Ctrl}v')
+        self.editbox.SendKeys('{Enter}')
+
+
+class ContactWnd:
+    def __init__(self, *args, **kwargs):
+        raise NotImplementedError('模拟后端不支持通讯录管理窗口')
+
+
+class NewFriendsElement:
+    def __init__(self, *args, **kwargs):
+        raise NotImplementedError('模拟后端不支持新的朋友列表')
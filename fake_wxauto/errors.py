@@ -0,0 +1,5 @@
+"""模拟后端的 wxauto.errors"""
+
+
+class TargetNotFoundError(Exception):
+    pass
@@ -0,0 +1,16 @@
+"""模拟后端的 wxauto.languages：模拟器只实现简体中文界面，繁体 / 英文沿用同样的文字"""
+
+_MAIN = ['聊天', '通讯录', '收藏', '聊天文件', '朋友圈', '小程序面板', '手机', '设置及其他', '搜索', '消息']
+_FILE = ['全部', '最近使用', '发送者', '聊天', '类型']
+
+MAIN_LANGUAGE = {text: {'cn': text, 'cn_t': text, 'en': text} for text in _MAIN}
+
+FILE_LANGUAGE = {text: {'cn': text, 'cn_t': text, 'en': text} for text in _FILE}
+
+WARNING = {
+    '版本不一致': {
+        'cn': '当前微信客户端版本为{}，与当前库版本{}不一致，可能会导致部分功能无法正常使用，请注意判断',
+        'cn_t': '當前微信客戶端版本為{}，與當前庫版本{}不一致，可能會導致部分功能無法正常使用，請注意判斷',
+        'en': 'The current WeChat client version is {}, which is inconsistent with the current library version {}',
+    },
+}
@@ -0,0 +1,322 @@
+"""
+模拟的 uiautomation
+
+接口与 wxauto 使用到的 uiautomation 子集一致：控件按条件懒查找、GetChildren 逐个遍历子元素、
+Exists 按间隔重试、未找到时按全局超时抛出 LookupError。底层元素是 fake_wechat 中的 Node，
+每次跨进程调用都会经过模拟器的 call()，用于计数和模拟延迟。
+"""
+import re
+import time
+
+from fake_wechat import ControlType, Rect
+
+TIME_OUT_SECOND = 10
+OPERATION_WAIT_TIME = 0.5
+
+_simulator = None
+
+
+def SetSimulator(sim):
+    """绑定模拟器（fake_wechat.WeChatSim）"""
+    global _simulator
+    _simulator = sim
+
+
+def GetSimulator():
+    if _simulator is None:
+        raise RuntimeError('模拟 uiautomation 尚未绑定模拟器')
+    return _simulator
+
+
+def SetGlobalSearchTimeout(seconds):
+    global TIME_OUT_SECOND
+    TIME_OUT_SECOND = seconds
+
+
+ControlTypeNames = {value: name for name, value in vars(ControlType).items() if not name.startswith('_')}
+
+
+class ValuePattern:
+    def __init__(self, element):
+        self._element = element
+
+    @property
+    def Value(self):
+        GetSimulator().call('property')
+        return self._element.value
+
+
+class Control:
+    """控件：element 为空时按 searchProperties 懒查找"""
+
+    ControlTypeValue = None
+
+    def __init__(self, searchFromControl=None, searchDepth=0xFFFFFFFF, searchInterval=0.5,
+                 foundIndex=1, element=None, **searchProperties):
+        self.searchFromControl = searchFromControl
+        self.searchDepth = searchDepth
+        self.searchInterval = searchInterval
+        self.foundIndex = foundIndex
+        self.searchProperties = searchProperties
+        self.regexName = re.compile(searchProperties['RegexName']) if 'RegexName' in searchProperties else None
+        self._element = element
+        self._elementDirectFromParent = element is not None
+
+    @staticmethod
+    def CreateControlFromElement(element):
+        return CONTROL_CLASSES.get(element.control_type, Control)(element=element)
+
+    # ---------- 查找 ----------
+
+    def _match(self, element):
+        if self.ControlTypeValue is not None and element.type_value != self.ControlTypeValue:
+            return False
+        for key, value in self.searchProperties.items():
+            if key == 'Name' and element.name != value:
+                return False
+            if key == 'SubName' and value not in element.name:
+                return False
+            if key == 'RegexName' and not self.regexName.match(element.name):
+                return False
+            if key == 'ClassName' and element.class_name != value:
+                return False
+        return True
+
+    def _search(self):
+        sim = GetSimulator()
+        root = self.searchFromControl.Element if self.searchFromControl is not None else sim.root
+        found = 0
+        stack = [(child, 1) for child in reversed(root.children())]
+        while stack:
+            element, depth = stack.pop()
+            sim.call('walk')
+            if self._match(element):
+                found += 1
+                if found == self.foundIndex:
+                    return element
+            if depth < self.searchDepth:
+                stack.extend((child, depth + 1) for child in reversed(element.children()))
+        return None
+
+    def Exists(self, maxSearchSeconds=5, searchIntervalSeconds=0.5, printIfNotExist=False):
+        if self._elementDirectFromParent:
+            return self._element.alive
+        start = time.monotonic()
+        while True:
+            element = self._search()
+            if element is not None:
+                self._element = element
+                return True
+            remaining = start + maxSearchSeconds - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(searchIntervalSeconds, remaining))
+
+    def Refind(self, maxSearchSeconds=None, searchIntervalSeconds=None, raiseException=True):
+        timeout = TIME_OUT_SECOND if maxSearchSeconds is None else maxSearchSeconds
+        if not self.Exists(timeout, searchIntervalSeconds or self.searchInterval):
+            if raiseException:
+                raise LookupError(f'Find Control Timeout({timeout}s): {self.GetSearchPropertiesStr()}')
+            return False
+        return True
+
+    def GetSearchPropertiesStr(self):
+        props = dict(self.searchProperties)
+        if self.ControlTypeValue is not None:
+            props['ControlType'] = ControlTypeNames[self.ControlTypeValue]
+        return '{' + ', '.join(f'{k}: {v!r}' for k, v in props.items()) + '}'
+
+    @property
+    def Element(self):
+        if self._element is None:
+            self.Refind()
+        return self._element
+
+    # ---------- 属性 ----------
+
+    def _get(self, attr):
+        element = self.Element
+        GetSimulator().call('property')
+        return getattr(element, attr)
+
+    @property
+    def Name(self):
+        return self._get('name')
+
+    @property
+    def ClassName(self):
+        return self._get('class_name')
+
+    @property
+    def AutomationId(self):
+        return ''
+
+    @property
+    def ControlType(self):
+        return self.Element.type_value
+
+    @property
+    def ControlTypeName(self):
+        return self.Element.control_type
+
+    @property
+    def BoundingRectangle(self):
+        return self._get('rect')
+
+    @property
+    def HasKeyboardFocus(self):
+        return self._get('has_focus')
+
+    @property
+    def IsOffscreen(self):
+        return self._get('rect').width() == 0
+
+    @property
+    def NativeWindowHandle(self):
+        return self._get('hwnd')
+
+    def GetRuntimeId(self):
+        return list(self._get('runtime_id'))
+
+    def GetValuePattern(self):
+        return ValuePattern(self.Element)
+
+    # ---------- 遍历 ----------
+
+    def _wrap(self, element):
+        return None if element is None else Control.CreateControlFromElement(element)
+
+    def GetChildren(self):
+        sim = GetSimulator()
+        sim.call('walk')
+        children = self.Element.children()
+        for _ in children:
+            sim.call('walk')
+        return [Control.CreateControlFromElement(child) for child in children]
+
+    def GetFirstChildControl(self):
+        GetSimulator().call('walk')
+        children = self.Element.children()
+        return self._wrap(children[0] if children else None)
+
+    def GetLastChildControl(self):
+        GetSimulator().call('walk')
+        children = self.Element.children()
+        return self._wrap(children[-1] if children else None)
+
+    def _sibling(self, offset):
+        GetSimulator().call('walk')
+        element = self.Element
+        if element.parent is None:
+            return None
+        siblings = element.parent.children()
+        if element not in siblings:
+            return None
+        index = siblings.index(element) + offset
+        return self._wrap(siblings[index] if 0 <= index < len(siblings) else None)
+
+    def GetNextSiblingControl(self):
+        return self._sibling(1)
+
+    def GetPreviousSiblingControl(self):
+        return self._sibling(-1)
+
+    def GetParentControl(self):
+        GetSimulator().call('walk')
+        return self._wrap(self.Element.parent)
+
+    # ---------- 操作 ----------
+
+    def _input(self, action, *args, waitTime=OPERATION_WAIT_TIME):
+        element = self.Element
+        sim = GetSimulator()
+        sim.call('input')
+        getattr(element, action)(*args)
+        sim.wait(waitTime)
+
+    def Click(self, x=None, y=None, ratioX=0.5, ratioY=0.5, simulateMove=True, waitTime=OPERATION_WAIT_TIME):
+        self._input('click', waitTime=waitTime)
+
+    def DoubleClick(self, x=None, y=None, ratioX=0.5, ratioY=0.5, simulateMove=True, waitTime=OPERATION_WAIT_TIME):
+        self._input('double_click', waitTime=waitTime)
+
+    def RightClick(self, x=None, y=None, ratioX=0.5, ratioY=0.5, simulateMove=True, waitTime=OPERATION_WAIT_TIME):
+        self._input('right_click', waitTime=waitTime)
+
+    def SendKeys(self, text, interval=0.01, waitTime=OPERATION_WAIT_TIME, charMode=True):
+        self._input('send_keys', text, waitTime=waitTime)
+
+    def WheelDown(self, wheelTimes=1, interval=0.05, waitTime=OPERATION_WAIT_TIME):
+        self._input('wheel', wheelTimes, waitTime=waitTime + interval * wheelTimes)
+
+    def WheelUp(self, wheelTimes=1, interval=0.05, waitTime=OPERATION_WAIT_TIME):
+        self._input('wheel', -wheelTimes, waitTime=waitTime + interval * wheelTimes)
+
+    def SetFocus(self):
+        self._input('focus', waitTime=0)
+
+    def SwitchToThisWindow(self, waitTime=OPERATION_WAIT_TIME):
+        element = self.Element
+        sim = GetSimulator()
+        sim.call('window')
+        sim.activate(element)
+        sim.wait(waitTime)
+
+    def MoveCursorToMyCenter(self, simulateMove=True):
+        GetSimulator().call('input')
+
+    def __repr__(self):
+        if self._element is None:
+            return f'<{type(self).__name__} {self.GetSearchPropertiesStr()}>'
+        return f'<{self._element.control_type} Name={self._element.name!r} ClassName={self._element.class_name!r}>'
+
+
+def _make_search_method(cls_name):
+    def method(self, searchDepth=0xFFFFFFFF, searchInterval=0.5, foundIndex=1, **searchProperties):
+        return CONTROL_CLASSES[cls_name](searchFromControl=self, searchDepth=searchDepth,
+                                         searchInterval=searchInterval, foundIndex=foundIndex,
+                                         **searchProperties)
+    method.__name__ = cls_name
+    return method
+
+
+CONTROL_CLASSES = {}
+for _name, _value in vars(ControlType).items():
+    if _name.startswith('_'):
+        continue
+    CONTROL_CLASSES[_name] = type(_name, (Control,), {'ControlTypeValue': _value})
+    globals()[_name] = CONTROL_CLASSES[_name]
+    setattr(Control, _name, _make_search_method(_name))
+
+
+def _control_method(self, searchDepth=0xFFFFFFFF, searchInterval=0.5, foundIndex=1, **searchProperties):
+    return Control(searchFromControl=self, searchDepth=searchDepth, searchInterval=searchInterval,
+                   foundIndex=foundIndex, **searchProperties)
+
+
+Control.Control = _control_method
+
+
+def GetRootControl():
+    return Control.CreateControlFromElement(GetSimulator().root)
+
+
+def Click(x, y, waitTime=OPERATION_WAIT_TIME):
+    sim = GetSimulator()
+    sim.call('input')
+    sim.wait(waitTime)
+
+
+class UIAutomationInitializerInThread:
+    """在线程中初始化 COM，模拟器只做计数"""
+
+    def __init__(self, debug=False):
+        self.debug = debug
+
+    def __enter__(self):
+        GetSimulator().call('com_init')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
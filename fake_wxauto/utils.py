@@ -0,0 +1,86 @@
+"""模拟后端的 wxauto.utils：Win32 窗口、剪贴板和截图操作都转发给模拟器"""
+import logging
+
+from . import uiautomation as uia
+
+wxlog = logging.getLogger('wxauto')
+
+
+def set_debug(debug: bool):
+    wxlog.setLevel(logging.DEBUG if debug else logging.WARNING)
+
+
+class _Win32Gui:
+    """win32gui 中 wxauto.py 用到的函数"""
+
+    @staticmethod
+    def ShowWindow(hwnd, cmd):
+        uia.GetSimulator().call('window')
+
+    @staticmethod
+    def SetWindowPos(hwnd, after, x, y, cx, cy, flags):
+        sim = uia.GetSimulator()
+        sim.call('window')
+        if after == -1:
+            # HWND_TOPMOST：窗口被提到最前
+            sim.focus_changes += 1
+
+    @staticmethod
+    def GetForegroundWindow():
+        sim = uia.GetSimulator()
+        sim.call('window')
+        return sim.foreground.hwnd if sim.foreground is not None else 0
+
+
+    @staticmethod
+    def PostMessage(hwnd, msg, wparam, lparam):
+        sim = uia.GetSimulator()
+        sim.call('window')
+        if msg == 0x0010:
+            # WM_CLOSE
+            sim.close_window(hwnd)
+
+
+win32gui = _Win32Gui()
+
+
+def FindWindow(name=None, classname=None):
+    return uia.GetSimulator().find_window(name, classname)
+
+
+def GetPathByHwnd(hwnd):
+    return r'C:\Program Files\Tencent\WeChat\WeChat.exe'
+
+
+def GetVersionByPath(file_path):
+    return '3.9.11.17'
+
+
+def IsRedPixel(uicontrol):
+    """截图判断图标上是否有红点，模拟器中等价于是否有未读消息"""
+    sim = uia.GetSimulator()
+    sim.call('capture')
+    return sim.has_unread()
+
+
+def GetAllControlList(ele):
+    def findall(control, depth=0, controllist=None):
+        if controllist is None:
+            controllist = [control]
+        for child in control.GetChildren():
+            controllist.append(child)
+            findall(child, depth + 1, controllist)
+        return controllist
+    return findall(ele)[1:]
+
+
+def SetClipboardText(text: str):
+    uia.GetSimulator().clipboard = text
+
+
+def SetClipboardFiles(paths):
+    uia.GetSimulator().clipboard = '\n'.join(paths)
+
+
+def Click(rect):
+    uia.Click(rect.xcenter(), rect.ycenter())
@@ -0,0 +1,240 @@
+"""
+事件时间段的区间索引
+
+原来新增 / 修改事件时只检查同一天是否有完全相同的 time 字符串，
+14:00–16:00 的会议挡不住 15:00 的新事件，agent 新增时更是不做检查。
+IntervalIndex 是一棵按开始时间排序、每个节点记录子树最大结束时间的 treap（区间树）：
+
+    - 插入 / 删除期望 O(log n)，批量建树 O(n log n)（排序）+ O(n)
+    - 查询与 [start, end) 重叠的区间：沿“子树最大结束时间 > start”剪枝，
+      找到第一个冲突 O(log n)，列出全部 k 个冲突 O(k log n) 以内
+
+时间用 'YYYY-MM-DD HH:MM:SS' 表示，内部换算成整数秒。没有结束时间的事件视为占用 1 秒，
+因此两个同一时刻开始的事件、以及落在某个时间段内的时刻事件都算冲突，与原来“同一时间已有安排”的规则一致。
+
+用法：
+    >>> index = IntervalIndex()
+    >>> index.add('2024-05-03 14:00:00', '2024-05-03 16:00:00', ('2024-05-03', '14:00:00', '评审'))
+    >>> index.overlaps('2024-05-03 15:00:00')
+    [('2024-05-03 14:00:00', '2024-05-03 16:00:00', ('2024-05-03', '14:00:00', '评审'))]
+"""
+import itertools
+import random
+from datetime import datetime
+
+
+def to_seconds(text):
+    """'YYYY-MM-DD HH:MM:SS' -> 自公元元年起的秒数"""
+    dt = datetime.fromisoformat(text)
+    return dt.toordinal() * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'seq', 'value', 'start_text', 'end_text',
+                 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start, end, seq, value, start_text, end_text, priority):
+        self.start = start
+        self.end = end
+        self.seq = seq
+        self.value = value
+        self.start_text = start_text
+        self.end_text = end_text
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+    @property
+    def key(self):
+        return self.start, self.end, self.seq
+
+    def item(self):
+        return self.start_text, self.end_text, self.value
+
+
+def _update(node):
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+
+def _split(node, key):
+    """按 key 拆成 (< key, >= key) 两棵树"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """合并两棵树，left 中的键都小于 right 中的键"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _remove_key(node, key):
+    if node is None:
+        return None
+    if node.key == key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _remove_key(node.left, key)
+    else:
+        node.right = _remove_key(node.right, key)
+    _update(node)
+    return node
+
+
+class IntervalIndex:
+    """区间树：[(开始, 结束, 值), ...]，结束为 None 表示只占一个时刻"""
+
+    def __init__(self, items=()):
+        self._root = None
+        self._size = 0
+        self._seq = itertools.count()
+        self._random = random.Random(0)
+        self.build(items)
+
+    def __len__(self):
+        return self._size
+
+    def _node(self, start, end, value):
+        s = to_seconds(start)
+        e = to_seconds(end) if end else s
+        # 没有结束时间或结束不晚于开始的事件占用 1 秒
+        return _Node(s, max(e, s + 1), next(self._seq), value, start, end, self._random.random())
+
+    def build(self, items):
+        """批量建树，替换原有内容：排序后用栈一次构造出 treap
+
+        Args:
+            items (iterable): [(开始, 结束, 值), ...]
+        """
+        nodes = sorted((self._node(*item) for item in items), key=lambda n: n.key)
+        stack = []
+        for node in nodes:
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        self._root = stack[0] if stack else None
+        self._size = len(nodes)
+        # 自底向上计算 max_end（后序遍历）
+        pending, order = [self._root] if self._root else [], []
+        while pending:
+            node = pending.pop()
+            order.append(node)
+            if node.left is not None:
+                pending.append(node.left)
+            if node.right is not None:
+                pending.append(node.right)
+        for node in reversed(order):
+            _update(node)
+
+    def add(self, start, end, value):
+        node = self._node(start, end, value)
+        left, right = _split(self._root, node.key)
+        self._root = _merge(_merge(left, node), right)
+        self._size += 1
+
+    def remove(self, start, end, value):
+        """删除一个开始、结束和值都相同的区间
+
+        Returns:
+            bool: 是否找到
+        """
+        s = to_seconds(start)
+        e = max(to_seconds(end) if end else s, s + 1)
+        node = self._root
+        # 开始、结束相同的区间按 seq 排列，先找到其中最左边的一个，再按中序逐个比较值
+        stack = []
+        while node is not None:
+            if (node.start, node.end) < (s, e):
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        target = None
+        while stack:
+            node = stack.pop()
+            if (node.start, node.end) != (s, e):
+                break
+            if node.value == value:
+                target = node
+                break
+            child = node.right
+            while child is not None:
+                stack.append(child)
+                child = child.left
+        if target is None:
+            return False
+        self._root = _remove_key(self._root, target.key)
+        self._size -= 1
+        return True
+
+    def overlaps(self, start, end=None, limit=None):
+        """与 [start, end) 重叠的区间，按开始时间升序
+
+        Args:
+            start (str): 开始时间
+            end (str, optional): 结束时间，为 None 时查询一个时刻
+            limit (int, optional): 最多返回的个数；只需要判断有没有冲突时传 1
+
+        Returns:
+            list: [(开始, 结束, 值), ...]
+        """
+        qs = to_seconds(start)
+        qe = max(to_seconds(end) if end else qs, qs + 1)
+        found = []
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            # 左子树中所有区间都在 qs 之前结束时整棵跳过
+            while node is not None and node.max_end > qs:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start >= qe:
+                # 之后的节点开始得更晚，不可能重叠
+                break
+            if node.end > qs:
+                found.append(node.item())
+                if limit is not None and len(found) >= limit:
+                    break
+            node = node.right
+        return found
+
+    def __iter__(self):
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.item()
+            node = node.right
@@ -0,0 +1,60 @@
+"""
+惰性构建与后台预热
+
+langchain / langchain_openai 的导入加上构建 ChatOpenAI、AgentExecutor 要一两秒，
+放在模块顶层或 CalendarApp.__init__ 中，窗口要等它们全部完成才能显示。
+LazyLoader 把这类构建推迟到第一次使用；窗口显示后再调用 warm_up() 在后台线程中提前构建，
+用户提问时多半已经就绪，没有就绪时 get() 等待同一次构建完成，不会重复构建。
+
+用法：
+    >>> agent = LazyLoader(build_agent, 'agent')
+    >>> root.after(200, agent.warm_up)
+    >>> agent.get().invoke(...)
+"""
+import threading
+import time
+
+
+class LazyLoader:
+    """线程安全的惰性构建
+
+    Args:
+        factory (callable): 无参数，返回构建好的对象
+        name (str): 名称，用于线程名和日志
+    """
+
+    def __init__(self, factory, name):
+        self.factory = factory
+        self.name = name
+        self.seconds = None
+        self._value = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self):
+        """返回构建好的对象，第一次调用时构建；构建失败时抛出异常，下次调用重试"""
+        if self._ready.is_set():
+            return self._value
+        with self._lock:
+            if not self._ready.is_set():
+                t0 = time.perf_counter()
+                self._value = self.factory()
+                self.seconds = time.perf_counter() - t0
+                self._ready.set()
+                print(f"{self.name} 已就绪，耗时 {self.seconds:.2f}s")
+        return self._value
+
+    def warm_up(self):
+        """在后台线程中提前构建"""
+        threading.Thread(target=self._warm_up, name=f'warm-up-{self.name}', daemon=True).start()
+
+    def _warm_up(self):
+        try:
+            self.get()
+        except Exception as e:
+            # 留到第一次使用时再报告
+            print(f"{self.name} 预热失败：{e}")
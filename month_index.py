@@ -0,0 +1,63 @@
+"""
+按月的事件计数索引
+
+每个 'YYYY-MM' 对应一个长度为 32 的计数数组（下标即日期，0 号不用），
+在增删改时增量维护。月历渲染只需要一次 counts() 查找就能得到整月每天的
+事件数，据此着色、显示数量或画热力图，不必逐天查询存储。
+"""
+
+
+class MonthIndex:
+    """{'YYYY-MM': [count_of_day0, count_of_day1, ..., count_of_day31]}"""
+
+    def __init__(self):
+        self._months = {}
+
+    def __contains__(self, key):
+        return key in self._months
+
+    @staticmethod
+    def key(year, month):
+        return f"{year}-{month:02d}"
+
+    def load(self, key, day_counts):
+        """直接设置某月的计数
+
+        Args:
+            key (str): 'YYYY-MM'
+            day_counts (dict): {day(int): count}
+        """
+        counts = [0] * 32
+        for day, count in day_counts.items():
+            counts[day] = count
+        self._months[key] = counts
+
+    def add(self, date, n=1):
+        """date 为 'YYYY-MM-DD'，当天事件数加 n"""
+        day = int(date[8:10])
+        counts = self._months.get(date[:7])
+        if counts is None:
+            counts = self._months[date[:7]] = [0] * 32
+        counts[day] += n
+
+    def remove(self, date, n=1):
+        counts = self._months.get(date[:7])
+        if counts is not None:
+            day = int(date[8:10])
+            counts[day] = max(0, counts[day] - n)
+
+    def discard(self, key):
+        """丢弃某月的计数，下次使用时重新统计"""
+        self._months.pop(key, None)
+
+    def counts(self, year, month):
+        """某月每天的事件数，返回的列表不要修改"""
+        return self._months.get(self.key(year, month)) or [0] * 32
+
+    def bitmap(self, year, month):
+        """某月有事件的日期位图，第 d 位为 1 表示 d 号有事件"""
+        bits = 0
+        for day, count in enumerate(self.counts(year, month)):
+            if count:
+                bits |= 1 << day
+        return bits
@@ -0,0 +1,239 @@
+"""
+微信消息 → 日程的流式处理
+
+原来的 get_wx_msg 把所有消息逐条插入输入框，再整段发给助手：消息一多，输入框卡顿，
+单个提示词超出上下文，且大部分 token 花在与日程无关的消息上。这里改成逐级的生成器：
+
+    harvest_messages  - (会话名, 原始消息)，来自 IncrementalHarvester.harvest()
+    normalize         - ChatMessage，合并空白
+    drop_noise        - 去掉 SYS / 空消息 / [图片] 等占位消息，可以再接一个判断函数
+    chunk             - 按 token 预算打包，每包一次提取
+    MessagePipeline   - 前面几级在生产线程中运行，打好的包放进有界队列；
+                        提取慢时队列满，生产线程阻塞，获取随之暂停（背压）
+
+用法：
+    >>> pipeline = MessagePipeline(harvest_messages(harvester), extract)
+    >>> for batch, result in pipeline: ...
+"""
+import collections
+import json
+import math
+import queue
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+from storage import split_start_time
+
+# 每包的 token 预算；助手的 max_tokens 为 500，输入留足余量
+CHUNK_TOKENS = 1200
+# 占位消息：图片、表情、语音等没有文字内容
+PLACEHOLDERS = {'[图片]', '[动画表情]', '[视频]', '[文件]', '[语音]', '[位置]', '[链接]', '[音乐]', '[名片]'}
+
+EXTRACT_PROMPT = (
+    "下面是若干条微信消息，每行格式为 [群聊] 发送者：内容，私聊省略 [群聊]。"
+    "请找出其中的日程安排，只输出一个 JSON 数组，每一项为 [\"YYYY-MM-DD HH:MM:SS\", \"描述\"]；"
+    "没有日程时输出 []。当前时间为：{current_time}\n\n{messages}"
+)
+
+ChatMessage = collections.namedtuple('ChatMessage', ['session', 'sender', 'content', 'msgid'])
+
+_CJK = re.compile(r'[　-鿿＀-￯]')
+_JSON_ARRAY = re.compile(r'\[.*\]', re.S)
+
+
+def estimate_tokens(text):
+    """粗略估计 token 数：中文按每字 1 个，其余按每 4 个字符 1 个"""
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def format_line(message):
+    """提示词中的一行；私聊的发送者就是会话名，省去会话前缀"""
+    if message.sender == message.session:
+        return f"{message.sender}：{message.content}"
+    return f"[{message.session}] {message.sender}：{message.content}"
+
+
+# ---------- 各级生成器 ----------
+
+def harvest_messages(harvester, defer_save=False):
+    """逐条产出 (会话名, 原始消息)，每个会话读完即产出，不等全部会话获取完
+
+    Args:
+        defer_save (bool): 见 IncrementalHarvester.harvest，提取成功后由调用方提交高水位
+    """
+    for name, msgs in harvester.harvest(defer_save):
+        for msg in msgs:
+            yield name, msg
+
+
+def normalize(items):
+    for session, msg in items:
+        content = ' '.join(str(msg[1]).split())
+        yield ChatMessage(session, msg[0], content, msg[-1])
+
+
+def drop_noise(messages, keep=None):
+    """去掉系统消息、空消息和占位消息
+
+    Args:
+        keep (callable, optional): 额外的判断函数，返回 False 的消息也被丢弃
+    """
+    for message in messages:
+        if message.sender == 'SYS' or not message.content or message.content in PLACEHOLDERS:
+            continue
+        if keep is not None and not keep(message):
+            continue
+        yield message
+
+
+def chunk(messages, budget=CHUNK_TOKENS):
+    """按 token 预算打包；单条超过预算的消息单独成包"""
+    batch, used = [], 0
+    for message in messages:
+        tokens = estimate_tokens(format_line(message)) + 1
+        if batch and used + tokens > budget:
+            yield batch
+            batch, used = [], 0
+        batch.append(message)
+        used += tokens
+    if batch:
+        yield batch
+
+
+def parse_events(text):
+    """解析提取结果中的 JSON 数组
+
+    Returns:
+        list: [(date, time, desc), ...]，无法识别的项被跳过
+    """
+    match = _JSON_ARRAY.search(text or '')
+    if not match:
+        return []
+    try:
+        items = json.loads(match.group(0))
+    except ValueError:
+        return []
+    events = []
+    for item in items:
+        try:
+            start_time, desc = item
+            date, time_ = split_start_time(start_time)
+        except (TypeError, ValueError):
+            continue
+        events.append((date, time_, str(desc)))
+    return events
+
+
+# ---------- 流水线 ----------
+
+class MessagePipeline:
+    """在生产线程中获取、清洗、打包消息，在迭代它的线程中逐包提取
+
+    Args:
+        source (iterable): (会话名, 原始消息) 的可迭代对象，一般为 harvest_messages(harvester)
+        extract (callable): extract(batch) -> 结果，batch 为 ChatMessage 列表
+        budget (int): 每包的 token 预算
+        maxsize (int): 已打包未提取的包数上限
+        keep (callable, optional): 传给 drop_noise 的额外判断函数
+        init (callable, optional): 返回上下文管理器，在生产线程中进入，例如 UIA 的 COM 初始化
+    """
+
+    def __init__(self, source, extract, budget=CHUNK_TOKENS, maxsize=2, keep=None, init=None):
+        self.source = source
+        self.extract = extract
+        self.budget = budget
+        self.keep = keep
+        self.init = init
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        # 进度
+        self.read = 0
+        self.kept = 0
+        self.chunks = 0
+        self.extracted = 0
+        self.tokens = 0
+        self.blocked_seconds = 0.0
+        self.done = False
+        # 全部消息都已获取并提取（没有中途停止或出错）
+        self.complete = False
+
+    def _count_read(self, items):
+        for item in items:
+            self.read += 1
+            yield item
+
+    def _count_kept(self, messages):
+        for message in messages:
+            self.kept += 1
+            yield message
+
+    def _produce(self):
+        try:
+            with (self.init() if self.init is not None else nullcontext()):
+                stages = self._count_kept(drop_noise(normalize(self._count_read(self.source)), self.keep))
+                for batch in chunk(stages, self.budget):
+                    self.chunks += 1
+                    self.tokens += sum(estimate_tokens(format_line(m)) + 1 for m in batch)
+                    if not self._put(batch):
+                        return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        """放入队列，满时等待；停止后返回 False"""
+        t0 = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                self.blocked_seconds += time.perf_counter() - t0
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        """逐包提取
+
+        Yields:
+            tuple: (batch, extract(batch))
+        """
+        producer = threading.Thread(target=self._produce, name='msg-pipeline', daemon=True)
+        producer.start()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                if item is None:
+                    self.complete = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                result = self.extract(item)
+                self.extracted += 1
+                yield item, result
+        finally:
+            self._stop.set()
+            producer.join()
+            self.done = True
+
+    def stop(self):
+        """停止获取，正在提取的包完成后结束迭代"""
+        self._stop.set()
+
+    def progress(self):
+        return {
+            'read': self.read,
+            'kept': self.kept,
+            'chunks': self.chunks,
+            'extracted': self.extracted,
+            'tokens': self.tokens,
+            'blocked_seconds': self.blocked_seconds,
+        }
@@ -0,0 +1,321 @@
+"""
+重复事件：按规则保存，按需展开
+
+每周的站会原来要按每次发生存一条事件，calendar_events.json 越来越大，每次写盘也越来越慢。
+这里每个重复事件只保存一条规则（类似 iCalendar 的 RRULE）：
+
+    FREQ     daily / weekly / monthly
+    INTERVAL 每隔几天 / 周 / 月，默认 1
+    BYDAY    weekly 时在周几发生（MO..SU），默认与开始日期相同
+    COUNT    最多发生几次；UNTIL 最后一天（含）；都没有时一直重复
+    EXDATE   不发生的日期（删除 / 修改了其中一次），COUNT 先于 EXDATE 计算，与 RFC 5545 一致
+
+RecurrenceSet 只在需要时展开：月历渲染某月、列出某天、查询某个区间时，
+按 (规则, 月份) 展开并缓存该月的发生日期，规则变化时只丢弃这条规则的缓存。
+主线程修改规则的同时 agent 工具可能在查询，缓存和规则表由一把锁保护。
+
+用法：
+    >>> rules = RecurrenceSet()
+    >>> rule = rules.add(Rule(None, '2025-03-03', '09:30:00', '站会', **parse_rrule('FREQ=WEEKLY;BYDAY=MO,WE,FR')))
+    >>> rules.get_by_date('2025-03-05')
+    [{'time': '09:30:00', 'description': '站会', 'rule': 1}]
+    >>> rules.counts(2025, 3)[3]
+    1
+"""
+import calendar
+import collections
+import threading
+from datetime import date, datetime, timedelta
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+Rule = collections.namedtuple('Rule', ['id', 'start', 'time', 'description', 'freq', 'interval',
+                                       'byday', 'count', 'until', 'exdates', 'end'])
+# id 由 RecurrenceSet 分配；byday 为星期下标（周一为 0）的元组；end 为可选的结束时刻 'HH:MM:SS'
+Rule.__new__.__defaults__ = ('weekly', 1, (), None, None, (), None)
+
+
+def parse_rrule(text):
+    """解析 'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;COUNT=10' 之类的规则
+
+    UNTIL 可以写成 20250630 或 2025-06-30；也接受 RRULE: 前缀。
+
+    Returns:
+        dict: Rule 的 freq / interval / byday / count / until 字段
+
+    Raises:
+        ValueError: 无法识别的规则
+    """
+    text = text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    fields = {}
+    for part in filter(None, text.split(';')):
+        name, sep, value = part.partition('=')
+        if not sep:
+            raise ValueError(f'无法识别的重复规则：{text}')
+        fields[name.strip().upper()] = value.strip()
+    freq = fields.pop('FREQ', '').lower()
+    if freq not in FREQUENCIES:
+        raise ValueError(f'不支持的重复频率：{freq or "（缺少 FREQ）"}，可选 DAILY / WEEKLY / MONTHLY')
+    rule = {'freq': freq, 'interval': int(fields.pop('INTERVAL', 1))}
+    if rule['interval'] < 1:
+        raise ValueError('INTERVAL 必须是正整数')
+    if 'BYDAY' in fields:
+        try:
+            rule['byday'] = tuple(sorted({WEEKDAYS.index(day.strip().upper()) for day in fields.pop('BYDAY').split(',')}))
+        except ValueError:
+            raise ValueError(f'无法识别的 BYDAY：{text}') from None
+    if 'COUNT' in fields:
+        rule['count'] = int(fields.pop('COUNT'))
+    if 'UNTIL' in fields:
+        until = fields.pop('UNTIL')[:10].replace('-', '')[:8]
+        rule['until'] = datetime.strptime(until, '%Y%m%d').strftime('%Y-%m-%d')
+    if fields:
+        raise ValueError(f'不支持的重复规则字段：{", ".join(fields)}')
+    return rule
+
+
+def format_rrule(rule):
+    """Rule -> 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10'"""
+    parts = [f"FREQ={rule.freq.upper()}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.byday:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in rule.byday))
+    if rule.count:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until:
+        parts.append(f"UNTIL={rule.until.replace('-', '')}")
+    return ";".join(parts)
+
+
+def rule_to_dict(rule):
+    """保存到 JSON / SQLite 的形式"""
+    data = rule._asdict()
+    data['byday'] = list(rule.byday)
+    data['exdates'] = list(rule.exdates)
+    return data
+
+
+def rule_from_dict(data):
+    data = dict(data)
+    data['byday'] = tuple(data.get('byday') or ())
+    data['exdates'] = tuple(data.get('exdates') or ())
+    return Rule(**data)
+
+
+def _month_start(year, month):
+    return date(year, month, 1)
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _iterate(rule, lo, stop=None):
+    """按日期升序生成 [lo, stop) 内的发生日期，不考虑 COUNT / UNTIL / EXDATE"""
+    start = date.fromisoformat(rule.start)
+    lo = max(lo, start)
+    if stop is not None and lo >= stop:
+        return
+    if rule.freq == 'daily':
+        # 第一个不早于 lo 的发生日期
+        skip = -(-(lo - start).days // rule.interval)
+        day = start + timedelta(days=skip * rule.interval)
+        step = timedelta(days=rule.interval)
+        while stop is None or day < stop:
+            yield day
+            day += step
+    elif rule.freq == 'weekly':
+        weekdays = rule.byday or (start.weekday(),)
+        first_monday = start - timedelta(days=start.weekday())
+        week = (lo - first_monday).days // 7
+        week = -(-week // rule.interval) * rule.interval
+        while True:
+            monday = first_monday + timedelta(weeks=week)
+            if stop is not None and monday >= stop:
+                return
+            for weekday in weekdays:
+                day = monday + timedelta(days=weekday)
+                if stop is not None and day >= stop:
+                    return
+                if day >= lo:
+                    yield day
+            week += rule.interval
+    else:
+        month = (lo.year - start.year) * 12 + lo.month - start.month
+        month = -(-month // rule.interval) * rule.interval
+        while True:
+            year, month0 = divmod(start.year * 12 + start.month - 1 + month, 12)
+            if stop is not None and date(year, month0 + 1, 1) >= stop:
+                return
+            # 没有这一天的月份（如 31 号）跳过
+            if start.day <= calendar.monthrange(year, month0 + 1)[1]:
+                day = date(year, month0 + 1, start.day)
+                if day >= lo and (stop is None or day < stop):
+                    yield day
+            month += rule.interval
+
+
+def _end_time(day, time, end):
+    """某次发生的结束时间；end 不晚于开始时刻时视为次日"""
+    if not end:
+        return None
+    if end <= time:
+        day += timedelta(days=1)
+    return f"{day.isoformat()} {end}"
+
+
+class RecurrenceSet:
+    """一组重复规则及其按月展开的缓存
+
+    Args:
+        rules (iterable): 已有的 Rule
+    """
+
+    def __init__(self, rules=()):
+        self._rules = {}
+        # {(规则 id, 'YYYY-MM'): ['YYYY-MM-DD', ...]}
+        self._months = {}
+        # {'YYYY-MM': (每天发生次数的数组, {date: [Rule, ...]})}，由上面的缓存合成，任何规则变化都整体丢弃
+        self._tables = {}
+        # {规则 id: 最后一次发生的日期}，由 COUNT / UNTIL 算出，None 表示一直重复
+        self._last = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        for rule in rules:
+            self._rules[rule.id] = rule
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._rules.values()))
+
+    def get(self, rule_id):
+        return self._rules.get(rule_id)
+
+    def add(self, rule):
+        """新增规则，id 为 None 时分配新 id
+
+        Returns:
+            Rule: 带 id 的规则
+        """
+        if rule.freq not in FREQUENCIES:
+            raise ValueError(f'不支持的重复频率：{rule.freq}')
+        date.fromisoformat(rule.start)
+        datetime.strptime(rule.time, '%H:%M:%S')
+        with self._lock:
+            if rule.id is None:
+                rule = rule._replace(id=max(self._rules, default=0) + 1)
+            self._rules[rule.id] = rule
+            self._invalidate(rule.id)
+        return rule
+
+    def remove(self, rule_id):
+        """删除规则，返回被删除的 Rule，不存在时返回 None"""
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is not None:
+                self._invalidate(rule_id)
+        return rule
+
+    def skip(self, rule_id, day):
+        """规则在 day 这天不再发生，返回更新后的 Rule"""
+        with self._lock:
+            rule = self._rules[rule_id]
+            if day not in rule.exdates:
+                rule = self._rules[rule_id] = rule._replace(exdates=tuple(sorted(rule.exdates + (day,))))
+                self._invalidate(rule_id)
+        return rule
+
+    def _invalidate(self, rule_id):
+        for key in [key for key in self._months if key[0] == rule_id]:
+            del self._months[key]
+        self._last.pop(rule_id, None)
+        self._tables.clear()
+
+    def _last_day(self, rule):
+        if rule.id not in self._last:
+            last = date.fromisoformat(rule.until) if rule.until else None
+            if rule.count:
+                for n, day in enumerate(_iterate(rule, date.fromisoformat(rule.start), last and last + timedelta(days=1)), 1):
+                    if n == rule.count:
+                        last = day
+                        break
+            self._last[rule.id] = last
+        return self._last[rule.id]
+
+    def month_dates(self, rule, year, month):
+        """规则在某月的发生日期 ['YYYY-MM-DD', ...]，按 (规则, 月份) 缓存"""
+        key = (rule.id, f"{year}-{month:02d}")
+        with self._lock:
+            dates = self._months.get(key)
+            if dates is not None:
+                self.hits += 1
+                return dates
+            self.misses += 1
+            first = _month_start(year, month)
+            stop = _next_month(first)
+            last = self._last_day(rule)
+            if last is not None and last < stop:
+                stop = last + timedelta(days=1)
+            exdates = set(rule.exdates)
+            dates = self._months[key] = [day.isoformat() for day in _iterate(rule, first, stop)
+                                         if day.isoformat() not in exdates]
+        return dates
+
+    @staticmethod
+    def event(rule, day):
+        """某次发生对应的事件，与普通事件格式相同，另带 "rule": 规则 id"""
+        event = {"time": rule.time, "description": rule.description, "rule": rule.id}
+        end = _end_time(date.fromisoformat(day), rule.time, rule.end)
+        if end:
+            event["end"] = end
+        return event
+
+    def _month(self, year, month):
+        """某月的 (每天发生次数, {date: [Rule, ...]})"""
+        key = f"{year}-{month:02d}"
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                counts, days = [0] * 32, {}
+                for rule in self._rules.values():
+                    for day in self.month_dates(rule, year, month):
+                        counts[int(day[8:])] += 1
+                        days.setdefault(day, []).append(rule)
+                table = self._tables[key] = (counts, days)
+        return table
+
+    def counts(self, year, month):
+        """某月每天的发生次数（长度为 32 的数组），不要修改"""
+        return self._month(year, month)[0]
+
+    def get_by_date(self, day):
+        """某天发生的事件"""
+        if not self._rules:
+            return []
+        rules = self._month(int(day[:4]), int(day[5:7]))[1].get(day, ())
+        return [self.event(rule, day) for rule in rules]
+
+    def get_range(self, start_date, end_date):
+        """[start_date, end_date) 内发生的事件
+
+        Returns:
+            dict: {date: [event, ...]}，不保证按日期排序
+        """
+        days = {}
+        if not self._rules or start_date >= end_date:
+            return days
+        first = date.fromisoformat(start_date).replace(day=1)
+        while first.isoformat() < end_date:
+            for day, rules in self._month(first.year, first.month)[1].items():
+                if start_date <= day < end_date:
+                    days[day] = [self.event(rule, day) for rule in rules]
+            first = _next_month(first)
+        return days
@@ -0,0 +1,75 @@
+"""
+合并刷新调度
+
+连续的增删改（例如 agent 一轮对话里新增 10 条日程）只标记“界面脏 / 存储脏”，
+在 Tk 空闲时统一刷新一次界面、写一次磁盘。每次标记都会把刷新往后推
+debounce_ms，但从第一次标记起最多延迟 max_latency_ms。
+"""
+import time
+
+
+class RefreshScheduler:
+    """界面刷新与持久化的合并调度器
+
+    Args:
+        root: Tk 根窗口
+        render (callable): 刷新界面
+        persist (callable): 持久化
+        debounce_ms (int): 每次标记后等待的毫秒数
+        max_latency_ms (int): 从第一次标记到刷新的最大延迟
+    """
+
+    def __init__(self, root, render, persist, debounce_ms=16, max_latency_ms=100):
+        self.root = root
+        self.render = render
+        self.persist = persist
+        self.debounce_ms = debounce_ms
+        self.max_latency_ms = max_latency_ms
+        self._render_dirty = False
+        self._persist_dirty = False
+        self._first_dirty = None
+        self._timer_id = None
+        self._idle_id = None
+        # 统计：标记次数、实际刷新次数
+        self.marks = 0
+        self.flushes = 0
+
+    def mark_dirty(self, render=True, persist=True):
+        """标记需要刷新界面 / 持久化"""
+        self._render_dirty |= render
+        self._persist_dirty |= persist
+        self.marks += 1
+        if self._idle_id is not None:
+            # 已经在等待空闲回调
+            return
+        now = time.monotonic()
+        if self._first_dirty is None:
+            self._first_dirty = now
+        if self._timer_id is not None:
+            self.root.after_cancel(self._timer_id)
+        waited_ms = (now - self._first_dirty) * 1000
+        delay = int(max(0, min(self.debounce_ms, self.max_latency_ms - waited_ms)))
+        self._timer_id = self.root.after(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer_id = None
+        self._idle_id = self.root.after_idle(self.flush)
+
+    def flush(self):
+        """立即执行待处理的刷新"""
+        if self._timer_id is not None:
+            self.root.after_cancel(self._timer_id)
+            self._timer_id = None
+        if self._idle_id is not None:
+            self.root.after_cancel(self._idle_id)
+            self._idle_id = None
+        render, persist = self._render_dirty, self._persist_dirty
+        self._render_dirty = self._persist_dirty = False
+        self._first_dirty = None
+        if not (render or persist):
+            return
+        self.flushes += 1
+        if persist:
+            self.persist()
+        if render:
+            self.render()
@@ -0,0 +1,173 @@
+"""
+agent 回答缓存
+
+“今天有什么安排”“明天有什么会”这类只读问题会被反复提问，每次都要走一遍 agent_executor.invoke。
+ResponseCache 以 (规范化的问题, 问题所指的日期, 日历版本号) 为键缓存回答：
+
+    - 规范化：全角转半角（NFKC）、小写、去掉空白和句末标点，“明天有什么安排？”与“明天有什么安排”命中同一项
+    - 日期：time_parser 解析出的日期 / 范围，没有时间表达时为当天；“明天”在不同的日子里是不同的键
+    - 版本号：EventStorage.version，任何增删都会递增，旧版本的缓存项不再被命中，随 LRU / TTL 淘汰
+
+内存中为 LRU + TTL；可选的磁盘层（shelve）在重启后继续使用，
+退出时记下数据文件指纹和版本号，下次启动时指纹不一致（数据被其他程序修改过）就清空磁盘层。
+
+用法：
+    >>> cache = ResponseCache(path='response_cache')
+    >>> storage.version = cache.restore(storage.fingerprint())
+    >>> key = cache.key(question, storage.version)
+    >>> answer = cache.get(key)
+    >>> cache.put(key, answer, storage.version)
+"""
+import collections
+import re
+import shelve
+import threading
+import time
+import unicodedata
+from datetime import datetime
+
+from time_parser import parse
+
+_PUNCTUATION = re.compile(r'[\s?!.,;:~。，、；：？！…]+')
+_META = '__meta__'
+
+
+def normalize_question(question):
+    """全角转半角、小写、去掉空白和标点"""
+    return _PUNCTUATION.sub('', unicodedata.normalize('NFKC', question).lower())
+
+
+def reference_date(question, now=None):
+    """问题所指的日期：'YYYY-MM-DD' 或 'YYYY-MM-DD~YYYY-MM-DD'，没有时间表达时为当天"""
+    now = now or datetime.now()
+    expr = parse(question, now)
+    if expr.date is None:
+        return now.strftime('%Y-%m-%d')
+    if expr.end_date is not None:
+        return f"{expr.date:%Y-%m-%d}~{expr.end_date:%Y-%m-%d}"
+    return expr.date.strftime('%Y-%m-%d')
+
+
+class ResponseCache:
+    """LRU + TTL 的回答缓存，可选 shelve 磁盘层
+
+    Args:
+        maxsize (int): 内存中的最大条数
+        ttl (float): 有效秒数；回答里常有“还有 2 小时”之类相对当前时间的内容，不宜太长
+        path (str, optional): 磁盘层的 shelve 文件名，为 None 时只用内存
+    """
+
+    def __init__(self, maxsize=256, ttl=600, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._entries = collections.OrderedDict()    # {key: (写入时间, 回答)}
+        self._lock = threading.Lock()
+        self._shelf = shelve.open(path) if path else None
+        # 统计
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(question, version, now=None):
+        return normalize_question(question), reference_date(question, now), version
+
+    def _fresh(self, stored_at):
+        return time.time() - stored_at < self.ttl
+
+    def get(self, key):
+        """命中时返回缓存的回答，否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._fresh(entry[0]):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None and self._shelf is not None:
+                stored = self._shelf.get(repr(key))
+                if stored is not None and self._fresh(stored[0]):
+                    entry = stored[:2]
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, answer, version):
+        """写入回答
+
+        version 为回答生成之后的日历版本号：和键中的版本号不同，说明回答期间日历被修改过
+        （例如 agent 调用了新增工具），这样的回答不缓存。
+        """
+        with self._lock:
+            if answer is None or version != key[2]:
+                self.rejected += 1
+                return False
+            entry = (time.time(), answer)
+            self._remember(key, entry)
+            if self._shelf is not None:
+                self._shelf[repr(key)] = entry + (version,)
+            self.stores += 1
+            return True
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._shelf is not None:
+                self._shelf.clear()
+
+    def restore(self, fingerprint):
+        """启动时调用：数据文件与上次退出时一致，则返回上次的版本号，磁盘层继续有效；
+        否则清空磁盘层并返回 0
+
+        Args:
+            fingerprint: EventStorage.fingerprint()，为 None 时（内存存储）磁盘层无从校验，直接清空
+        """
+        if self._shelf is None:
+            return 0
+        meta = self._shelf.get(_META)
+        if fingerprint is not None and meta is not None and meta[0] == fingerprint:
+            return meta[1]
+        self.clear()
+        return 0
+
+    def close(self, fingerprint=None, version=0):
+        """退出时调用，fingerprint 和 version 应在存储关闭（数据写完）之后取得"""
+        with self._lock:
+            if self._shelf is None:
+                return
+            for k in [k for k in self._shelf.keys() if k != _META]:
+                stored_at, _, stored_version = self._shelf[k]
+                # 只留下当前版本、尚未过期的回答
+                if stored_version != version or not self._fresh(stored_at):
+                    del self._shelf[k]
+            self._shelf[_META] = (fingerprint, version)
+            self._shelf.close()
+            self._shelf = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'rejected': self.rejected,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
@@ -0,0 +1,116 @@
+"""
+日程候选消息的本地预筛
+
+绝大多数微信消息（“好的”、表情、系统消息）不含时间表达，没有必要发给模型。
+ScheduleFilter 用一个预编译的正则（中英文日期 / 时间表达的并集）判断消息是否可能包含日程，
+再按会话 / 发送者白名单过滤，只把候选消息交给模型，并统计命中率和省下的模型调用次数。
+
+用法：
+    >>> keep = ScheduleFilter(sessions={'项目群'})
+    >>> MessagePipeline(source, extract, keep=keep)
+    >>> keep.report()
+"""
+import math
+import re
+
+from msg_pipeline import CHUNK_TOKENS, estimate_tokens, format_line
+
+_CN_NUM = r'[0-9０-９零一二两三四五六七八九十]{1,3}'
+_WEEKDAY = r'[一二三四五六日天1-7]'
+
+TIME_PATTERNS = [
+    # 相对日期
+    r'今天|明天|后天|大后天|今晚|明晚|明早|今早|明儿|这周|本周|下周|下下周|下个?月|月底|月初|周末',
+    # 星期
+    rf'(?:周|星期|礼拜){_WEEKDAY}',
+    # 日期：2024-05-03、2024/5/3、5/3、5月3日、3号
+    r'\d{4}[-/.年]\d{1,2}[-/.月]\d{1,2}',
+    r'(?<!\d)\d{1,2}/\d{1,2}(?!\d)',
+    rf'{_CN_NUM}月{_CN_NUM}[日号]?',
+    rf'{_CN_NUM}[日号](?![子本])',
+    # 时刻：3点、十点半、15:30、下午三点；“快一点”“早一点”不算
+    rf'(?<![快早晚多少有慢大小好差])(?:{_CN_NUM})[点时](?:半|一刻|三刻|{_CN_NUM}分?)?',
+    r'(?<![\d:])\d{1,2}[:：]\d{2}(?![\d:])',
+    r'(?:上午|下午|中午|晚上|早上|傍晚|凌晨)',
+    # 英文
+    r'\b(?:today|tonight|tomorrow|tmr|next\s+(?:week|month|mon|tue|wed|thu|fri|sat|sun)\w*)\b',
+    r'\b(?:mon|tues|wednes|thurs|fri|satur|sun)day\b',
+    r'\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b',
+    r'\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b',
+]
+
+TIME_PATTERN = re.compile('|'.join(f'(?:{p})' for p in TIME_PATTERNS), re.I)
+
+
+class ScheduleFilter:
+    """判断一条消息是否可能包含日程
+
+    Args:
+        sessions (iterable, optional): 会话白名单，为 None 时不限制
+        senders (iterable, optional): 发送者白名单，为 None 时不限制
+        pattern (re.Pattern): 时间表达的正则
+    """
+
+    def __init__(self, sessions=None, senders=None, pattern=TIME_PATTERN):
+        self.sessions = set(sessions) if sessions else None
+        self.senders = set(senders) if senders else None
+        self.pattern = pattern
+        self.reset()
+
+    def reset(self):
+        """清零统计，每次获取开始时调用"""
+        self.seen = 0
+        self.passed = 0
+        self.tokens_seen = 0
+        self.tokens_passed = 0
+        self.batches_seen = 0
+        self.batches_passed = 0
+
+    def match(self, session, sender, content):
+        if self.sessions is not None and session not in self.sessions:
+            return False
+        if self.senders is not None and sender not in self.senders:
+            return False
+        return self.pattern.search(content) is not None
+
+    def __call__(self, message):
+        """message 为 msg_pipeline.ChatMessage，可直接作为 MessagePipeline 的 keep"""
+        tokens = estimate_tokens(format_line(message)) + 1
+        self.seen += 1
+        self.tokens_seen += tokens
+        if self.match(message.session, message.sender, message.content):
+            self.passed += 1
+            self.tokens_passed += tokens
+            return True
+        return False
+
+    def filter_batch(self, batch):
+        """过滤监听到的批次 {会话名: [消息, ...]}，没有候选消息时返回空 dict（省下一次模型调用）"""
+        self.batches_seen += 1
+        result = {}
+        for session, msgs in batch.items():
+            kept = [msg for msg in msgs
+                    if msg[0] != 'SYS' and self.match(session, msg[0], msg[1])]
+            self.seen += len(msgs)
+            self.passed += len(kept)
+            if kept:
+                result[session] = kept
+        if result:
+            self.batches_passed += 1
+        return result
+
+    def report(self, budget=CHUNK_TOKENS):
+        """命中率和省下的模型调用次数
+
+        分包提取时，不过滤的调用次数按 token 总量 / 每包预算估计
+        """
+        calls_without = math.ceil(self.tokens_seen / budget) + self.batches_seen
+        calls_with = math.ceil(self.tokens_passed / budget) + self.batches_passed
+        return {
+            'seen': self.seen,
+            'passed': self.passed,
+            'hit_rate': self.passed / self.seen if self.seen else 0.0,
+            'calls_without': calls_without,
+            'calls_with': calls_with,
+            'calls_avoided': calls_without - calls_with,
+        }
@@ -0,0 +1,314 @@
+"""
+日程存储层
+
+schedules 表中的 start_time 统一保存为 'YYYY-MM-DD HH:MM:SS' 格式的文本，
+该格式按字典序即按时间排序，配合 B-tree 索引后，按天 / 周 / 任意 [from, to)
+区间的查询都可以走索引范围扫描，而不是 LIKE 全表扫描。
+
+end_time 为可选的结束时间（同样的格式），没有时为 NULL。
+重复事件不展开成多行，每条规则在 recurrences 表中保存一行 JSON（见 recurrence.rule_to_dict）。
+
+旧版 langchain.db 在第一次打开时会自动迁移（v1：规范化 start_time 并建立索引；v2：增加 end_time 列；v3：增加 recurrences 表），
+也可以手动执行：python schedule_store.py migrate langchain.db
+"""
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from sqlite_pool import ConnectionManager
+
+DB_FILE = 'langchain.db'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_FORMAT = '%Y-%m-%d'
+SCHEMA_VERSION = 3
+
+# 允许写入的时间格式，最终都会规范化为 TIME_FORMAT
+INPUT_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d %H:%M',
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+)
+
+SQL_CREATE_TABLE = '''
+create table if not exists schedules
+(
+    id          INTEGER
+        primary key autoincrement,
+    start_time  TEXT default (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')) not null,
+    description TEXT default ''                                                  not null,
+    end_time    TEXT
+);
+'''
+SQL_CREATE_RULES = '''
+create table if not exists recurrences
+(
+    id   INTEGER primary key,
+    rule TEXT not null
+);
+'''
+SQL_PUT_RULE = 'INSERT OR REPLACE INTO recurrences (id, rule) VALUES (?, ?);'
+SQL_DELETE_RULE = 'DELETE FROM recurrences WHERE id = ?;'
+SQL_SELECT_RULES = 'SELECT id, rule FROM recurrences ORDER BY id;'
+SQL_CREATE_INDEX = 'CREATE INDEX IF NOT EXISTS idx_schedules_start_time ON schedules (start_time);'
+SQL_INSERT = 'INSERT INTO schedules (start_time, description, end_time) VALUES (?, ?, ?);'
+SQL_ADD_END_TIME = 'ALTER TABLE schedules ADD COLUMN end_time TEXT;'
+SQL_DELETE_BY_TIME = 'DELETE FROM schedules WHERE start_time = ?;'
+SQL_DELETE_ONE = '''
+    DELETE FROM schedules WHERE id = (
+        SELECT id FROM schedules WHERE start_time = ? AND description = ? LIMIT 1
+    );
+'''
+SQL_COUNT_BY_DAY = '''
+    SELECT substr(start_time, 1, 10), count(*) FROM schedules
+    WHERE start_time >= ? AND start_time < ?
+    GROUP BY substr(start_time, 1, 10);
+'''
+SQL_STATS = 'SELECT count(DISTINCT substr(start_time, 1, 10)), count(*) FROM schedules;'
+# 已经是规范格式的记录不需要再逐行解析
+SQL_SELECT_UNNORMALIZED = '''
+    SELECT id, start_time FROM schedules
+    WHERE start_time NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]';
+'''
+SQL_SELECT_AT = 'SELECT start_time, description, end_time FROM schedules WHERE start_time = ?;'
+SQL_SELECT_ALL = 'SELECT start_time, description, end_time FROM schedules;'
+SQL_SELECT_RANGE = '''
+    SELECT start_time, description, end_time FROM schedules
+    WHERE start_time >= ? AND start_time < ?
+    ORDER BY start_time;
+'''
+
+
+def normalize_time(value):
+    """将时间规范化为 'YYYY-MM-DD HH:MM:SS'
+
+    Args:
+        value (str|datetime): 时间字符串或 datetime 对象
+
+    Returns:
+        str: 规范化后的时间字符串
+
+    Raises:
+        ValueError: 无法识别的时间格式
+    """
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    text = str(value).strip()
+    for fmt in INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime(TIME_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f'无法识别的时间格式：{value}')
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return datetime.strptime(normalize_time(value)[:10], DATE_FORMAT)
+
+
+def day_range(query_date):
+    """某一天对应的 [from, to) 区间"""
+    start = _parse_date(query_date)
+    return start.strftime(TIME_FORMAT), (start + timedelta(days=1)).strftime(TIME_FORMAT)
+
+
+def week_range(query_date):
+    """query_date 所在周（周一至周日）对应的 [from, to) 区间"""
+    day = _parse_date(query_date)
+    start = day - timedelta(days=day.weekday())
+    return start.strftime(TIME_FORMAT), (start + timedelta(days=7)).strftime(TIME_FORMAT)
+
+
+def prefix_range(prefix):
+    """与 LIKE 'prefix%' 等价的 [from, to) 区间，用于 '2024'、'2024-05' 这类前缀查询"""
+    if not prefix:
+        return '', '\uffff'
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def migrate(conn):
+    """把旧版数据库迁移到当前结构（可重复执行）
+
+    v1：旧版 start_time 可能是 '2024-5-3 20:00' 之类的格式，这里统一规范化，
+        无法识别的记录保持原样并打印出来，随后建立 start_time 索引。
+    v2：增加可为空的 end_time 列，已有记录没有结束时间。
+    v3：增加保存重复规则的 recurrences 表。
+
+    Returns:
+        int: 被规范化的记录条数
+    """
+    version = conn.execute('PRAGMA user_version;').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return 0
+    changed = 0
+    with conn:
+        conn.execute(SQL_CREATE_TABLE)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(schedules);')}
+        if 'end_time' not in columns:
+            conn.execute(SQL_ADD_END_TIME)
+        conn.execute(SQL_CREATE_RULES)
+        if version < 1:
+            changed = _normalize_start_times(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION};')
+    return changed
+
+
+def _normalize_start_times(conn):
+    """v1 迁移：规范化 start_time 并建立索引，返回被规范化的记录条数"""
+    rows = conn.execute(SQL_SELECT_UNNORMALIZED).fetchall()
+    updates = []
+    for row_id, start_time in rows:
+        try:
+            normalized = normalize_time(start_time)
+        except ValueError:
+            print(f'无法迁移的日程时间：id={row_id}, start_time={start_time}')
+            continue
+        if normalized != start_time:
+            updates.append((normalized, row_id))
+    conn.executemany('UPDATE schedules SET start_time = ? WHERE id = ?;', updates)
+    conn.execute(SQL_CREATE_INDEX)
+    return len(updates)
+
+
+class ScheduleStore:
+    """schedules 表的读写封装
+
+    连接由 ConnectionManager 按线程复用，agent 工具调用不再每次新建连接。
+    """
+
+    def __init__(self, path=DB_FILE, manager=None):
+        self.path = path
+        self.manager = manager or ConnectionManager(path)
+        with self.manager.transaction() as conn:
+            conn.execute(SQL_CREATE_TABLE)
+        migrate(self.conn)
+
+    @property
+    def conn(self):
+        """当前线程的连接"""
+        return self.manager.connection()
+
+    def add(self, start_time, description, end_time=None):
+        """新增一条日程，返回新记录的 id"""
+        with self.manager.transaction() as conn:
+            cursor = conn.execute(SQL_INSERT, (normalize_time(start_time), description,
+                                               normalize_time(end_time) if end_time else None))
+        return cursor.lastrowid
+
+    def add_many(self, schedules):
+        """在一个事务中批量新增日程
+
+        Args:
+            schedules (list): [(start_time, description), ...] 或 [(start_time, description, end_time), ...]
+
+        Returns:
+            int: 新增条数
+
+        Raises:
+            ValueError: 任意一条时间格式无法识别时整批都不写入
+        """
+        rows = []
+        for start_time, description, *end_time in schedules:
+            end_time = end_time[0] if end_time else None
+            rows.append((normalize_time(start_time), description, normalize_time(end_time) if end_time else None))
+        with self.manager.transaction() as conn:
+            conn.executemany(SQL_INSERT, rows)
+        return len(rows)
+
+    def delete_by_time(self, start_time):
+        """删除指定时间的日程，返回删除条数"""
+        with self.manager.transaction() as conn:
+            cursor = conn.execute(SQL_DELETE_BY_TIME, (normalize_time(start_time),))
+        return cursor.rowcount
+
+    def delete_one(self, start_time, description):
+        """删除一条时间和描述都匹配的日程，返回删除条数"""
+        with self.manager.transaction() as conn:
+            cursor = conn.execute(SQL_DELETE_ONE, (normalize_time(start_time), description))
+        return cursor.rowcount
+
+    def count_by_day(self, start, end):
+        """统计 [start, end) 区间内每天的日程数
+
+        Returns:
+            dict: {'YYYY-MM-DD': count}
+        """
+        rows = self.conn.execute(SQL_COUNT_BY_DAY, (normalize_time(start), normalize_time(end))).fetchall()
+        return dict(rows)
+
+    def get_at(self, start_time):
+        """开始时间恰好为 start_time 的日程 [(start_time, description, end_time), ...]"""
+        return self.conn.execute(SQL_SELECT_AT, (normalize_time(start_time),)).fetchall()
+
+    def get_all(self):
+        """全部日程 [(start_time, description, end_time), ...]，用于建立区间索引"""
+        return self.conn.execute(SQL_SELECT_ALL).fetchall()
+
+    def stats(self):
+        """返回 (有日程的天数, 日程总数)"""
+        return tuple(self.conn.execute(SQL_STATS).fetchone())
+
+    def _select_range(self, start, end):
+        return self.conn.execute(SQL_SELECT_RANGE, (start, end)).fetchall()
+
+    def get_range(self, start, end):
+        """查询 [start, end) 区间内的日程
+
+        Args:
+            start (str|datetime): 区间起点（包含）
+            end (str|datetime): 区间终点（不包含）
+
+        Returns:
+            list: [(start_time, description, end_time), ...]，按时间升序
+        """
+        return self._select_range(normalize_time(start), normalize_time(end))
+
+    def get_by_date(self, query_date):
+        """查询某天的日程；传入 '2024-05' 之类的前缀时按前缀查询"""
+        try:
+            start, end = day_range(query_date)
+        except ValueError:
+            start, end = prefix_range(str(query_date).strip())
+        return self._select_range(start, end)
+
+    def get_week(self, query_date):
+        """查询 query_date 所在周的日程"""
+        return self._select_range(*week_range(query_date))
+
+    def put_rule(self, rule_id, rule):
+        """新增或更新一条重复规则，rule 为 JSON 文本"""
+        with self.manager.transaction() as conn:
+            conn.execute(SQL_PUT_RULE, (rule_id, rule))
+
+    def delete_rule(self, rule_id):
+        with self.manager.transaction() as conn:
+            return conn.execute(SQL_DELETE_RULE, (rule_id,)).rowcount
+
+    def get_rules(self):
+        """全部重复规则 [(id, rule), ...]"""
+        return self.conn.execute(SQL_SELECT_RULES).fetchall()
+
+    def data_version(self):
+        """其他进程提交修改后会变化的版本号，见 ConnectionManager.data_version"""
+        return self.manager.data_version()
+
+    def close(self):
+        """关闭所有线程上的连接"""
+        self.manager.close_all()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == 'migrate':
+        path = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+        conn = sqlite3.connect(path)
+        count = migrate(conn)
+        conn.close()
+        print(f'{path} 迁移完成，规范化 {count} 条记录')
+    else:
+        print('用法：python schedule_store.py migrate [数据库路径]')
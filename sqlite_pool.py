@@ -0,0 +1,103 @@
+"""
+SQLite 长连接管理
+
+每个线程持有一条长期打开的读连接，连接建立时统一开启 WAL 并设置常用 pragma。
+写入（transaction()）由所有线程共用一条写连接、依次提交：SQLite 本来同一时刻就只有一个写者，
+而写连接的 PRAGMA data_version 只在其他连接（其他进程）提交后变化，
+可以据此判断数据是否被本进程以外的程序修改过（data_version()）。
+sqlite3 会按 SQL 文本缓存每条连接上编译好的语句，所以调用方只要使用固定的
+SQL 常量，就能复用预编译语句。
+
+程序退出时通过 atexit 关闭全部连接，也可以手动调用 close_all()。
+"""
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),     # WAL 模式下只在 checkpoint 时 fsync
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -16 * 1024),    # 负数表示 KiB，即 16MB 页缓存
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),
+)
+
+
+class ConnectionManager:
+    """按线程复用的 SQLite 连接
+
+    Args:
+        path (str): 数据库文件路径
+        pragmas (tuple, optional): (名称, 值) 序列，默认 DEFAULT_PRAGMAS
+        cached_statements (int, optional): 每条连接缓存的预编译语句数量
+    """
+
+    def __init__(self, path, pragmas=DEFAULT_PRAGMAS, cached_statements=256):
+        self.path = path
+        self.pragmas = pragmas
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._closed = False
+        # 所有线程共用的写连接
+        self._writer = None
+        self._write_lock = threading.RLock()
+        atexit.register(self.close_all)
+
+    def _open(self):
+        # 连接只会被创建它的线程使用；关闭检查放开，是为了退出时能在主线程统一关闭
+        conn = sqlite3.connect(self.path, cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name} = {value};')
+        return conn
+
+    def connection(self):
+        """获取当前线程的连接，不存在时创建"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f'连接池已关闭：{self.path}')
+                conn = self._open()
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _writer_connection(self):
+        if self._writer is None:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f'连接池已关闭：{self.path}')
+                self._writer = self._open()
+                self._connections.append(self._writer)
+        return self._writer
+
+    @contextmanager
+    def transaction(self):
+        """在共用的写连接上执行一个事务，退出时统一提交一次；其他线程的写入等待它完成"""
+        with self._write_lock:
+            conn = self._writer_connection()
+            with conn:
+                yield conn
+
+    def data_version(self):
+        """写连接的 PRAGMA data_version：本进程的写入都经过写连接，不会使它变化，
+        其他进程提交后才会变化
+        """
+        with self._write_lock:
+            return self._writer_connection().execute('PRAGMA data_version').fetchone()[0]
+
+    def close_all(self):
+        """关闭所有线程的连接（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        atexit.unregister(self.close_all)
@@ -0,0 +1,589 @@
+"""
+统一的日历事件存储接口
+
+SmartCalendar 的 CalendarApp 和 agent 的 @tool 函数都通过 EventStorage 读写事件，
+底层可以是：
+    JsonStorage   - calendar_events.json 快照 + 追加日志（event_journal）
+    SqliteStorage - langchain.db 中带索引的 schedules 表（schedule_store）
+    MemoryStorage - 纯内存，便于调试和基准测试
+
+事件统一表示为 {"time": "HH:MM:SS", "description": "..."}，日期为 'YYYY-MM-DD'；
+有结束时间的事件另有 "end": "YYYY-MM-DD HH:MM:SS"（可以跨天），没有结束时间的事件不带这个键。
+每次增删都会递增 version，回答缓存（response_cache）以此判断缓存的回答是否过期。
+其他进程也可能在写同一个数据文件（SmartCalendar 和 CalendarManagement 共用 langchain.db），
+sync() 发现这种修改时丢弃月计数 / 区间索引 / 重复规则等缓存并递增 version。
+conflicts() 通过区间索引（interval_index）查询与某个时间段重叠的事件。
+
+重复事件按规则保存（recurrence），get_by_date / get_range / month_summary / conflicts
+只展开被查询的那段时间，展开出的事件另带 "rule": 规则 id。
+"""
+import calendar
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from event_journal import DATA_FILE, EventJournal
+from interval_index import IntervalIndex, to_seconds
+from recurrence import RecurrenceSet, rule_from_dict, rule_to_dict
+from month_index import MonthIndex
+from schedule_store import DB_FILE, ScheduleStore, normalize_time
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+def _file_stats(*paths):
+    stats = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stats.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+    return tuple(stats)
+
+
+def normalize_end(date, time, end):
+    """把结束时间规范化为 'YYYY-MM-DD HH:MM:SS'
+
+    end 可以是完整的日期时间，也可以只有 'HH:MM[:SS]'：只有时刻时取开始当天，
+    不晚于开始时间则视为次日（如 23:00 开始、01:00 结束）。
+
+    Returns:
+        str|None: end 为空时返回 None
+    """
+    if not end:
+        return None
+    start = f"{date} {time}"
+    text = str(end).strip()
+    if len(text) <= 8:
+        end = normalize_time(f"{date} {text}")
+        if end <= start:
+            end = normalize_time(datetime.fromisoformat(end) + timedelta(days=1))
+        return end
+    return normalize_time(text)
+
+
+def _event(time, description, end=None):
+    event = {"time": time, "description": description}
+    if end:
+        event["end"] = end
+    return event
+
+
+def _interval(date, event):
+    """事件在区间索引中的表示：(开始, 结束, (date, time, description))"""
+    return f"{date} {event['time']}", event.get("end"), (date, event["time"], event["description"])
+
+
+def _merge_day(events, occurrences):
+    """普通事件和重复事件合并后按时间排序"""
+    if not occurrences:
+        return events
+    return sorted(events + occurrences, key=lambda e: e["time"])
+
+
+def _merge_range(days, occurrences):
+    """{date: [event, ...]} 合并重复事件，保持按日期升序"""
+    if not occurrences:
+        return days
+    for date, events in occurrences.items():
+        days[date] = _merge_day(days.get(date, []), events)
+    return {date: days[date] for date in sorted(days)}
+
+
+def _merge_counts(counts, occurrences):
+    if not any(occurrences):
+        return counts
+    return [a + b for a, b in zip(counts, occurrences)]
+
+
+def _span(start, end):
+    s = to_seconds(start)
+    return s, max(to_seconds(end) if end else s, s + 1)
+
+
+def month_range(year, month):
+    """某月对应的 [from, to) 日期区间"""
+    start = datetime(year, month, 1)
+    end = start + timedelta(days=calendar.monthrange(year, month)[1])
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+class EventStorage:
+    """事件存储接口"""
+
+    # 日历版本号，内容每次变化都递增
+    version = 0
+    # 重复规则，由子类在初始化时加载
+    recurrences = None
+
+    def bump_version(self):
+        """日历内容发生了（或即将发生）变化
+
+        可能在 agent 工作线程中调用；并发递增偶尔丢失一次也无妨，
+        缓存只关心版本号是否和查询开始时相同。
+        """
+        self.version += 1
+        return self.version
+
+    def fingerprint(self):
+        """数据文件的 (路径, 修改时间, 大小)，用于判断上次退出后数据是否被其他程序修改；
+        没有数据文件时返回 None
+        """
+        return None
+
+    def sync(self):
+        """检查数据是否被其他进程修改过，修改过时丢弃缓存并递增 version
+
+        Returns:
+            bool: 是否发现了其他进程的修改
+        """
+        return False
+
+    def add(self, date, time, description, end=None):
+        """新增一条事件，end 为可选的结束时间（见 normalize_end）"""
+        raise NotImplementedError
+
+    def add_many(self, items):
+        """批量新增事件
+
+        Args:
+            items (list): [(date, time, description), ...] 或 [(date, time, description, end), ...]
+        """
+        for item in items:
+            self.add(*item)
+
+    def delete(self, date, time, description=None):
+        """删除事件；description 为 None 时删除该时间的全部事件
+
+        该时间的重复事件只删除这一次（记为规则的例外日期），规则本身用 delete_rule 删除。
+
+        Returns:
+            int: 删除条数
+        """
+        removed = self._delete(date, time, description)
+        if description is None or not removed:
+            removed += self.skip(date, time, description)
+        return removed
+
+    def _delete(self, date, time, description=None):
+        """删除普通事件，返回删除条数"""
+        raise NotImplementedError
+
+    def add_rule(self, rule):
+        """新增重复规则
+
+        Args:
+            rule (recurrence.Rule): id 为 None 时分配新 id
+
+        Returns:
+            recurrence.Rule: 带 id 的规则
+        """
+        rule = self.recurrences.add(rule)
+        self.bump_version()
+        self._rule_changed(rule.id)
+        return rule
+
+    def delete_rule(self, rule_id):
+        """删除重复规则（全部发生），返回是否找到"""
+        if self.recurrences.remove(rule_id) is None:
+            return False
+        self.bump_version()
+        self._rule_changed(rule_id)
+        return True
+
+    def skip(self, date, time, description=None):
+        """重复事件在 date 这天的这一次不再发生
+
+        Returns:
+            int: 被跳过的规则数
+        """
+        skipped = 0
+        for event in self.recurrences.get_by_date(date):
+            if event["time"] == time and description in (None, event["description"]):
+                self.recurrences.skip(event["rule"], date)
+                self._rule_changed(event["rule"])
+                skipped += 1
+                if description is not None:
+                    break
+        if skipped:
+            self.bump_version()
+        return skipped
+
+    def rules(self):
+        """全部重复规则"""
+        return list(self.recurrences)
+
+    def _rule_changed(self, rule_id):
+        """某条规则新增 / 修改 / 删除，子类在这里做持久化"""
+
+    def get_by_date(self, date):
+        """某天的事件列表，按时间升序"""
+        raise NotImplementedError
+
+    def get_range(self, start_date, end_date):
+        """[start_date, end_date) 区间内的事件
+
+        Returns:
+            dict: {date: [event, ...]}，按日期升序
+        """
+        raise NotImplementedError
+
+    def month_summary(self, year, month):
+        """某月每天的事件数，由 MonthIndex 增量维护
+
+        Returns:
+            list: 长度为 32 的计数数组，counts[day] 为 day 号的事件数，不要修改
+        """
+        raise NotImplementedError
+
+    def interval_index(self):
+        """全部事件的区间索引"""
+        raise NotImplementedError
+
+    def conflicts(self, date, time, end=None, ignore=None, limit=None):
+        """与 [date time, end) 重叠的事件；没有结束时间的事件只占开始的一刻
+
+        Args:
+            ignore (tuple, optional): 不算冲突的事件 (date, time, description)，修改事件时传入原事件
+            limit (int, optional): 最多返回的个数
+
+        Returns:
+            list: [{"date", "time", "description"[, "end"]}, ...]，按开始时间升序
+
+        Raises:
+            ValueError: 无法识别的时间
+        """
+        # 区间索引只接受规范的 'YYYY-MM-DD HH:MM:SS'，'2024-5-3 9:0:0' 之类的输入先规范化
+        date, time = split_start_time(f"{date} {time}")
+        start = f"{date} {time}"
+        end = normalize_end(date, time, end)
+        found = []
+        for _, event_end, value in self.interval_index().overlaps(start, end):
+            if value == ignore:
+                ignore = None
+                continue
+            event = _event(value[1], value[2], event_end)
+            event["date"] = value[0]
+            found.append(event)
+            if limit is not None and len(found) >= limit:
+                break
+        if not len(self.recurrences):
+            return found
+        # 重复事件只展开查询时间段前后的几天（前一天开始的事件可能跨到当天）
+        qs, qe = _span(start, end)
+        first = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        last = (datetime.strptime((end or start)[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        for day, events in self.recurrences.get_range(first, last).items():
+            for e in events:
+                if (day, e["time"], e["description"]) == ignore:
+                    ignore = None
+                    continue
+                s, e_end = _span(f"{day} {e['time']}", e.get("end"))
+                if s < qe and e_end > qs:
+                    found.append(dict(e, date=day))
+        found.sort(key=lambda e: (e["date"], e["time"]))
+        return found[:limit] if limit is not None else found
+
+    def stats(self):
+        """返回 (有事件的天数, 事件总数)"""
+        raise NotImplementedError
+
+    def flush(self):
+        """把尚未持久化的修改写入磁盘"""
+
+    def close(self):
+        self.flush()
+
+
+class MemoryStorage(EventStorage):
+    """内存存储，数据结构与 calendar_events.json 一致"""
+
+    def __init__(self, days=None, rules=()):
+        self._days = days if days is not None else {}
+        self.recurrences = RecurrenceSet(rules)
+        self.month_index = MonthIndex()
+        for date, events in self._days.items():
+            self.month_index.add(date, len(events))
+        # 按需建立：第一次查询冲突时建树，之后随增删增量维护，不拖慢启动
+        self._intervals = None
+
+    def _changed(self, date):
+        """某天的事件发生变化，子类在这里做持久化"""
+
+    def add(self, date, time, description, end=None):
+        self.add_many([(date, time, description, end)])
+
+    def add_many(self, items):
+        # 先规范化全部日期时间（'2024-5-3' -> '2024-05-03'），无法识别时在修改任何状态之前抛出 ValueError
+        rows = []
+        for date, time, description, *end in items:
+            start_time = normalize_time(f"{date} {time}")
+            date, time = start_time[:10], start_time[11:]
+            rows.append((date, _event(time, description, normalize_end(date, time, end[0] if end else None))))
+        dates = set()
+        for date, event in rows:
+            self._days.setdefault(date, []).append(event)
+            if self._intervals is not None:
+                self._intervals.add(*_interval(date, event))
+            self.month_index.add(date)
+            dates.add(date)
+        if dates:
+            self.bump_version()
+        for date in dates:
+            self._days[date].sort(key=lambda x: x["time"])
+            self._changed(date)
+
+    def _delete(self, date, time, description=None):
+        events = self._days.get(date, [])
+        if description is None:
+            keep = [e for e in events if e["time"] != time]
+            dropped = [e for e in events if e["time"] == time]
+        else:
+            keep = list(events)
+            dropped = []
+            for idx, e in enumerate(keep):
+                if e["time"] == time and e["description"] == description:
+                    dropped.append(keep.pop(idx))
+                    break
+        removed = len(dropped)
+        for e in dropped if self._intervals is not None else ():
+            self._intervals.remove(*_interval(date, e))
+        if removed:
+            self.bump_version()
+            self.month_index.remove(date, removed)
+            if keep:
+                self._days[date] = keep
+            else:
+                del self._days[date]
+            self._changed(date)
+        return removed
+
+    def get_by_date(self, date):
+        date = _to_date(date)
+        return _merge_day([dict(e) for e in self._days.get(date, [])], self.recurrences.get_by_date(date))
+
+    def get_range(self, start_date, end_date):
+        start, end = _to_date(start_date), _to_date(end_date)
+        days = {date: [dict(e) for e in self._days[date]]
+                for date in sorted(d for d in self._days if start <= d < end)}
+        return _merge_range(days, self.recurrences.get_range(start, end))
+
+    def month_summary(self, year, month):
+        return _merge_counts(self.month_index.counts(year, month), self.recurrences.counts(year, month))
+
+    def interval_index(self):
+        if self._intervals is None:
+            self._intervals = IntervalIndex(_interval(date, e) for date, events in self._days.items() for e in events)
+        return self._intervals
+
+    def stats(self):
+        return len(self._days), sum(len(v) for v in self._days.values())
+
+
+class JsonStorage(MemoryStorage):
+    """calendar_events.json 快照 + 追加日志
+
+    修改只记录发生变化的日期，flush() 时每个日期写一条日志，
+    同一批次内对同一天的多次修改只落盘一次。
+    重复规则保存在 path + '.rules'（JSON 数组），规则有变化时 flush() 整体重写。
+    """
+
+    def __init__(self, path=DATA_FILE):
+        self.journal = EventJournal(path)
+        self.rules_path = path + '.rules'
+        self._dirty = set()
+        self._rules_dirty = False
+        rules = []
+        if os.path.exists(self.rules_path):
+            with open(self.rules_path, 'r', encoding='utf-8') as f:
+                rules = [rule_from_dict(data) for data in json.load(f)]
+        super().__init__(self.journal.load(), rules)
+
+    def _changed(self, date):
+        self._dirty.add(date)
+
+    def _rule_changed(self, rule_id):
+        self._rules_dirty = True
+
+    def flush(self):
+        dirty, self._dirty = self._dirty, set()
+        for date in sorted(dirty):
+            self.journal.put_day(date, self._days.get(date, []))
+        if self._rules_dirty:
+            self._rules_dirty = False
+            tmp_path = self.rules_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([rule_to_dict(rule) for rule in self.recurrences], f, ensure_ascii=False)
+            os.replace(tmp_path, self.rules_path)
+
+    def close(self):
+        self.flush()
+        self.journal.close()
+
+    def fingerprint(self):
+        return _file_stats(self.journal.path, self.journal.journal_path, self.rules_path)
+
+
+class SqliteStorage(EventStorage):
+    """langchain.db 中的 schedules 表"""
+
+    def __init__(self, path=DB_FILE):
+        self.store = ScheduleStore(path)
+        # 按需加载：某月第一次渲染时用一条 GROUP BY 统计，之后随增删增量维护
+        self.month_index = MonthIndex()
+        # 按需加载：第一次查询冲突时读出全部事件建树，之后随增删增量维护
+        self._intervals = None
+        self.recurrences = self._load_rules()
+        # 上次检查时的 data_version，本进程的增删都经过同一条写连接，不会改变它
+        self._data_version = self.store.data_version()
+        self._sync_lock = threading.Lock()
+
+    def _load_rules(self):
+        return RecurrenceSet(rule_from_dict(json.loads(rule)) for _, rule in self.store.get_rules())
+
+    def sync(self):
+        """比较写连接的 PRAGMA data_version
+
+        本进程任何线程的增删都经过同一条写连接，不会触发；只有其他进程的提交才会丢弃缓存。
+        """
+        with self._sync_lock:
+            version = self.store.data_version()
+            if version == self._data_version:
+                return False
+            self._data_version = version
+            self.month_index = MonthIndex()
+            self._intervals = None
+            self.recurrences = self._load_rules()
+            self.bump_version()
+        return True
+
+    def add(self, date, time, description, end=None):
+        self.add_many([(date, time, description, end)])
+
+    def add_many(self, items):
+        rows = []
+        for date, time, description, *end in items:
+            start_time = normalize_time(f"{date} {time}")
+            rows.append((start_time, description,
+                         normalize_end(start_time[:10], start_time[11:], end[0] if end else None)))
+        self.store.add_many(rows)
+        if rows:
+            self.bump_version()
+        for start_time, description, end_time in rows:
+            if start_time[:7] in self.month_index:
+                self.month_index.add(start_time)
+            if self._intervals is not None:
+                self._intervals.add(*self._interval(start_time, description, end_time))
+
+    def _delete(self, date, time, description=None):
+        start_time = f"{date} {time}"
+        # 区间索引需要被删除事件的结束时间
+        rows = self.store.get_at(start_time) if self._intervals is not None else []
+        if description is None:
+            removed = self.store.delete_by_time(start_time)
+        else:
+            removed = self.store.delete_one(start_time, description)
+            rows = [row for row in rows if row[1] == description][:removed]
+        if removed:
+            self.bump_version()
+        for row in rows:
+            self._intervals.remove(*self._interval(*row))
+        self.month_index.remove(date, removed)
+        return removed
+
+    @staticmethod
+    def _event(start_time, description, end_time=None):
+        return _event(start_time[11:], description, end_time)
+
+    @staticmethod
+    def _interval(start_time, description, end_time):
+        return start_time, end_time, (start_time[:10], start_time[11:], description)
+
+    def _rule_changed(self, rule_id):
+        rule = self.recurrences.get(rule_id)
+        if rule is None:
+            self.store.delete_rule(rule_id)
+        else:
+            self.store.put_rule(rule_id, json.dumps(rule_to_dict(rule), ensure_ascii=False))
+
+    def get_by_date(self, date):
+        date = _to_date(date)
+        self.sync()
+        return _merge_day([self._event(*row) for row in self.store.get_by_date(date)],
+                          self.recurrences.get_by_date(date))
+
+    def get_range(self, start_date, end_date):
+        start, end = _to_date(start_date), _to_date(end_date)
+        self.sync()
+        days = {}
+        for start_time, description, end_time in self.store.get_range(start, end):
+            days.setdefault(start_time[:10], []).append(self._event(start_time, description, end_time))
+        return _merge_range(days, self.recurrences.get_range(start, end))
+
+    def interval_index(self):
+        self.sync()
+        if self._intervals is None:
+            self._intervals = IntervalIndex(self._interval(*row) for row in self.store.get_all())
+        return self._intervals
+
+    def month_summary(self, year, month):
+        self.sync()
+        key = MonthIndex.key(year, month)
+        if key not in self.month_index:
+            counts = self.store.count_by_day(*month_range(year, month))
+            self.month_index.load(key, {int(date[8:]): count for date, count in counts.items()})
+        return _merge_counts(self.month_index.counts(year, month), self.recurrences.counts(year, month))
+
+    def stats(self):
+        return self.store.stats()
+
+    def close(self):
+        self.store.close()
+
+    def fingerprint(self):
+        return _file_stats(self.store.path, self.store.path + '-wal')
+
+
+BACKENDS = {
+    'json': JsonStorage,
+    'sqlite': SqliteStorage,
+    'memory': MemoryStorage,
+}
+
+
+def open_storage(kind='json', path=None):
+    """按名称创建存储后端
+
+    Args:
+        kind (str): json / sqlite / memory
+        path (str, optional): 数据文件路径，默认使用各后端自己的默认文件
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f'未知的存储后端：{kind}，可选 {", ".join(BACKENDS)}')
+    if kind == 'memory':
+        return MemoryStorage()
+    return BACKENDS[kind](path) if path else BACKENDS[kind]()
+
+
+def describe_conflicts(conflicts):
+    """冲突事件的简短描述，如 '2024-05-03 14:00:00~16:00:00 评审、2024-05-03 15:00:00 周会'"""
+    texts = []
+    for event in conflicts:
+        text = f"{event['date']} {event['time']}"
+        if event.get("end"):
+            end = event["end"]
+            text += f"~{end[11:] if end[:10] == event['date'] else end}"
+        texts.append(f"{text} {event['description']}")
+    return "、".join(texts)
+
+
+def split_start_time(start_time):
+    """把 '2024-05-03 20:00' 之类的时间拆成规范化的 (date, time)"""
+    normalized = normalize_time(start_time)
+    return normalized[:10], normalized[11:]
@@ -0,0 +1,470 @@
+"""
+中英文时间表达解析
+
+把“明天下午3点”“下周三10:00-11:30”“未来三天”“tomorrow at 3pm for 2 hours”之类的表达
+按 now 解析成日期 / 时刻 / 范围 / 时长，并给出置信度。完全在本地运行，一次解析几十微秒。
+
+match_request() 在此基础上识别两类简单请求：
+    add   - “明天下午3点开会”“提醒我周五10点交报告”：一个明确的时刻 + 描述
+    query - “明天有什么安排”“下周的日程”：一个日期或日期范围
+置信度不够（时刻含糊、出现多个日期、还有没解析的数字等）时返回 None，交给模型处理。
+
+用法：
+    >>> expr = parse('下周三下午3点到5点评审', now)
+    >>> expr.start(), expr.end(), expr.confidence
+"""
+import re
+from datetime import date, datetime, time, timedelta
+
+# 置信度达到该值才在本地处理
+CONFIDENT = 0.9
+
+_CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5,
+              '六': 6, '七': 7, '八': 8, '九': 9}
+_WEEKDAYS_CN = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6,
+                '1': 0, '2': 1, '3': 2, '4': 3, '5': 4, '6': 5, '7': 6}
+_WEEKDAYS_EN = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+_MONTHS_EN = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+              'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
+_RELATIVE_DAYS = {
+    '大后天': 3, '后天': 2, '明天': 1, '明日': 1, '明儿': 1, '今天': 0, '今日': 0, '今儿': 0,
+    '昨天': -1, '昨日': -1, '前天': -2, '今晚': 0, '今早': 0, '明晚': 1, '明早': 1,
+    'tomorrow': 1, 'tmr': 1, 'today': 0, 'tonight': 0, 'yesterday': -1,
+}
+# 时段：(默认钟点, 是否为下午)
+_PERIODS = {
+    '凌晨': (2, False), '早上': (8, False), '早晨': (8, False), '上午': (9, False), '早': (8, False),
+    '中午': (12, True), '下午': (15, True), '傍晚': (18, True), '晚上': (20, True), '夜里': (22, True),
+    '今晚': (20, True), '明晚': (20, True), '今早': (8, False), '明早': (8, False),
+    'morning': (9, False), 'noon': (12, True), 'afternoon': (15, True), 'evening': (20, True),
+    'tonight': (20, True),
+}
+
+_NUM = r'(?:\d{1,2}|[零〇一二两三四五六七八九十]{1,3})'
+_CONNECT = r'\s*(?:到|至|-|~|～|—|to|until|till)\s*'
+
+
+def cn_int(text):
+    """阿拉伯数字或不超过九十九的中文数字转整数"""
+    if text.isdigit():
+        return int(text)
+    if '十' in text:
+        tens, _, ones = text.partition('十')
+        return (_CN_DIGITS.get(tens, 1) if tens else 1) * 10 + (_CN_DIGITS.get(ones, 0) if ones else 0)
+    value = 0
+    for ch in text:
+        value = value * 10 + _CN_DIGITS[ch]
+    return value
+
+
+def _compile(pattern):
+    return re.compile(pattern, re.I)
+
+
+# 按优先级排列；先匹配的片段不会再被后面的规则使用
+_RULES = [
+    ('ymd', _compile(r'(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*[日号]?')),
+    ('md_range', _compile(rf'({_NUM})月({_NUM})[日号]?{_CONNECT}({_NUM})[日号]')),
+    ('md', _compile(rf'({_NUM})月({_NUM})[日号]?')),
+    ('md_en', _compile(r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b')),
+    ('md_slash', _compile(r'(?<![\d/])(\d{1,2})/(\d{1,2})(?![\d/])')),
+    ('weekday', _compile(r'(上上|上|这|本|下下|下)?个?(?:周|星期|礼拜)([一二三四五六日天1-7])')),
+    ('weekday_en', _compile(r'\b(?:(this|next|last)\s+)?(mon|tue|wed|thu|fri|sat|sun)[a-z]*day\b')),
+    ('weekend', _compile(r'(这|本|下|上)?个?周末|\b(this|next)?\s*weekend\b')),
+    ('week', _compile(r'(这|本|下|上)个?(?:周|星期|礼拜)|\b(this|next|last)\s+week\b')),
+    ('month', _compile(r'(这|本|下|上)个?月|\b(this|next|last)\s+month\b')),
+    ('next_days', _compile(rf'(?:未来|最近|接下来|近)(一周|一个星期|{_NUM})天?|\bnext\s+(\d+)\s+days\b')),
+    ('days_offset', _compile(rf'({_NUM})天(后|以后|之后|前|以前|之前)|\bin\s+(\d+)\s+days?\b')),
+    ('relative', _compile('|'.join(sorted(_RELATIVE_DAYS, key=len, reverse=True)))),
+    ('day', _compile(rf'(?<![月\d])({_NUM})[号日](?![子本常])')),
+    ('clock_hm_range', _compile(rf'(?<![\d:])(\d{{1,2}})[:：](\d{{2}}){_CONNECT}(\d{{1,2}})[:：](\d{{2}})(?![\d:])')),
+    ('clock_ampm_range', _compile(rf'\b(\d{{1,2}})(?::(\d{{2}}))?\s*(am|pm)?{_CONNECT}(\d{{1,2}})(?::(\d{{2}}))?\s*(am|pm)\b')),
+    ('clock_range', _compile(rf'({_NUM})(?:[点时](半)?)?{_CONNECT}({_NUM})[点时](半)?')),
+    ('clock_hm', _compile(r'(?<![\d:])(\d{1,2})[:：](\d{2})(?![\d:])\s*(am|pm)?')),
+    ('clock_ampm', _compile(r'\b(\d{1,2})\s*(am|pm|a\.m\.|p\.m\.)')),
+    ('clock_cn', _compile(rf'(?<![快多少有慢大小好差])({_NUM})[点时](?:(半)|(一刻)|(三刻)|({_NUM})分?)?(?!钟)')),
+    ('period', _compile('|'.join(sorted((p for p in _PERIODS if p not in _RELATIVE_DAYS), key=len, reverse=True)))),
+    ('duration', _compile(rf'({_NUM}|半)?个?(半)?(小时|钟头|分钟)|\bfor\s+(\d+(?:\.\d+)?)\s*(hours?|hrs?|minutes?|mins?)\b')),
+]
+
+
+class TimeExpr:
+    """一段文本中的时间表达
+
+    Attributes:
+        date (date): 日期；只有时刻时为 now 当天
+        end_date (date): 日期范围的最后一天（含），不是范围时为 None
+        time (time): 时刻，没有时为 None
+        end_time (time): 时刻范围的结束，没有时为 None
+        duration (timedelta): 时长，没有时为 None
+        period (str): 上午 / 下午 等时段
+        confidence (float): 0~1，越低越需要交给模型
+        spans (list): 被识别为时间表达的片段 [(start, end), ...]
+        rest (str): 去掉时间表达后剩下的文字
+    """
+
+    def __init__(self):
+        self.date = None
+        self.end_date = None
+        self.time = None
+        self.end_time = None
+        self.duration = None
+        self.period = None
+        self.confidence = 1.0
+        self.spans = []
+        self.rest = ''
+        self.reasons = []
+
+    def __repr__(self):
+        return (f"<TimeExpr {self.date} {self.time}"
+                f"{' ~ ' + str(self.end_date or '') + ' ' + str(self.end_time or '') if self.end_date or self.end_time else ''}"
+                f" conf={self.confidence:.2f}>")
+
+    def doubt(self, factor, reason):
+        self.confidence = min(self.confidence, factor)
+        self.reasons.append(reason)
+
+    @property
+    def found(self):
+        return bool(self.spans)
+
+    def start(self):
+        """开始时间：有时刻时为 datetime，否则为 date"""
+        if self.date is None:
+            return None
+        return datetime.combine(self.date, self.time) if self.time else self.date
+
+    def end(self):
+        """结束时间：时刻范围 / 时长 / 日期范围，没有时为 None"""
+        if self.date is None:
+            return None
+        if self.time is not None:
+            if self.end_time is not None:
+                return datetime.combine(self.end_date or self.date, self.end_time)
+            if self.duration is not None:
+                return datetime.combine(self.date, self.time) + self.duration
+        return self.end_date
+
+
+def _weekday_date(today, weekday, which):
+    """which: None 为今天或之后最近的一个；this / next / last 及中文对应按自然周"""
+    monday = today - timedelta(days=today.weekday())
+    weeks = {'上上': -2, '上': -1, 'last': -1, '这': 0, '本': 0, 'this': 0, '下': 1, 'next': 1, '下下': 2}
+    if which is None:
+        return today + timedelta(days=(weekday - today.weekday()) % 7)
+    return monday + timedelta(weeks=weeks[which.lower()], days=weekday)
+
+
+def _month_range(today, offset):
+    month = today.month - 1 + offset
+    year = today.year + month // 12
+    month = month % 12 + 1
+    first = date(year, month, 1)
+    nxt = date(year + (month == 12), month % 12 + 1, 1)
+    return first, nxt - timedelta(days=1)
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse(text, now=None):
+    """解析 text 中的时间表达
+
+    Args:
+        text (str): 问题或消息
+        now (datetime, optional): 参照时间，默认当前时间
+
+    Returns:
+        TimeExpr: 没有时间表达时 found 为 False
+    """
+    now = now or datetime.now()
+    today = now.date()
+    expr = TimeExpr()
+    taken = [False] * len(text)
+    dates = []          # [(date, end_date)]
+    clocks = []         # [(hour, minute, explicit_ampm)]
+    periods = []
+
+    for kind, pattern in _RULES:
+        for m in pattern.finditer(text):
+            if any(taken[m.start():m.end()]) or m.end() == m.start():
+                continue
+            value = _apply(kind, m, today, expr)
+            if value is None:
+                continue
+            for i in range(m.start(), m.end()):
+                taken[i] = True
+            expr.spans.append((m.start(), m.end()))
+            tag, payload = value
+            if tag == 'date':
+                dates.append(payload)
+            elif tag == 'clock':
+                clocks.append(payload)
+            elif tag == 'period':
+                periods.append(payload)
+            elif tag == 'date+period':
+                dates.append(payload[0])
+                periods.append(payload[1])
+
+    expr.spans.sort()
+    expr.rest = ''.join(ch for ch, t in zip(text, taken) if not t)
+
+    # 日期
+    distinct = list(dict.fromkeys(dates))
+    if len(distinct) > 1:
+        expr.doubt(0.3, '多个日期')
+    if distinct:
+        expr.date, expr.end_date = distinct[0]
+    elif clocks or periods or expr.duration:
+        expr.date = today
+
+    # 时段和时刻
+    if len(set(periods)) > 1:
+        expr.doubt(0.5, '多个时段')
+    expr.period = periods[0] if periods else None
+    pm = _PERIODS[expr.period][1] if expr.period else None
+    if len(clocks) > 1 and not expr.end_time:
+        expr.doubt(0.3, '多个时刻')
+    if clocks:
+        hour, minute, explicit = clocks[0]
+        hour = _resolve_hour(hour, explicit, pm, expr)
+        if hour is None:
+            expr.doubt(0.2, '无效时刻')
+        else:
+            expr.time = time(hour, minute)
+            if expr.end_time is not None:
+                end_hour = expr.end_time.hour
+                if end_hour < hour and end_hour + 12 < 24:
+                    end_hour += 12
+                expr.end_time = time(end_hour, expr.end_time.minute)
+                if expr.end_time <= expr.time:
+                    expr.doubt(0.5, '结束早于开始')
+    elif expr.end_time is not None:
+        expr.end_time = None
+
+    if expr.date is not None and expr.time is not None and not dates:
+        # 只有时刻：已经过去的时刻多半说的是明天，交给模型判断
+        if datetime.combine(today, expr.time) < now:
+            expr.doubt(0.6, '时刻已过')
+
+    # 还有没解析的数字，说明可能漏掉了什么
+    if re.search(r'\d|[一二两三四五六七八九十]+(?:点|号|月|天|周)', expr.rest):
+        expr.doubt(0.6, '未解析的数字')
+    return expr
+
+
+def _resolve_hour(hour, explicit, pm, expr):
+    if explicit is not None:
+        if hour > 12:
+            return None
+        return hour % 12 + (12 if explicit else 0)
+    if hour > 24:
+        return None
+    if hour == 24:
+        return 0
+    if pm is None:
+        if 1 <= hour <= 6:
+            # “3点开会”多半是下午，但不确定
+            expr.doubt(0.7, '上午还是下午')
+            return hour + 12
+        return hour
+    if pm and hour < 12:
+        return hour + 12
+    if pm and hour == 12 and expr.period in ('晚上', '夜里', 'evening'):
+        expr.doubt(0.5, '午夜')
+    if not pm and hour == 12:
+        return 0 if expr.period == '凌晨' else 12
+    return hour
+
+
+def _apply(kind, m, today, expr):
+    """处理一条规则的匹配，返回 (类型, 值)；匹配无效时返回 None"""
+    g = m.groups()
+    if kind == 'ymd':
+        d = _safe_date(int(g[0]), int(g[1]), int(g[2]))
+        return ('date', (d, None)) if d else None
+    if kind == 'md_range':
+        start = _safe_date(today.year, cn_int(g[0]), cn_int(g[1]))
+        end = _safe_date(today.year, cn_int(g[0]), cn_int(g[2]))
+        return ('date', (start, end)) if start and end and end >= start else None
+    if kind == 'md':
+        d = _safe_date(today.year, cn_int(g[0]), cn_int(g[1]))
+        return ('date', (d, None)) if d else None
+    if kind == 'md_en':
+        d = _safe_date(today.year, _MONTHS_EN[g[0].lower()[:3]], int(g[1]))
+        return ('date', (d, None)) if d else None
+    if kind == 'md_slash':
+        d = _safe_date(today.year, int(g[0]), int(g[1]))
+        return ('date', (d, None)) if d else None
+    if kind == 'weekday':
+        weekday = _WEEKDAYS_CN[g[1]]
+        d = _weekday_date(today, weekday, g[0])
+        if g[0] is None and weekday < today.weekday():
+            expr.doubt(0.8, '本周还是下周')
+        return 'date', (d, None)
+    if kind == 'weekday_en':
+        weekday = _WEEKDAYS_EN[g[1].lower()]
+        which = g[0]
+        if which and which.lower() == 'next':
+            # “next Friday”有人指下周五，有人指最近的周五
+            expr.doubt(0.8, 'next 指哪一周')
+            which = None
+        return 'date', (_weekday_date(today, weekday, which), None)
+    if kind == 'weekend':
+        which = g[0] or g[1]
+        saturday = _weekday_date(today, 5, which) if which else _weekday_date(today, 5, '这')
+        return 'date', (saturday, saturday + timedelta(days=1))
+    if kind == 'week':
+        monday = _weekday_date(today, 0, g[0] or g[1])
+        return 'date', (monday, monday + timedelta(days=6))
+    if kind == 'month':
+        which = (g[0] or g[1]).lower()
+        offset = {'这': 0, '本': 0, 'this': 0, '下': 1, 'next': 1, '上': -1, 'last': -1}[which]
+        return 'date', _month_range(today, offset)
+    if kind == 'next_days':
+        if g[0] in ('一周', '一个星期'):
+            days = 7
+        else:
+            days = cn_int(g[0]) if g[0] else int(g[1])
+        if days <= 0:
+            return None
+        return 'date', (today, today + timedelta(days=days - 1))
+    if kind == 'days_offset':
+        if g[2] is not None:
+            return 'date', (today + timedelta(days=int(g[2])), None)
+        days = cn_int(g[0])
+        sign = -1 if g[1].endswith('前') else 1
+        return 'date', (today + timedelta(days=sign * days), None)
+    if kind == 'relative':
+        word = m.group(0).lower()
+        d = today + timedelta(days=_RELATIVE_DAYS[word])
+        if word in _PERIODS:
+            return 'date+period', ((d, None), word)
+        return 'date', (d, None)
+    if kind == 'day':
+        d = _safe_date(today.year, today.month, cn_int(g[0]))
+        return ('date', (d, None)) if d else None
+    if kind == 'clock_hm_range':
+        start, end = (int(g[0]), int(g[1])), (int(g[2]), int(g[3]))
+        if start[0] > 23 or end[0] > 23 or start[1] > 59 or end[1] > 59:
+            return None
+        expr.end_time = time(*end)
+        return 'clock', (start[0], start[1], None)
+    if kind == 'clock_ampm_range':
+        end_pm = g[5].lower() == 'pm'
+        start_pm = g[2].lower() == 'pm' if g[2] else end_pm
+        start, end = int(g[0]), int(g[3])
+        if start > 12 or end > 12:
+            return None
+        expr.end_time = time(end % 12 + (12 if end_pm else 0), int(g[4] or 0))
+        return 'clock', (start, int(g[1] or 0), start_pm)
+    if kind == 'clock_range':
+        start, end = cn_int(g[0]), cn_int(g[2])
+        if start > 24 or end > 24:
+            return None
+        expr.end_time = time(end % 24, 30 if g[3] else 0)
+        return 'clock', (start, 30 if g[1] else 0, None)
+    if kind == 'clock_hm':
+        hour, minute = int(g[0]), int(g[1])
+        if minute > 59:
+            return None
+        explicit = g[2].lower() == 'pm' if g[2] else None
+        if explicit is None and hour > 24:
+            return None
+        return 'clock', (hour, minute, explicit)
+    if kind == 'clock_ampm':
+        return 'clock', (int(g[0]), 0, g[1].lower().startswith('p'))
+    if kind == 'clock_cn':
+        hour = cn_int(g[0])
+        if g[1]:
+            minute = 30
+        elif g[2]:
+            minute = 15
+        elif g[3]:
+            minute = 45
+        elif g[4]:
+            minute = cn_int(g[4])
+        else:
+            minute = 0
+        if minute > 59:
+            return None
+        if g[0] == '一' and minute == 0:
+            # “早一点”“晚一点”里的“一点”
+            expr.doubt(0.5, '一点')
+        return 'clock', (hour, minute, None)
+    if kind == 'period':
+        return 'period', m.group(0).lower()
+    if kind == 'duration':
+        if g[3] is not None:
+            amount = float(g[3])
+            unit = g[4].lower()
+            expr.duration = timedelta(hours=amount) if unit.startswith('h') else timedelta(minutes=amount)
+            return 'duration', None
+        amount = 0.5 if g[0] == '半' else (cn_int(g[0]) if g[0] else 1)
+        if g[1]:
+            amount += 0.5
+        expr.duration = timedelta(hours=amount) if g[2] in ('小时', '钟头') else timedelta(minutes=amount)
+        return 'duration', None
+    return None
+
+
+# ---------- 简单请求 ----------
+
+_ADD_WORDS = _compile(r'添加|新增|加个|加一个|加一条|安排一个|安排个|提醒我|记一下|记得|帮我记|预约'
+                      r'|\badd\b|\bremind me\b|\bschedule (?:a|an)\b')
+_QUERY_WORDS = _compile(r'什么|有啥|哪些|几个|日程|安排|查询|查看|看看|空吗|有空|忙吗'
+                        r'|\bwhat\b|\bany\b|\bagenda\b|\bschedule\b|\bplans?\b|\bevents?\b')
+# 修改、取消类请求交给模型
+_OTHER_WORDS = _compile(r'取消|删除|删掉|不用|不去|改到|改成|推迟|延后|提前|挪到|换到|没有|不是|吗'
+                        r'|\bcancel|\bdelete|\bremove|\bmove|\breschedule|\bpostpone|\bnot\b')
+# 疑问、商量的语气：问的是事件本身（谁、在哪、怎么样），或者还没定下来，交给模型
+_QUESTION_WORDS = _compile(r'谁|哪(?!些)|怎么|为什么|为啥|吧|\bwho\b|\bwhere\b|\bhow\b|\bwhy\b')
+# 没有新增用语时，只有不带否定的短描述才当作新增（“开会”“交报告”），“不在办公室”之类交给模型
+_NEGATION = _compile(r'[不没别未]|\bno\b|\bnot\b')
+_BARE_ADD_MAX_LENGTH = 20
+_FILLER = _compile(r'^[\s,，。.:：、的在于要去帮我请]+|[\s,，。.:：!！?？吧呢啊哦呀]+$')
+_STOPWORDS_EN = _compile(r'\b(?:at|on|in|for|from|to)\b')
+
+
+def match_request(text, now=None, threshold=CONFIDENT):
+    """识别可以在本地直接处理的简单请求
+
+    没有疑问词、有明确时刻和简短描述的陈述句（“明天下午3点开会”）也当作新增；
+    描述中有否定、疑问或商量语气（“开会在哪”“不在办公室”“开会吧”）时不在本地处理。
+
+    Returns:
+        dict|None: {'intent': 'add', 'start': datetime, 'end': datetime|None, 'description': str, 'expr': TimeExpr}
+                   {'intent': 'query', 'start': date, 'end': date, 'expr': TimeExpr}
+                   不确定时返回 None
+    """
+    if '\n' in text.strip():
+        # 多行文本（例如转发的聊天记录）交给模型
+        return None
+    expr = parse(text, now)
+    if not expr.found or expr.confidence < threshold or expr.date is None:
+        return None
+    rest = expr.rest
+    if _QUESTION_WORDS.search(rest):
+        return None
+    add_match = _ADD_WORDS.search(rest)
+    asked = rest.rstrip().endswith(('?', '？'))
+    is_query = (_QUERY_WORDS.search(rest) is not None or asked) and not add_match
+    if is_query:
+        if _OTHER_WORDS.search(_QUERY_WORDS.sub('', rest).replace('吗', '')):
+            return None
+        return {'intent': 'query', 'start': expr.date, 'end': expr.end_date or expr.date, 'expr': expr}
+    if _OTHER_WORDS.search(rest) or expr.time is None or expr.end_date is not None:
+        return None
+    description = ' '.join(_STOPWORDS_EN.sub(' ', _ADD_WORDS.sub('', rest)).split())
+    description = _FILLER.sub('', description)
+    if not description:
+        return None
+    if not add_match and (len(description) > _BARE_ADD_MAX_LENGTH or _NEGATION.search(description)):
+        return None
+    end = expr.end()
+    return {'intent': 'add', 'start': expr.start(), 'end': end if isinstance(end, datetime) else None,
+            'description': description, 'expr': expr}
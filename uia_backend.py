@@ -0,0 +1,105 @@
+"""
+wxauto 的自动化后端
+
+wxauto.py 通过包内相对导入使用 uiautomation / utils / elements / languages / errors / color，
+本身并不直接依赖 Windows。load_wechat() 把仓库中的 wxauto.py 原样放进一个合成包里执行，
+包内的其他模块由后端提供：
+    uia  - 已安装的 wxauto 包（Windows + 已登录的微信客户端）
+    fake - fake_wxauto/ 目录，底层是 fake_wechat.WeChatSim 模拟的窗口树
+
+每次加载都会生成一个独立的包，不同后端、不同模拟器之间互不影响。
+
+用法：
+    >>> wxauto = load_wechat('fake', sim=WeChatSim().populate(20))
+    >>> wx = wxauto.WeChat()
+"""
+import importlib
+import importlib.machinery
+import importlib.util
+import itertools
+import os
+import sys
+import types
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WXAUTO_FILE = os.path.join(REPO_DIR, 'wxauto.py')
+FAKE_DIR = os.path.join(REPO_DIR, 'fake_wxauto')
+
+_package_ids = itertools.count(1)
+
+
+def _installed_wxauto_dir():
+    """已安装的 wxauto 包目录（跳过仓库根目录下同名的 wxauto.py）"""
+    search_path = [p for p in sys.path if os.path.abspath(p or os.curdir) != REPO_DIR]
+    spec = importlib.machinery.PathFinder.find_spec('wxauto', search_path)
+    if spec is None or not spec.submodule_search_locations:
+        raise ImportError('未找到已安装的 wxauto 包，uia 后端需要其中的 uiautomation 等模块（pip install wxauto）')
+    return list(spec.submodule_search_locations)[0]
+
+
+def _attach_simulator(package, sim=None, **options):
+    from fake_wechat import WeChatSim
+    if sim is None:
+        sim = WeChatSim(**options)
+    elif options:
+        raise TypeError(f'传入 sim 时不能再指定模拟器参数：{", ".join(options)}')
+    importlib.import_module(f'{package.__name__}.uiautomation').SetSimulator(sim)
+
+
+class AutomationBackend:
+    """一个自动化后端
+
+    Args:
+        name (str): 后端名称
+        locate (callable): 返回提供 wxauto 包内其他模块的目录
+        setup (callable, optional): setup(package, **options)，在执行 wxauto.py 之前调用
+    """
+
+    def __init__(self, name, locate, setup=None):
+        self.name = name
+        self.locate = locate
+        self.setup = setup
+
+    def load(self, **options):
+        package_name = f'_wxauto_{self.name}_{next(_package_ids)}'
+        package = types.ModuleType(package_name)
+        package.__path__ = [self.locate()]
+        package.__package__ = package_name
+        sys.modules[package_name] = package
+        if self.setup is not None:
+            self.setup(package, **options)
+        elif options:
+            raise TypeError(f'{self.name} 后端不接受参数：{", ".join(options)}')
+
+        spec = importlib.util.spec_from_file_location(f'{package_name}.wxauto', WXAUTO_FILE)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        package.wxauto = module
+        return module
+
+
+BACKENDS = {
+    'uia': AutomationBackend('uia', _installed_wxauto_dir),
+    'fake': AutomationBackend('fake', lambda: FAKE_DIR, _attach_simulator),
+}
+
+
+def register_backend(backend):
+    """注册自定义后端"""
+    BACKENDS[backend.name] = backend
+
+
+def load_wechat(backend='uia', **options):
+    """用指定后端加载 wxauto.py
+
+    Args:
+        backend (str): uia / fake 或通过 register_backend 注册的名称
+        **options: 传给后端的参数，fake 后端接受 sim=WeChatSim(...) 或 WeChatSim 的构造参数
+
+    Returns:
+        module: 加载后的 wxauto 模块，包含 WeChat / WeChatFiles 等
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'未知的自动化后端：{backend}，可选 {", ".join(BACKENDS)}')
+    return BACKENDS[backend].load(**options)
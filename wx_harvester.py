@@ -0,0 +1,290 @@
+"""
+增量获取微信消息
+
+每个聊天对象在 wx_harvest_state.json 中记录一个高水位：
+    sig      - 会话列表中该会话的预览签名（最后一条消息的时间 + 内容）
+    last_id  - 上次处理到的最后一条消息 id
+    tail     - 上次处理到的最后几条消息的内容摘要，用于在 id 变化后重新定位
+    last_time- 上次看到的最后一个时间标记
+    updated  - 上次处理的时间戳
+
+再次获取时，只打开预览签名发生变化或有未读消息的会话，并且只返回高水位之后的消息。
+
+消息交给别的线程提取时用 harvest(defer_save=True)：高水位先只在内存中推进，
+调用方在某个会话的消息提取成功后 commit()，提取失败或中途停止时 rollback()，
+没有提交的会话下次获取时重新读取，不会被标记为已读后丢掉。
+
+后台监听和手动获取共用同一个实例，两把锁：
+    ui_lock - 操作微信窗口（滚动会话列表、打开会话、读取消息），只在后台线程中获取，可能持有很久
+    lock    - 读写 state / _pending 和写文件，只持有很短的时间，主线程 commit() / rollback() 不会被 UI 自动化卡住
+写文件时先读回磁盘上的状态按会话合并（updated 较新的一方胜出），
+其他进程（如 CalendarManagement）同时写同一个文件也不会整体覆盖掉对方的高水位；
+每个写入方使用自己的临时文件，不会互相截断。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+STATE_FILE = "wx_harvest_state.json"
+TAIL_SIZE = 3
+
+
+def message_key(msg):
+    """消息内容摘要：发送者 + 内容"""
+    return hashlib.md5(f"{msg[0]}\x00{msg[1]}".encode('utf-8')).hexdigest()[:16]
+
+
+class IncrementalHarvester:
+    """按会话高水位增量获取消息
+
+    Args:
+        wx (WeChat): wxauto.WeChat 实例
+        state_path (str): 高水位文件路径
+        is_time_marker (callable, optional): 判断一条 SYS 消息是否为时间标记；
+            会话第一次获取时，只保留第一个时间标记之后的消息（与原 get_wx_msg 一致）
+    """
+
+    def __init__(self, wx, state_path=STATE_FILE, is_time_marker=None):
+        self.wx = wx
+        self.state_path = state_path
+        self.is_time_marker = is_time_marker
+        self.state = self._load()
+        # 操作微信窗口的锁，监听线程和获取线程共用；主线程不要获取
+        self.ui_lock = threading.RLock()
+        # 高水位（state / _pending）和写文件的锁
+        self.lock = threading.RLock()
+        # 推迟写回的会话：{会话名: 本次获取之前的高水位（没有时为 None）}
+        self._pending = {}
+        # 本次 harvest() 依次打开的会话
+        self.harvested = []
+        # 本次运行统计
+        self.sessions_seen = 0
+        self.sessions_visited = 0
+        self.messages_new = 0
+
+    def _load(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _newer(mark, other):
+        return other is None or (mark or {}).get('updated', 0) >= other.get('updated', 0)
+
+    def save(self):
+        """原子地写回高水位文件
+
+        推迟写回的会话仍写入本次获取之前的高水位；磁盘上由其他写入方推进得更新的高水位保留下来
+        """
+        with self.lock:
+            try:
+                state = self._load()
+            except (OSError, ValueError):
+                state = {}
+            for name, mark in self.state.items():
+                if name in self._pending:
+                    mark = self._pending[name]
+                    if mark is None:
+                        continue
+                if self._newer(mark, state.get(name)):
+                    state[name] = mark
+            # 采用其他写入方更新的高水位
+            for name, mark in state.items():
+                if name not in self._pending and not self._newer(self.state.get(name), mark):
+                    self.state[name] = mark
+            tmp_path = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def commit(self, names=None):
+        """写回推迟的高水位
+
+        Args:
+            names (iterable, optional): 消息已处理完的会话，为 None 时写回全部
+        """
+        with self.lock:
+            for name in list(self._pending) if names is None else names:
+                self._pending.pop(name, None)
+            self.save()
+
+    def rollback(self):
+        """丢弃尚未提交的高水位，这些会话恢复到本次获取之前"""
+        with self.lock:
+            for name, mark in self._pending.items():
+                if mark is None:
+                    self.state.pop(name, None)
+                else:
+                    self.state[name] = mark
+            self._pending.clear()
+
+    def done_before(self, name):
+        """本次获取中在 name 之前打开的会话：消息按会话顺序产出，
+        name 的消息已经提取时，这些会话的消息也都已提取
+        """
+        harvested = self.harvested
+        return harvested[:harvested.index(name)] if name in harvested else []
+
+    # ---------- 会话列表 ----------
+
+    def scroll_to_top(self):
+        """把会话列表滚回顶部：第一个会话不再变化为止"""
+        with self.ui_lock:
+            session_list = self.wx.SessionBox.ListControl()
+            top = None
+            while True:
+                first = session_list.GetFirstChildControl()
+                name = first.Name if first else None
+                if name == top:
+                    break
+                top = name
+                self.wx.SessionBox.WheelUp(wheelTimes=8, interval=0)
+
+    def list_sessions(self):
+        """从顶部开始滚动会话列表，返回 {name: SessionElement}，逻辑与 WeChat.GetAllSessionList 一致"""
+        self.scroll_to_top()
+        sessions = {}
+        while True:
+            prev_count = len(sessions)
+            for session in self.wx.GetSession():
+                sessions.setdefault(session.name, session)
+            if len(sessions) == prev_count:
+                break  # 停止条件：无新增会话
+            self.wx.SessionBox.WheelDown(wheelTimes=8, interval=0)
+        return sessions
+
+    @staticmethod
+    def signature(session):
+        return f"{session.time}\x00{session.content}"
+
+    def changed_sessions(self, skip=()):
+        """预览签名变化或有未读消息的会话名
+
+        Args:
+            skip (container): 不需要检查的会话，例如已经由独立窗口读取的会话
+        """
+        with self.ui_lock:
+            sessions = self.list_sessions()
+        self.sessions_seen = len(sessions)
+        changed = []
+        with self.lock:
+            for name, session in sessions.items():
+                if name in skip:
+                    continue
+                mark = self.state.get(name)
+                if session.isnew or mark is None or mark.get('sig') != self.signature(session):
+                    changed.append((name, self.signature(session)))
+        return changed
+
+    # ---------- 单个会话 ----------
+
+    def after_mark(self, msgs, mark):
+        """返回高水位之后的消息；找不到高水位时返回 None"""
+        last_id = mark.get('last_id')
+        if last_id is not None:
+            for idx in range(len(msgs) - 1, -1, -1):
+                if msgs[idx][-1] == last_id:
+                    return msgs[idx + 1:]
+        tail = mark.get('tail') or []
+        if tail:
+            keys = [message_key(m) for m in msgs]
+            n = len(tail)
+            for end in range(len(keys), n - 1, -1):
+                if keys[end - n:end] == tail:
+                    return msgs[end:]
+        return None
+
+    def _first_visit(self, msgs):
+        if self.is_time_marker is None:
+            return msgs
+        for idx, msg in enumerate(msgs):
+            if self.is_time_marker(msg[1]):
+                return msgs[idx + 1:]
+        return []
+
+    @staticmethod
+    def _last_unread(msgs, unread):
+        """最后 unread 条非 SYS 消息及其后的全部消息"""
+        count = 0
+        for idx in range(len(msgs) - 1, -1, -1):
+            if msgs[idx][0] != 'SYS':
+                count += 1
+                if count == unread:
+                    return msgs[idx:]
+        return msgs
+
+    def harvest_session(self, name, sig=None, unread=None):
+        """获取单个会话高水位之后的新消息，并推进高水位
+
+        Args:
+            unread (int, optional): 没有高水位时只取最后 unread 条消息，不再加载历史
+
+        Returns:
+            list: 新消息
+        """
+        with self.ui_lock:
+            self.wx.ChatWith(name)
+            with self.lock:
+                mark = self.state.get(name)
+            msgs = self.wx.GetAllMessage()
+            new = self.after_mark(msgs, mark) if mark else None
+            if new is None and mark is None and unread:
+                new = self._last_unread(msgs, unread)
+            if new is None:
+                # 当前加载的消息里没有高水位（新消息太多或第一次获取），加载更多历史再找
+                self.wx.rollToTop()
+                msgs = self.wx.GetAllMessage()
+                new = self.after_mark(msgs, mark) if mark else None
+                if new is None:
+                    new = self._first_visit(msgs)
+
+            self.advance(name, msgs, sig)
+            self.sessions_visited += 1
+            self.messages_new += len(new)
+        return new
+
+    def advance(self, name, msgs, sig=None):
+        """把会话的高水位推进到 msgs 的最后一条
+
+        msgs 也可以来自独立聊天窗口，其中的消息 id 与主窗口不同，之后靠 tail 摘要重新定位
+        """
+        if not msgs:
+            return
+        last_time = None
+        for msg in msgs:
+            if msg[0] == 'SYS' and self.is_time_marker and self.is_time_marker(msg[1]):
+                last_time = msg[1]
+        with self.lock:
+            mark = self.state.get(name) or {}
+            self.state[name] = {
+                'sig': sig if sig is not None else mark.get('sig'),
+                'last_id': msgs[-1][-1],
+                'tail': [message_key(m) for m in msgs[-TAIL_SIZE:]],
+                'last_time': last_time or mark.get('last_time'),
+                'updated': time.time(),
+            }
+
+    def harvest(self, defer_save=False):
+        """依次获取所有变化会话的新消息
+
+        Args:
+            defer_save (bool): 不在读取后立即写回高水位，由调用方 commit() / rollback()
+
+        Yields:
+            tuple: (会话名, 新消息列表)
+        """
+        self.harvested = []
+        self.sessions_visited = self.messages_new = 0
+        for name, sig in self.changed_sessions():
+            if defer_save:
+                with self.lock:
+                    self._pending.setdefault(name, self.state.get(name))
+            msgs = self.harvest_session(name, sig)
+            self.harvested.append(name)
+            if not defer_save:
+                self.save()
+            if msgs:
+                yield name, msgs
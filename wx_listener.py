@@ -0,0 +1,304 @@
+"""
+微信新消息监听
+
+原来的 GetAllNewMessage 反复调用 CheckNewMessage：每次都 _show() 把微信窗口提到最前，
+再截图判断聊天图标上的红点。MessageListener 在后台线程中只读取会话列表
+（每个可见会话一次 Name 读取，外加第一个会话的预览），与上一次的快照比较：
+    - 会话名变化（未读数变化）或位置上移（有新消息的会话会移到顶部）
+    - 第一个会话的预览变化（当前打开的聊天收到消息时没有未读数）
+检测过程不调用 _show，不抢焦点。
+
+发现变化后再读取这些会话的新消息，同一轮的结果合并成一个批次交给订阅者：
+    - 已经用 AddListenChat 弹出独立窗口的会话，直接读窗口中的新消息，不需要焦点
+    - 其他会话通过 IncrementalHarvester 打开并读取高水位之后的消息
+
+用法：
+    >>> listener = MessageListener(wx)
+    >>> listener.subscribe(lambda batch: print(batch))     # 回调，在监听线程中执行
+    >>> sub = listener.subscribe()                          # 迭代器
+    >>> listener.start()
+    >>> for batch in sub: ...                               # 或 async for batch in sub
+"""
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from wx_harvester import IncrementalHarvester
+
+UNREAD_SUFFIX = re.compile(r'(\d+)条新消息$')
+_CLOSED = object()
+
+
+def wxauto_module(wx):
+    """wx 实例所在的 wxauto 模块（已安装的包或 uia_backend 加载的模块）"""
+    return sys.modules.get(type(wx).__module__)
+
+
+def thread_initializer(wx):
+    """wx 所在 wxauto 包的 UIAutomationInitializerInThread，用于在新线程中初始化 COM"""
+    uia = getattr(wxauto_module(wx), 'uia', None)
+    initializer = getattr(uia, 'UIAutomationInitializerInThread', None)
+    return initializer() if initializer is not None else nullcontext()
+
+
+def unread_count(item_name, name):
+    """会话列表项 Name（会话名 + “N条新消息”）中的未读数"""
+    match = UNREAD_SUFFIX.fullmatch(item_name[len(name):]) if item_name.startswith(name) else None
+    return int(match.group(1)) if match else 0
+
+
+class Subscription:
+    """一个订阅：回调或迭代器
+
+    Args:
+        callback (callable, optional): 传入时每个批次回调 callback(batch)；否则批次进入队列供迭代
+        sessions (iterable, optional): 只接收这些会话的消息
+        maxsize (int): 队列上限，消费太慢时丢弃最早的批次
+    """
+
+    def __init__(self, listener, callback=None, sessions=None, maxsize=256):
+        self.listener = listener
+        self.callback = callback
+        self.sessions = set(sessions) if sessions is not None else None
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def _deliver(self, batch):
+        if self.sessions is not None:
+            batch = {name: msgs for name, msgs in batch.items() if name in self.sessions}
+            if not batch:
+                return
+        if self.callback is not None:
+            self.callback(batch)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(batch)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _close(self):
+        if self.callback is None:
+            try:
+                self._queue.put_nowait(_CLOSED)
+            except queue.Full:
+                self._queue.get_nowait()
+                self._queue.put_nowait(_CLOSED)
+
+    def get(self, timeout=None):
+        """取下一个批次，超时返回 None；监听停止后抛出 StopIteration"""
+        try:
+            batch = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if batch is _CLOSED:
+            self._queue.put_nowait(_CLOSED)
+            raise StopIteration
+        return batch
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get()
+            except StopIteration:
+                return
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # 只有异步迭代时才用到 asyncio，导入较慢，不放在模块顶层
+        import asyncio
+        try:
+            return await asyncio.to_thread(self.get)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    def cancel(self):
+        self.listener.unsubscribe(self)
+
+
+class MessageListener:
+    """后台监听微信新消息
+
+    Args:
+        wx (WeChat): wxauto.WeChat 实例，只在监听线程中使用
+        interval (float): 轮询会话列表的间隔秒数
+        harvester (IncrementalHarvester, optional): 读取非独立窗口会话的新消息，默认新建一个
+    """
+
+    def __init__(self, wx, interval=0.5, harvester=None):
+        self.wx = wx
+        self.interval = interval
+        self.harvester = harvester or IncrementalHarvester(wx)
+        self._session_element = wxauto_module(wx).SessionElement
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = None
+        self._items = []
+        # 统计
+        self.polls = 0
+        self.batches = 0
+        self.messages = 0
+        self.fetches = 0
+        self.poll_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.started_at = None
+        self.stopped_at = None
+
+    # ---------- 订阅 ----------
+
+    def subscribe(self, callback=None, sessions=None):
+        """订阅新消息批次 {会话名: [消息, ...]}
+
+        Returns:
+            Subscription: 没有回调时可以 for / async for 迭代
+        """
+        subscription = Subscription(self, callback, sessions)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription._close()
+
+    def _publish(self, batch):
+        self.batches += 1
+        self.messages += sum(len(msgs) for msgs in batch.values())
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription._deliver(batch)
+            except Exception as e:
+                print(f"新消息回调执行失败：{e}")
+
+    # ---------- 检测 ----------
+
+    def snapshot(self):
+        """会话列表快照：(各可见会话的 Name, 第一个会话的预览)，同时记下列表项供 poll 解析会话名"""
+        items = self.wx.SessionBox.ListControl().GetChildren()
+        self._items = items
+        names = tuple(item.Name for item in items)
+        top = None
+        if items:
+            session = self._session_element(items[0])
+            top = (session.time, session.content)
+        return names, top
+
+    @staticmethod
+    def diff(old, new):
+        """比较两次快照
+
+        Returns:
+            list: 有新消息的会话在新快照中的位置，按列表顺序
+        """
+        old_names, old_top = old
+        new_names, new_top = new
+        old_index = {name: i for i, name in enumerate(old_names)}
+        changed = [i for i, name in enumerate(new_names) if name not in old_index or old_index[name] > i]
+        if new_names and new_top != old_top and 0 not in changed:
+            changed.insert(0, 0)
+        return changed
+
+    def _fetch(self, name, unread):
+        self.fetches += 1
+        chat = self.wx.listen.get(name)
+        if chat is not None:
+            return chat.GetNewMessage(savepic=chat.savepic, savefile=chat.savefile, savevoice=chat.savevoice)
+        return self.harvester.harvest_session(name, unread=unread)
+
+    def poll(self):
+        """检测一轮，返回本轮的批次（没有新消息时为空 dict）"""
+        self.polls += 1
+        if self._snapshot is None:
+            # 第一轮：会话列表滚回顶部，只记录基准
+            self.harvester.scroll_to_top()
+            self._snapshot = self.snapshot()
+            return {}
+        snapshot = self.snapshot()
+        changed = self.diff(self._snapshot, snapshot)
+        if not changed:
+            self._snapshot = snapshot
+            return {}
+        # 会话名可能以数字结尾，不能只靠正则从 Name 中切出，只对变化的几项读取完整的会话信息
+        pending = []
+        for i in changed:
+            name = self._session_element(self._items[i]).name
+            pending.append((name, max(unread_count(snapshot[0][i], name), 1)))
+        batch = {}
+        for name, unread in pending:
+            msgs = [m for m in self._fetch(name, unread) if m[0] != 'SYS']
+            if msgs:
+                batch[name] = msgs
+        # 下一轮的基准是本轮快照中读过的会话清掉未读数后的样子，不重新取快照：
+        # 读取期间到达的消息会在下一轮被发现，而不是被新快照吸收掉
+        names = list(snapshot[0])
+        for i, (name, _) in zip(changed, pending):
+            names[i] = name
+        self._snapshot = (tuple(names), snapshot[1])
+        self.harvester.save()
+        return batch
+
+    # ---------- 线程 ----------
+
+    def _run(self):
+        with thread_initializer(self.wx):
+            while not self._stop.is_set():
+                t0, c0 = time.perf_counter(), time.thread_time()
+                try:
+                    batch = self.poll()
+                except Exception as e:
+                    print(f"监听微信消息失败：{e}")
+                    batch = {}
+                if batch:
+                    self._publish(batch)
+                self.poll_seconds += time.perf_counter() - t0
+                self.cpu_seconds += time.thread_time() - c0
+                self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='wx-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止监听，所有迭代中的订阅随之结束"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.stopped_at = time.monotonic()
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription._close()
+
+    def stats(self):
+        """运行统计：轮询次数、平均每轮耗时、监听线程 CPU 占用等"""
+        end = self.stopped_at if self._thread is None and self.stopped_at else time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            'polls': self.polls,
+            'batches': self.batches,
+            'messages': self.messages,
+            'fetches': self.fetches,
+            'poll_ms': self.poll_seconds / self.polls * 1000 if self.polls else 0.0,
+            'cpu_percent': self.cpu_seconds / elapsed * 100 if elapsed else 0.0,
+        }
@@ -0,0 +1,226 @@
+"""
+多窗口并行获取微信消息
+
+get_wx_msg 只能操作主窗口：依次点开会话、滚动、读取，所有会话串行。
+ParallelHarvester 把消息最多的 pool_size 个会话用 AddListenChat 弹出成独立的 ChatWnd 窗口，
+由 workers 个工作线程并发读取；其余会话仍由主线程通过 IncrementalHarvester 串行获取。
+
+    - 每个工作线程用 UIAutomationInitializerInThread 初始化自己的 COM，
+      并在本线程中创建所负责窗口的 ChatWnd，一个窗口始终由同一个线程读取
+    - 每次获取后按会话的新消息数累计流量（旧流量按 decay 衰减），
+      每 rotate_every 次获取按流量重新选出窗口池：流量下降的会话关闭窗口，回到主窗口获取
+    - 会话进出窗口池时同步 IncrementalHarvester 的高水位，不会重复或遗漏消息
+
+用法：
+    >>> parallel = ParallelHarvester(wx, pool_size=4, workers=2)
+    >>> for name, msgs in parallel.harvest().items(): ...
+    >>> parallel.close()
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from wx_harvester import IncrementalHarvester
+from wx_listener import thread_initializer, wxauto_module
+
+
+class WindowWorker:
+    """一个工作线程，独占若干个独立聊天窗口
+
+    Args:
+        wx (WeChat): 主窗口实例，用于取得 ChatWnd 类和初始化 COM
+        index (int): 线程编号
+    """
+
+    def __init__(self, wx, index):
+        self.wx = wx
+        self.chat_cls = wxauto_module(wx).ChatWnd
+        self.chats = {}
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f'wx-window-{index}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with thread_initializer(self.wx):
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                future, fn, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def submit(self, fn, *args):
+        """在工作线程中执行 fn(*args)
+
+        Returns:
+            Future: fn 的返回值
+        """
+        future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+
+    def stop(self, timeout=None):
+        self._tasks.put(None)
+        self._thread.join(timeout)
+
+    # 以下方法在工作线程中执行
+
+    def open(self, who):
+        """接管已经弹出的窗口，返回窗口中当前的全部消息"""
+        chat = self.chat_cls(who, self.wx.language)
+        self.chats[who] = chat
+        return chat.GetAllMessage()
+
+    def read(self, who):
+        chat = self.chats[who]
+        return chat.GetNewMessage(savepic=chat.savepic, savefile=chat.savefile, savevoice=chat.savevoice)
+
+    def release(self, who):
+        """最后读一次新消息并放弃窗口，返回 (新消息, 窗口中的全部消息)"""
+        chat = self.chats.pop(who)
+        new = chat.GetNewMessage(savepic=chat.savepic, savefile=chat.savefile, savevoice=chat.savevoice)
+        return new, chat.GetAllMessage()
+
+
+class ParallelHarvester:
+    """独立窗口池 + 主窗口增量获取
+
+    Args:
+        wx (WeChat): wxauto.WeChat 实例，窗口池的增减和主窗口获取都在调用 harvest 的线程中执行
+        pool_size (int): 独立窗口数
+        workers (int): 读取独立窗口的线程数
+        harvester (IncrementalHarvester, optional): 主窗口的增量获取，默认新建一个
+        rotate_every (int): 每多少次 harvest 按流量调整一次窗口池
+        decay (float): 每次调整窗口池时旧流量的衰减系数
+        min_traffic (float): 进入窗口池的最低流量
+    """
+
+    def __init__(self, wx, pool_size=4, workers=2, harvester=None, rotate_every=1, decay=0.5, min_traffic=1):
+        self.wx = wx
+        self.pool_size = pool_size
+        self.harvester = harvester or IncrementalHarvester(wx)
+        self.rotate_every = rotate_every
+        self.decay = decay
+        self.min_traffic = min_traffic
+        self.workers = [WindowWorker(wx, i) for i in range(max(1, workers))]
+        self.pool = {}          # {会话名: WindowWorker}
+        self.traffic = {}       # {会话名: 衰减后的新消息数}
+        self._missed = {}       # 进入窗口池时补上的消息，下次 harvest 一并返回
+        # 统计
+        self.rounds = 0
+        self.messages = 0
+        self.seconds = 0.0
+        self.rotations = 0
+        self.pool_messages = 0
+
+    # ---------- 窗口池 ----------
+
+    def _add(self, who):
+        """弹出独立窗口并交给负载最小的工作线程"""
+        self.wx.AddListenChat(who)
+        worker = min(self.workers, key=lambda w: len(w.chats))
+        msgs = worker.submit(worker.open, who).result()
+        self.pool[who] = worker
+        mark = self.harvester.state.get(who)
+        missed = self.harvester.after_mark(msgs, mark) if mark else None
+        if missed:
+            self._missed[who] = missed
+        self.harvester.advance(who, msgs)
+
+    def _remove(self, who):
+        """关闭独立窗口，会话回到主窗口获取"""
+        worker = self.pool.pop(who)
+        new, msgs = worker.submit(worker.release, who).result()
+        if new:
+            self._missed.setdefault(who, []).extend(new)
+        self.harvester.advance(who, msgs)
+        self.wx.RemoveListenChat(who, close=True)
+
+    def rotate(self):
+        """按流量重新选出窗口池
+
+        Returns:
+            tuple: (新加入的会话, 移出的会话)
+        """
+        ranked = sorted((name for name, t in self.traffic.items() if t >= self.min_traffic),
+                        key=lambda name: self.traffic[name], reverse=True)
+        wanted = set(ranked[:self.pool_size])
+        removed = [who for who in self.pool if who not in wanted]
+        added = [who for who in ranked[:self.pool_size] if who not in self.pool]
+        for who in removed:
+            self._remove(who)
+        for who in added:
+            self._add(who)
+        for name in list(self.traffic):
+            self.traffic[name] *= self.decay
+            if self.traffic[name] < 0.01:
+                del self.traffic[name]
+        if added or removed:
+            self.rotations += 1
+        return added, removed
+
+    # ---------- 获取 ----------
+
+    def harvest(self, scan=True):
+        """获取一轮新消息：窗口池中的会话并发读取，其余会话在主窗口中串行获取
+
+        Args:
+            scan (bool): 是否扫描主窗口的会话列表；为 False 时只读取窗口池，
+                适合高频读取热门会话、低频做一次完整扫描
+
+        Returns:
+            dict: {会话名: 新消息列表}
+        """
+        t0 = time.perf_counter()
+        futures = {who: worker.submit(worker.read, who) for who, worker in self.pool.items()}
+        result, self._missed = self._missed, {}
+        changed = self.harvester.changed_sessions(skip=self.pool) if scan else []
+        for name, sig in changed:
+            msgs = self.harvester.harvest_session(name, sig)
+            if msgs:
+                result[name] = msgs
+        for who, future in futures.items():
+            try:
+                msgs = future.result()
+            except Exception as e:
+                print(f"读取独立窗口 {who} 失败：{e}")
+                continue
+            if msgs:
+                result.setdefault(who, []).extend(msgs)
+                self.pool_messages += len(msgs)
+        self.harvester.save()
+
+        for name, msgs in result.items():
+            count = sum(1 for m in msgs if m[0] != 'SYS')
+            self.traffic[name] = self.traffic.get(name, 0) + count
+            self.messages += count
+        self.rounds += 1
+        if self.rounds % self.rotate_every == 0:
+            self.rotate()
+            self.harvester.save()
+        self.seconds += time.perf_counter() - t0
+        return result
+
+    def close(self):
+        """关闭所有独立窗口和工作线程"""
+        for who in list(self.pool):
+            self._remove(who)
+        self.harvester.save()
+        for worker in self.workers:
+            worker.stop()
+
+    def stats(self):
+        return {
+            'rounds': self.rounds,
+            'messages': self.messages,
+            'pool': list(self.pool),
+            'pool_messages': self.pool_messages,
+            'rotations': self.rotations,
+            'msgs_per_sec': self.messages / self.seconds if self.seconds else 0.0,
+        }
@@ -10,6 +10,8 @@ from .utils import *
 from .elements import *
 from .errors import *
 from .color import *
+import collections
+import threading
 import time
 import os
 import re
@@ -18,11 +20,116 @@ try:
 except:
     from typing_extensions import Literal
 
+WM_CLOSE = 0x0010
+
+# 每个调用点的等待统计：{site: {'calls', 'timeouts', 'waited', 'budget'}}
+# waited 为实际等待秒数，budget 为原来固定等待的秒数
+WaitStats: dict = dict()
+_wait_stats_lock = threading.Lock()
+
+
+def WaitUntil(condition, timeout, interval=0.05, site=None, budget=None):
+    """轮询等待条件成立，代替固定时长的 sleep / waitTime
+
+    Args:
+        condition (callable): 无参函数，返回真值表示条件成立；抛出异常视为不成立
+        timeout (float): 最长等待秒数
+        interval (float, optional): 轮询间隔
+        site (str, optional): 调用点名称，用于统计
+        budget (float, optional): 原来的固定等待秒数，默认等于 timeout
+
+    Returns:
+        bool: 条件是否在超时前成立
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    while True:
+        try:
+            ok = bool(condition())
+        except Exception:
+            ok = False
+        if ok or time.perf_counter() >= deadline:
+            break
+        time.sleep(interval)
+    if site is not None:
+        waited = time.perf_counter() - start
+        with _wait_stats_lock:
+            stat = WaitStats.setdefault(site, {'calls': 0, 'timeouts': 0, 'waited': 0.0, 'budget': 0.0})
+            stat['calls'] += 1
+            stat['timeouts'] += not ok
+            stat['waited'] += waited
+            stat['budget'] += timeout if budget is None else budget
+    return ok
+
+
+def GetWaitStats():
+    """各调用点的等待统计，附带节省的秒数
+
+    Returns:
+        dict: {site: {'calls', 'timeouts', 'waited', 'budget', 'saved'}}
+    """
+    with _wait_stats_lock:
+        return {site: dict(stat, saved=stat['budget'] - stat['waited'])
+                for site, stat in WaitStats.items()}
+
+
+class SeenIds:
+    """有界的已处理消息 id 集合
+
+    set 负责 O(1) 判断，deque 记录插入顺序；超过 maxlen 时淘汰最早加入的 id，
+    长时间监听活跃群聊也不会无限增长。
+
+    Args:
+        ids (iterable, optional): 初始 id
+        maxlen (int, optional): 最多保留的 id 数
+    """
+
+    def __init__(self, ids=(), maxlen=4096):
+        self.maxlen = maxlen
+        self._set = set()
+        self._order = collections.deque()
+        self.update(ids)
+
+    def add(self, msgid):
+        if msgid in self._set:
+            return
+        self._set.add(msgid)
+        self._order.append(msgid)
+        if len(self._order) > self.maxlen:
+            self._set.discard(self._order.popleft())
+
+    def update(self, ids):
+        for msgid in ids:
+            self.add(msgid)
+
+    def __contains__(self, msgid):
+        return msgid in self._set
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __repr__(self) -> str:
+        return f"<SeenIds {len(self)}/{self.maxlen}>"
+
+
+def RuntimeId(control):
+    """控件的 runtime id 字符串，与消息 id 的格式一致"""
+    return ''.join([str(i) for i in control.GetRuntimeId()])
+
+
 class WeChat(WeChatBase):
     VERSION: str = '3.9.11.17'
     lastmsgid: str = None
     listen: dict = dict()
     SessionItemList: list = []
+    # 会话控件缓存：{会话名: ListItemControl}，会话列表签名变化时重建
+    _session_cache: dict = dict()
+    _session_signature: tuple = None
+    session_cache_hits: int = 0
+    session_cache_misses: int = 0
 
     def __init__(
             self, 
@@ -70,7 +177,7 @@ class WeChat(WeChatBase):
         
         self.nickname = self.A_MyIcon.Name
         msgs_ = self.GetAllMessage()
-        self.usedmsgid = [i[-1] for i in msgs_]
+        self.usedmsgid = SeenIds(i[-1] for i in msgs_)
         print(f'初始化成功，获取到已登录窗口：{self.nickname}')
     
     def _checkversion(self):
@@ -187,27 +294,30 @@ class WeChat(WeChatBase):
         msgids = [i[-1] for i in msgs_]
 
         if not self.usedmsgid:
-            self.usedmsgid = msgids
-        
-        newmsgids = [i for i in msgids if i not in self.usedmsgid]
-        oldmsgids = [i for i in self.usedmsgid if i in msgids]
-        if newmsgids and oldmsgids:
+            self.usedmsgid.update(msgids)
+
+        hasnew = hasold = False
+        for msgid in msgids:
+            if msgid in self.usedmsgid:
+                hasold = True
+            else:
+                hasnew = True
+        if hasnew and hasold:
             MsgItems = self.C_MsgList.GetChildren()
-            msgids = [''.join([str(i) for i in i.GetRuntimeId()]) for i in MsgItems]
-            new = []
-            for i in range(len(msgids)-1, -1, -1):
-                if msgids[i] in self.usedmsgid:
-                    new = msgids[i+1:]
+            # 每个控件只计算一次 runtime id
+            itemids = [RuntimeId(i) for i in MsgItems]
+            NewMsgItems = []
+            for i in range(len(itemids)-1, -1, -1):
+                if itemids[i] in self.usedmsgid:
+                    NewMsgItems = [
+                        item for item in MsgItems[i+1:]
+                        if item.ControlTypeName == 'ListItemControl'
+                    ]
                     break
-            NewMsgItems = [
-                i for i in MsgItems 
-                if ''.join([str(i) for i in i.GetRuntimeId()]) in new
-                and i.ControlTypeName == 'ListItemControl'
-            ]
             if NewMsgItems:
                 wxlog.debug('获取当前窗口新消息')
                 msgs = self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
-                self.usedmsgid = msgids
+                self.usedmsgid.update(itemids)
                 return {self.CurrentChat(): msgs}
 
         if self.CheckNewMessage():
@@ -226,7 +336,7 @@ class WeChat(WeChatBase):
                 NewMsgItems = self.C_MsgList.GetChildren()[-sessiondict[session]:]
                 msgs = self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
                 msgs_ = self.GetAllMessage()
-                self.usedmsgid = [i[-1] for i in msgs_]
+                self.usedmsgid.update(i[-1] for i in msgs_)
                 return {session:msgs}
         else:
             wxlog.debug('没有新消息')
@@ -260,7 +370,10 @@ class WeChat(WeChatBase):
 
         # 定位至窗口顶端
         uia.Click(x, center_y)
-        self.C_MsgList.SendKeys('{Home}', waitTime=1)  # 按键盘上的“Home”键，跳转至窗口顶部
+        before = self._msglist_signature()
+        self.C_MsgList.SendKeys('{Home}', waitTime=0)  # 按键盘上的“Home”键，跳转至窗口顶部
+        # 等到消息列表的内容发生变化（已经在顶部时最多等 1 秒，与原来的固定等待相同）
+        WaitUntil(lambda: self._msglist_signature() != before, timeout=1, site='rollToTop')
 
         children = self.C_MsgList.GetChildren()
         # 遍历所有子元素
@@ -302,6 +415,34 @@ class WeChat(WeChatBase):
             return {i:SessionList[i] for i in SessionList if SessionList[i] > 0}
         return SessionList
     
+    def _session_controls(self):
+        """当前会话列表中可见的聊天对象控件
+
+        以（会话数, 第一个会话的 Name）作为会话列表的签名：有新消息时会话会移到顶部，
+        滚动列表时第一个会话也会变化，签名不变时直接返回缓存，不再逐个读取会话控件。
+        与 GetSessionList 一致，最后一个可见会话可能只露出一部分，不放入缓存。
+
+        Returns:
+            dict: 键为聊天对象名，值为 ListItemControl
+        """
+        items = self.SessionBox.ListControl().GetChildren()
+        signature = (len(items), items[0].Name if items else None)
+        if signature != self._session_signature:
+            controls = {}
+            for item in items:
+                if item.BoundingRectangle.width() == 0:
+                    continue
+                try:
+                    name, _ = self.GetSessionAmont(item)
+                except:
+                    break
+                controls.setdefault(name, item)
+            if controls:
+                controls.pop(list(controls)[-1])
+            self._session_cache = controls
+            self._session_signature = signature
+        return self._session_cache
+
     def GetSession(self):
         """获取当前聊天列表中的所有聊天对象
 
@@ -346,15 +487,29 @@ class WeChat(WeChatBase):
             chatname ( str ): 匹配值第一个的完整名字
         '''
         self._show()
-        sessiondict = self.GetSessionList(True)
-        if who in list(sessiondict.keys())[:-1]:
-            self.SessionBox.ListItemControl(RegexName=who).Click(simulateMove=False)
+        control = self._session_controls().get(who)
+        if control is not None and control.BoundingRectangle.width() != 0:
+            # 签名相同时列表项仍可能被复用为别的会话（中间的会话移到顶部），点击前核对名字
+            try:
+                name, _ = self.GetSessionAmont(control)
+            except:
+                name = None
+            if name != who:
+                self._session_signature = None
+                control = None
+        if control is not None:
+            self.session_cache_hits += 1
+            control.Click(simulateMove=False)
             return who
         else:
-            self.UiaAPI.SendKeys('{Ctrl}f', waitTime=1)
-            self.B_Search.SendKeys(who, waitTime=1.5)
+            self.session_cache_misses += 1
+            self.UiaAPI.SendKeys('{Ctrl}f', waitTime=0)
+            WaitUntil(lambda: self.B_Search.HasKeyboardFocus, timeout=1, site='ChatWith.focus')
+            self.B_Search.SendKeys(who, waitTime=0)
             target_control = self.SessionBox.TextControl(Name=f"<em>{who}</em>")
-            if target_control.Exists(timeout):
+            # 原来固定等待 1.5 秒后再最多等 timeout 秒，现在完全匹配项一出现就返回
+            if WaitUntil(lambda: target_control.Exists(0), timeout=1.5 + timeout,
+                         site='ChatWith.search', budget=1.5):
                 wxlog.debug('选择完全匹配项')
                 target_control.Click(simulateMove=False)
                 return who
@@ -523,6 +678,11 @@ class WeChat(WeChatBase):
             Warnings.lightred('所有文件都无法成功发送', stacklevel=2)
             return False
             
+    def _msglist_signature(self):
+        """消息列表的变化签名：（子控件数, 第一个子控件的 Name）"""
+        first = self.C_MsgList.GetFirstChildControl()
+        return len(self.C_MsgList.GetChildren()), first.Name if first else None
+
     def GetAllMessage(self, savepic=False, savefile=False, savevoice=False):
         '''获取当前窗口中加载的所有聊天记录
         
@@ -715,10 +875,19 @@ class WeChat(WeChatBase):
         """获取所有监听对象"""
         return self.listen
     
-    def RemoveListenChat(self, who):
-        """移除监听对象"""
+    def RemoveListenChat(self, who, close=False):
+        """移除监听对象
+
+        Args:
+            who (str): 要移除的聊天对象名
+            close (bool, optional): 是否同时关闭该聊天对象的独立窗口
+        """
         if who in self.listen:
             del self.listen[who]
+            if close:
+                HWND = FindWindow(name=who, classname='ChatWnd')
+                if HWND:
+                    win32gui.PostMessage(HWND, WM_CLOSE, 0, 0)
         else:
             Warnings.lightred(f'未找到监听对象：{who}', stacklevel=2)
 
@@ -853,6 +1022,11 @@ class WeChatFiles:
             # 如果聊天框不在列表中，则抛出异常
             raise TargetNotFoundError(f'未查询到目标：{who}')
 
+    @staticmethod
+    def _row_state(row):
+        """文件行的状态签名：（Name, 各子控件的 Name）"""
+        return row.Name, tuple(i.Name for i in row.GetChildren())
+
     def DownloadFiles(self, who, amount, deadline=None, size=None):
         '''开始下载文件
 
@@ -885,8 +1059,10 @@ class WeChatFiles:
 
                 itemfileslist.append(item[i].Name)
                 self.itemfiles = item[i]
+                before = self._row_state(self.itemfiles)
                 self.itemfiles.Click()
-                time.sleep(0.5)
+                WaitUntil(lambda: self._row_state(self.itemfiles) != before, timeout=0.5,
+                          site='DownloadFiles')
             except:
                 pass
 